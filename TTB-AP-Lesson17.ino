@@ -28,6 +28,7 @@
 // Function prototypes - this allows the definition of default values.
 void binDispLEDs(int action = 0);
 void soundPBuzzer(char note = 'L', int duration = 100);
+byte calcCRC8(byte* dataBuffer, byte dataLength);
 
 //Code loop job defines.
 #define JOB1CYCLE 25          // Job 1 execution cycle: 0.025s - Get the data: Read the joystick.
@@ -47,6 +48,16 @@ char rxBuffer[RXBUFFERMAX + 1];     // A character array variable to hold incomi
 const char crcDelimiter[] = ":~!";  // The delimiter between the command and CRC8 checksum can be any of these characters.
 const char cmdDelimiter[] = " ,=";  // The delimiter between the command subject and command action can be any of these characters.
 
+// Binary framing, used instead of ASCII CSV once Python sends the "Mode=B" command.
+// Joystick data -> 0xA5 0x5A, X (uint16), Y (uint16), Z (uint8), CRC8 of X, Y and Z. 8 bytes, little endian.
+// Commands      -> 0xC3, LEDs (int8, -1 = no change), note ('L', 'H' or 0 = no beep), duration (uint16), CRC8 of LEDs to duration. 6 bytes.
+#define TXFRAMESYNC1 0xA5           // The first binary joystick data frame sync byte.
+#define TXFRAMESYNC2 0x5A           // The second binary joystick data frame sync byte.
+#define TXFRAMESIZE 8               // The size of a binary joystick data frame.
+#define RXFRAMESYNC 0xC3            // The binary command frame sync byte.
+#define RXFRAMESIZE 6               // The size of a binary command frame.
+bool binaryMode = false;            // A flag to indicate that binary framing is in use.
+
 // Receive command flag.
 bool commandReady = false;          // A flag to indicate that the current command is ready to be actioned.
 
@@ -123,20 +134,50 @@ void loop() {
   if (timeNow - timeMark2 >= JOB2CYCLE) {
     timeMark2 = timeNow;
     // Do something...   
-    // Construct the send data string.
-    sprintf(txBuffer, "%d,%d,%d", jstkXValue, jstkYValue, jstkZValue);
-    // Calculate the CRC8 checksum of the txBuffer.
-    chksumCRC8 = calcCRC8((byte*)txBuffer); // Cast the char array pointer to a byte array pointer.
-    // Print the results.
-    Serial.print(txBuffer);
-    // Add the CRC8 checksum to the end.
-    Serial.print("!");
-    Serial.println(chksumCRC8);
+    // Construct and send a binary data frame, if binary framing is in use.
+    if (binaryMode) {
+      txBuffer[0] = TXFRAMESYNC1;
+      txBuffer[1] = TXFRAMESYNC2;
+      txBuffer[2] = lowByte(jstkXValue);
+      txBuffer[3] = highByte(jstkXValue);
+      txBuffer[4] = lowByte(jstkYValue);
+      txBuffer[5] = highByte(jstkYValue);
+      txBuffer[6] = jstkZValue;
+      // Calculate the CRC8 checksum of the joystick data.
+      txBuffer[7] = calcCRC8((byte*)txBuffer + 2, TXFRAMESIZE - 3);
+      Serial.write((byte*)txBuffer, TXFRAMESIZE);
+    }
+    else {
+      // Construct the send data string.
+      sprintf(txBuffer, "%d,%d,%d", jstkXValue, jstkYValue, jstkZValue);
+      // Calculate the CRC8 checksum of the txBuffer.
+      chksumCRC8 = calcCRC8((byte*)txBuffer); // Cast the char array pointer to a byte array pointer.
+      // Print the results.
+      Serial.print(txBuffer);
+      // Add the CRC8 checksum to the end.
+      Serial.print("!");
+      Serial.println(chksumCRC8);
+    }
   }
   // Job 3 - Read commands: Parse any received serial commands.
   if (timeNow - timeMark3 >= JOB3CYCLE) {
     timeMark3 = timeNow;
     // Do something...
+    // If we have received a binary command frame then check it and extract the actions.
+    if (commandReady and binaryMode) {
+      // Lets check the CRC8 checksum.
+      if (calcCRC8((byte*)rxBuffer + 1, RXFRAMESIZE - 2) == (byte)rxBuffer[RXFRAMESIZE - 1]) {
+        if ((signed char)rxBuffer[1] >= 0) {
+          binDispLEDsAction = (signed char)rxBuffer[1];
+        }
+        if (rxBuffer[2] != 0) {
+          pBuzzerActionN = rxBuffer[2];
+          pBuzzerActionD = word((byte)rxBuffer[4], (byte)rxBuffer[3]);
+        }
+      }
+      // All done, so clear the ready flag for more commands to be received.
+      commandReady = false;
+    }
     // If we have received something via the serial port then parse it.
     if (commandReady) {
       // Parse the received data - NULL is returned if nothing is found by strtok().
@@ -163,6 +204,10 @@ void loop() {
           pBuzzerActionN = *action;                    // We have a recognised subject and an action for it.
           pBuzzerActionD = atoi(action + 1);           // We have a recognised subject and an action for it.
         }
+        // Change to binary framing if Python asks for it - "Mode=B".
+        if (strcmp(subject, "Mode") == 0 and strcmp(action, "B") == 0) {
+          binaryMode = true;
+        }
         // Extract the next command.
         subject = strtok(NULL, cmdDelimiter);          // A pointer to a NULL terminated part of the receive buffer.
         action  = strtok(NULL, cmdDelimiter);          // A pointer to another NULL terminated part of the receive buffer.
@@ -210,6 +255,17 @@ void serialEvent() {
   while (Serial.available() and not commandReady) {
     // Get the new byte of data from the serial rx buffer.
     char rxChar = (char)Serial.read();
+    // Binary command frames have a fixed size, and start with the sync byte.
+    if (binaryMode) {
+      if (bufferIndex > 0 or (byte)rxChar == RXFRAMESYNC) {
+        rxBuffer[bufferIndex++] = rxChar;
+      }
+      if (bufferIndex == RXFRAMESIZE) {
+        commandReady = true;        // Set the command ready flag for the main loop.
+        bufferIndex = 0;            // Reset the buffer index in readyness for the next command.
+      }
+      continue;
+    }
     // If we have received the end of command delimiter or reached the end of the buffer, finish the string and set a flag for the main loop to action the command.
     if (rxChar == '\n' or bufferIndex == RXBUFFERMAX) {
       rxBuffer[bufferIndex] = '\0'; // Terminate the string.
@@ -262,12 +318,17 @@ void soundPBuzzer(char note, int duration) {
 }
 
 // Calculate the CRC8 checksum of a null terminated character array.
-// Based on the CRC8 formulas by Dallas/Maxim (GNU GPL 3.0 license).
 byte calcCRC8(byte* dataBuffer) {
+  return calcCRC8(dataBuffer, strlen((char*)dataBuffer));
+}
+
+// Calculate the CRC8 checksum of a byte array of the given length - binary data may contain null bytes.
+// Based on the CRC8 formulas by Dallas/Maxim (GNU GPL 3.0 license).
+byte calcCRC8(byte* dataBuffer, byte dataLength) {
   // Initialise the CRC8 checksum.
   byte chksumCRC8 = 0;
-  // While the byte to be process is not the null terminator.
-  while(*dataBuffer != '\0') {
+  // While there are bytes to be processed.
+  while(dataLength-- > 0) {
     byte currentByte = *dataBuffer; // Get the byte to be processed.
     // Process each bit of the byte. 
     for (byte bitCounter = 0; bitCounter < 8; bitCounter++) {
@@ -0,0 +1,68 @@
+# Benchmark: many arenas in one process, each with its own fake Arduino on a pseudo terminal (Linux/macOS only).
+# The fake Arduinos run in a separate process, so they do not compete with the arenas for the interpreter.
+# Half way through, one controller is unplugged: its arena should drop it, and every other arena should play on at full rate.
+# Run from the repository root: python benchmarks/benchArenas.py [--arenas 8] [--seconds 10] [--processes 1]
+
+import argparse
+import multiprocessing
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pong3d.arenas import Arena, ArenaServer, arenaSettings, printStats, runArenaProcesses
+from pong3d.fakearduino import FakeArduino
+
+# The fake Arduinos: send their ports, then do as they are told -> ("stop", index), ("quit", None).
+def runFakeArduinos(connection, count, job2Cycle):
+    fakeArduinos = [FakeArduino(job2Cycle = job2Cycle) for fake in range(count)]
+    for fakeArduino in fakeArduinos:
+        fakeArduino.jstkXValue = 600
+        fakeArduino.start()
+    connection.send([fakeArduino.port for fakeArduino in fakeArduinos])
+    while True:
+        (command, index) = connection.recv()
+        if command == "stop":
+            fakeArduinos[index].stop()
+            connection.send(fakeArduinos[index].packetsSent)
+        elif command == "quit":
+            connection.send([(fakeArduino.packetsSent, len(fakeArduino.commands)) for fakeArduino in fakeArduinos])
+            break
+
+def main():
+    parser = argparse.ArgumentParser(description = "Many arenas, one process, fake Arduinos.")
+    parser.add_argument("--arenas", type = int, default = 8)
+    parser.add_argument("--seconds", type = float, default = 10)
+    parser.add_argument("--processes", type = int, default = 1, help = "spread the arenas across processes (no unplugging then)")
+    parser.add_argument("--packet-cycle", type = float, default = 0.050, help = "seconds between joystick packets (default %(default)s)")
+    args = parser.parse_args()
+    (connection, fakeConnection) = multiprocessing.Pipe()
+    fakes = multiprocessing.Process(target = runFakeArduinos, args = (fakeConnection, args.arenas, args.packet_cycle), daemon = True)
+    fakes.start()
+    ports = connection.recv()
+    print("%d arenas, %d fake Arduinos sending every %.0fms, %.0fs." % (args.arenas, args.arenas, args.packet_cycle * 1000, args.seconds))
+
+    if args.processes > 1:
+        (arenaStats, lateFrames, frames) = runArenaProcesses(ports, args.processes, args.seconds)
+    else:
+        arenas = [Arena("arena%d" % arenaIndex, port, arenaSettings()) for (arenaIndex, port) in enumerate(ports)]
+        server = ArenaServer(arenas)
+        server.run(args.seconds / 2)
+        # Unplug the first controller, and play on.
+        connection.send(("stop", 0))
+        connection.recv()
+        print("arena0 controller unplugged at %.1fs." % server.runTime)
+        server.run(args.seconds / 2)
+        (arenaStats, lateFrames, frames) = (server.stats(), server.lateFrames, server.frames)
+        server.close()
+
+    connection.send(("quit", None))
+    fakeStats = connection.recv()
+    fakes.join()
+    printStats(arenaStats, lateFrames, frames)
+    print("Commands received by the fake Arduinos: %s" % [commands for (packetsSent, commands) in fakeStats])
+
+if __name__ == "__main__":
+    main()
+
+# EOF
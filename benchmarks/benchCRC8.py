@@ -0,0 +1,64 @@
+# Micro-benchmark: the original bit-loop calcCRC8 from Lesson17.py against the table-driven pong3d.crc8 engine.
+# Run from the repository root: python benchmarks/benchCRC8.py
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pong3d.crc8 import calcCRC8, checkCRC8Many, CRC8
+
+# The original Lesson17.py calcCRC8, literally the Arduino code translated...
+def calcCRC8BitLoop(data2Check = ""):
+    chksumCRC8 = 0
+    for character in data2Check:
+        dataByte = ord(character)
+        for bitCounter in range(8):
+            sum = ((dataByte ^ chksumCRC8) & 1)
+            chksumCRC8 >>= 1
+            if sum:
+                chksumCRC8 ^= 0x8c
+            dataByte >>= 1
+    return chksumCRC8
+
+# Typical traffic in both directions.
+joystickPacket = "1023,512,1"
+commandPacket = "LEDs=7,Beep=L150"
+# A batch of joystick packets, as would arrive over a few seconds.
+batchPackets = ["%d,%d,%d" % (x, (x * 7) % 1024, x & 1) for x in range(0, 1024, 4)]
+
+def main(repeats = 5, number = 20000):
+    # The engines must agree before their speed matters.
+    for packet in batchPackets + [joystickPacket, commandPacket, "", "123456789"]:
+        assert calcCRC8(packet) == calcCRC8(packet.encode()) == calcCRC8BitLoop(packet)
+    # Characters above 255 are checked by the low 8 bits of their code, as the original did.
+    assert calcCRC8("caf\u00e9 \u20ac\u2603") == calcCRC8BitLoop("caf\u00e9 \u20ac\u2603")
+    for packet in batchPackets + [joystickPacket, commandPacket]:
+        assert CRC8(packet[:3].encode()).update(packet[3:].encode()).value == calcCRC8BitLoop(packet)
+    assert calcCRC8("123456789") == 0xa1 # The CRC-8/MAXIM check value.
+    batchCRC8s = [calcCRC8BitLoop(packet) for packet in batchPackets]
+    assert checkCRC8Many([packet.encode() for packet in batchPackets], batchCRC8s) == [True] * len(batchPackets)
+
+    joystickBytes = joystickPacket.encode()
+    commandBytes = commandPacket.encode()
+    batchBytes = [packet.encode() for packet in batchPackets]
+    tests = [
+        ("bit loop, joystick str",    lambda: calcCRC8BitLoop(joystickPacket), 1),
+        ("table, joystick bytes",     lambda: calcCRC8(joystickBytes),         1),
+        ("bit loop, command str",     lambda: calcCRC8BitLoop(commandPacket),  1),
+        ("table, command bytes",      lambda: calcCRC8(commandBytes),          1),
+        ("bit loop, %d packets" % len(batchPackets), lambda: [calcCRC8BitLoop(packet) for packet in batchPackets], len(batchPackets)),
+        ("table, %d packets" % len(batchPackets),    lambda: [calcCRC8(packet) for packet in batchBytes],          len(batchPackets)),
+        ("checkCRC8Many, %d packets" % len(batchPackets), lambda: checkCRC8Many(batchBytes, batchCRC8s),          len(batchPackets)),
+    ]
+    print("%-28s %12s %14s" % ("Benchmark", "us/call", "packets/s"))
+    for name, function, packetCount in tests:
+        loops = max(1, number // packetCount)
+        best = min(timeit.repeat(function, repeat = repeats, number = loops)) / loops
+        print("%-28s %12.3f %14.0f" % (name, best * 1e6, packetCount / best))
+
+if __name__ == "__main__":
+    main()
+
+# EOF
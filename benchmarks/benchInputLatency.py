@@ -0,0 +1,99 @@
+# Benchmark: the end to end joystick latency, before and after the input stage filters, measured in simulated time.
+# A known stick movement goes through a model of the Arduino (a reading every 25ms, two averaged, sent every 50ms),
+# the serial link, and the input stage, and the bat position shown at each 100Hz frame is compared with where the stick really was.
+# The latency is the delay that best lines the two up, the error is how far off the bat is at render time,
+# and the jerk is how much the bat's frame to frame movement jumps about (lower is smoother).
+# Run from the repository root: python benchmarks/benchInputLatency.py [--seconds 60]
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pong3d.inputstage import InputStage, INPUT_FILTERS
+from pong3d.timing import FrameTimer
+
+READ_CYCLE_NS = 25000000   # The Arduino reads the joystick.
+SEND_CYCLE_NS = 50000000   # The Arduino sends the average of the last two readings.
+FRAME_CYCLE_NS = 10000000  # The game frame rate, 100Hz.
+
+# Where the stick really is (joystick units) at some times (ns): two sweeps, as a player chasing the ball might.
+def stickPosition(timeNs):
+    timeS = np.asarray(timeNs) / 1e9
+    return 512 + 300 * np.sin(2 * np.pi * 0.7 * timeS) + 150 * np.sin(2 * np.pi * 1.9 * timeS + 1)
+
+# The joystick samples as they arrive from the Arduino -> (arrival times, X values).
+def arduinoSamples(seconds, rng, serialDelayNs = 1000000, serialJitterNs = 2000000):
+    readTimes = np.arange(0, int(seconds * 1e9), READ_CYCLE_NS) + READ_CYCLE_NS // 2
+    readings = np.clip(np.round(stickPosition(readTimes) + rng.normal(0, 2, len(readTimes))), 0, 1023)
+    averages = (readings[1:] + readings[:-1]) // 2
+    sendTimes = np.arange(SEND_CYCLE_NS, int(seconds * 1e9), SEND_CYCLE_NS)
+    # Each send is the average of the two readings before it.
+    newestReading = np.searchsorted(readTimes, sendTimes, side = "right") - 1
+    arrivalTimes = sendTimes + serialDelayNs + rng.integers(0, serialJitterNs, len(sendTimes))
+    return (arrivalTimes, averages[newestReading - 1])
+
+# Plays back the Arduino samples as a JoystickReader would give them, in simulated time.
+class SimulatedJoystick():
+    def __init__(self, arrivalTimes, values):
+        self.arrivalTimes = arrivalTimes
+        self.values = values
+        self.timeNs = 0
+        self.takenSample = -1
+        self.takenTimeNs = 0
+
+    def sample(self):
+        newest = np.searchsorted(self.arrivalTimes, self.timeNs, side = "right") - 1
+        if newest != self.takenSample and newest >= 0:
+            self.takenSample = newest
+            self.takenTimeNs = int(self.arrivalTimes[newest])
+        return (int(self.values[max(newest, 0)]), 512, 1)
+
+    def takeSampleTime(self):
+        (takenTimeNs, self.takenTimeNs) = (self.takenTimeNs, 0)
+        return takenTimeNs
+
+    def takeButtonPresses(self):
+        return 0
+
+    def stats(self):
+        return {}
+
+def measure(filterName, arrivalTimes, values, seconds):
+    joystick = SimulatedJoystick(arrivalTimes, values)
+    frameTimer = FrameTimer(enabled = True, summaryInterval = 0)
+    inputStage = InputStage(joystick, filterName, frameTimer = frameTimer)
+    frameTimes = np.arange(SEND_CYCLE_NS * 2, int(seconds * 1e9), FRAME_CYCLE_NS)
+    shown = np.empty(len(frameTimes))
+    for (frame, frameTimeNs) in enumerate(frameTimes):
+        joystick.timeNs = frameTimeNs
+        shown[frame] = inputStage.sample(int(frameTimeNs))[0]
+    # The delay that best lines up the bat with the stick, to the nearest millisecond.
+    lags = np.arange(-50, 151) * 1000000
+    errors = [np.sqrt(np.mean((shown - stickPosition(frameTimes - lag)) ** 2)) for lag in lags]
+    jerk = np.sqrt(np.mean(np.diff(shown, 2) ** 2))
+    return {"latencyMs": lags[int(np.argmin(errors))] / 1e6,
+            "errorAtRender": errors[int(np.where(lags == 0)[0][0])],
+            "jerk": jerk,
+            "stickAgeMs": frameTimer.histograms["stickAge"].totalNs / max(frameTimer.histograms["stickAge"].count, 1) / 1e6}
+
+def main():
+    parser = argparse.ArgumentParser(description = "Joystick latency, before and after the input stage filters.")
+    parser.add_argument("--seconds", type = float, default = 60)
+    parser.add_argument("--seed", type = int, default = 17)
+    args = parser.parse_args()
+    (arrivalTimes, values) = arduinoSamples(args.seconds, np.random.default_rng(args.seed))
+    print("%-12s %13s %13s %14s %8s" % ("Filter", "Latency(ms)", "StickAge(ms)", "Error(units)", "Jerk"))
+    for filterName in INPUT_FILTERS:
+        result = measure(filterName, arrivalTimes, values, args.seconds)
+        print("%-12s %13.0f %13.1f %14.1f %8.2f" % (filterName, result["latencyMs"], result["stickAgeMs"], result["errorAtRender"], result["jerk"]))
+    print("Latency, error and jerk are measured against the real stick, after the filter. StickAge is the game's frame timer figure:")
+    print("the age of the newest reading when it is shown, before the filter.")
+
+if __name__ == "__main__":
+    main()
+
+# EOF
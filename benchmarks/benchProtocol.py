@@ -0,0 +1,74 @@
+# Benchmark: joystick packet parsing and wire bytes, ASCII CSV framing against binary framing.
+# Run from the repository root: python benchmarks/benchProtocol.py
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pong3d.crc8 import calcCRC8
+from pong3d.protocol import CSVPacketParser, BinaryPacketParser, CSVFraming, BinaryFraming, encodeJoystickPacket, encodeBinaryJoystickFrame
+
+# The serial line: 115200 baud, 8N1 -> 10 bits per byte.
+BAUD_RATE = 115200
+BYTES_PER_SECOND = BAUD_RATE / 10
+# The Arduino sends a joystick packet every JOB2CYCLE (0.05s).
+PACKETS_PER_SECOND = 20
+
+# The original Lesson17.py CSV parse: decode, strip, split, isdigit and int().
+def parseCSVStrings(arduinoDataPacket):
+    arduinoDataPacket = str(arduinoDataPacket, 'utf-8')
+    arduinoDataPacket = arduinoDataPacket.strip('\r\n')
+    (sensorData, chksumCRC8) = arduinoDataPacket.split("!")
+    if chksumCRC8.isdigit() and calcCRC8(sensorData) == int(chksumCRC8):
+        (jstkXValue, jstkYValue, jstkZValue) = sensorData.split(",")
+        return (int(jstkXValue), int(jstkYValue), int(jstkZValue))
+
+def main(packetCount = 1000, repeats = 9, number = 20):
+    samples = [(x, (x * 7) % 1024, x & 1) for x in range(packetCount)]
+    csvPackets = [encodeJoystickPacket(*sample) for sample in samples]
+    binaryFrames = [encodeBinaryJoystickFrame(*sample) for sample in samples]
+    csvStream = b"".join(csvPackets)
+    binaryStream = b"".join(binaryFrames)
+    # The parsers must agree before their speed matters.
+    assert [parseCSVStrings(packet) for packet in csvPackets] == samples
+    assert CSVPacketParser().feed(csvStream) == samples
+    assert BinaryPacketParser().feed(binaryStream) == samples
+
+    # One packet per call, as the game reads them.
+    def parseInPackets(parse, packets):
+        for packet in packets:
+            parse(packet)
+
+    def feedInPackets(parserClass, packets):
+        parseInPackets(parserClass().feed, packets)
+
+    # The game reads whatever has arrived, and at 20 packets a second that is nearly always one packet, so the
+    # per packet rows are the ones to compare with the original. The one read rows are a backlog after a stall.
+    tests = [
+        ("CSV strings (original)",   lambda: parseInPackets(parseCSVStrings, csvPackets)),
+        ("CSV parser, per packet",   lambda: feedInPackets(CSVPacketParser, csvPackets)),
+        ("Binary parser, per frame", lambda: feedInPackets(BinaryPacketParser, binaryFrames)),
+        ("CSV parser, one read",     lambda: CSVPacketParser().feed(csvStream)),
+        ("Binary parser, one read",  lambda: BinaryPacketParser().feed(binaryStream)),
+    ]
+    print("%-28s %12s %14s %14s" % ("Parse", "us/packet", "packets/s", "vs original"))
+    originalBest = None
+    for (name, function) in tests:
+        best = min(timeit.repeat(function, repeat = repeats, number = number)) / number / packetCount
+        originalBest = originalBest or best
+        print("%-28s %12.3f %14.0f %13.2fx" % (name, best * 1e6, 1 / best, originalBest / best))
+
+    print()
+    print("%-28s %12s %14s %14s" % ("Wire", "bytes/packet", "bytes/s @20Hz", "max packets/s"))
+    for (name, stream) in (("CSV", csvStream), ("Binary", binaryStream)):
+        bytesPerPacket = len(stream) / packetCount
+        print("%-28s %12.1f %14.0f %14.0f" % (name, bytesPerPacket, bytesPerPacket * PACKETS_PER_SECOND, BYTES_PER_SECOND / bytesPerPacket))
+    print("%-28s %12d %14s %14s" % ("CSV command (LEDs+Beep)", len(CSVFraming().encodeCommand(7, "L", 150)), "", ""))
+    print("%-28s %12d %14s %14s" % ("Binary command (LEDs+Beep)", len(BinaryFraming().encodeCommand(7, "L", 150)), "", ""))
+
+if __name__ == "__main__":
+    main()
+
+# EOF
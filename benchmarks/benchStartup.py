@@ -0,0 +1,37 @@
+# Benchmark: headless cold start, from running python to the first game frame (and exit).
+# Each case is a fresh python process, and the best of a few runs is kept, so the disk cache is warm but nothing else is.
+# Run from the repository root: python benchmarks/benchStartup.py
+
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CASES = (("python, nothing else", ["-c", "pass"]),
+         ("import numpy", ["-c", "import numpy"]),
+         ("import pong3d.game", ["-c", "import pong3d.game"]),
+         ("headless, first frame", ["-m", "pong3d", "--headless", "--no-serial", "--frames", "1"]))
+
+def coldStart(args, repeats = 5):
+    bestTime = None
+    for repeat in range(repeats):
+        startTime = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd = REPO_ROOT, stdout = subprocess.DEVNULL, check = True)
+        runTime = time.perf_counter() - startTime
+        bestTime = runTime if bestTime is None else min(bestTime, runTime)
+    return bestTime
+
+def main():
+    for (name, args) in CASES:
+        print("%-24s %7.1fms" % (name, coldStart(args) * 1000))
+    # vpython must never be imported by a headless game.
+    check = subprocess.run([sys.executable, "-c", "import sys, pong3d.game; print('vpython' in sys.modules or 'serial' in sys.modules)"],
+                           cwd = REPO_ROOT, capture_output = True, text = True, check = True)
+    print("vpython or pyserial imported by pong3d.game: %s" % check.stdout.strip())
+
+if __name__ == "__main__":
+    main()
+
+# EOF
@@ -0,0 +1,333 @@
+# The benchmark suite: CRC8, packet parsing, the serial reader, zone selection, bat bounds and whole game frames.
+# Every benchmark is headless and uses a fixed seed, so runs can be compared. Each one reports a throughput
+# and, where it times single operations, the tail latency (p50/p99/p99.9/max) - a 60-100Hz game cares about the tail.
+# Run from the repository root:
+#   python benchmarks/runBenchmarks.py                   -> run everything, save to benchmarks/results/<date-time>.json
+#   python benchmarks/runBenchmarks.py --name baseline    -> save to benchmarks/results/baseline.json
+#   python benchmarks/runBenchmarks.py --only zones       -> only the benchmarks whose names start with "zones"
+#   python benchmarks/runBenchmarks.py --compare benchmarks/results/baseline.json benchmarks/results/new.json
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pong3d.crc8 import calcCRC8
+from pong3d.protocol import CSVPacketParser, BinaryPacketParser, BinaryFraming, encodeJoystickPacket, encodeBinaryJoystickFrame
+from pong3d.serialio import JoystickReader, CommandWriter
+from pong3d.fakearduino import MemorySerial
+from pong3d.zones import buildZones
+from pong3d.balls import BallManager
+from pong3d.physics import BatchPhysics, trackingJoystick, batOffset, batHits
+from pong3d.game import Game, GameSettings, HeadlessRenderer, Bat
+
+from benchCRC8 import calcCRC8BitLoop
+from benchProtocol import parseCSVStrings
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# The game settings, as in Lesson17.py.
+ZONE_SIZE = 10
+BALL_RADIUS = 0.05 * ZONE_SIZE
+SEED = 17
+# The Arduino sends 20 joystick packets a second, so at 100 frames a second there is a new one every 5 frames.
+FRAMES_PER_PACKET = 5
+
+# Time each call of function(), and work out the throughput and tail latency.
+def measure(function, iterations, unitsPerCall = 1, unit = "calls"):
+    timesNs = np.empty(iterations, dtype = np.int64)
+    perfCounterNs = time.perf_counter_ns
+    for iteration in range(iterations):
+        startNs = perfCounterNs()
+        function()
+        timesNs[iteration] = perfCounterNs() - startNs
+    return latencyResult(timesNs, unitsPerCall, unit)
+
+def latencyResult(timesNs, unitsPerCall = 1, unit = "calls"):
+    (p50, p99, p999) = np.percentile(timesNs, (50, 99, 99.9)) / 1000
+    return {"unit": unit,
+            "count": int(len(timesNs) * unitsPerCall),
+            "perSecond": len(timesNs) * unitsPerCall / (timesNs.sum() / 1e9),
+            "p50Us": p50, "p99Us": p99, "p999Us": p999,
+            "maxUs": timesNs.max() / 1000}
+
+# Repeatable joystick samples.
+def joystickSamples(count, seed = SEED):
+    rng = np.random.default_rng(seed)
+    return [(int(x), int(y), int(z)) for (x, y, z) in zip(rng.integers(0, 1024, count), rng.integers(0, 1024, count), rng.integers(0, 2, count))]
+
+###
+# CRC8.
+###
+
+def benchCRC8(scale):
+    packets = [encodeJoystickPacket(*sample).split(b"!")[0] for sample in joystickSamples(256)]
+    packetStrings = [packet.decode() for packet in packets]
+    iterations = int(20000 * scale)
+    results = {}
+    cycle = iter(range(1 << 62))
+    results["crc8.bitLoop"] = measure(lambda: calcCRC8BitLoop(packetStrings[next(cycle) & 255]), iterations, unit = "packets")
+    results["crc8.table"] = measure(lambda: calcCRC8(packets[next(cycle) & 255]), iterations, unit = "packets")
+    return results
+
+###
+# Packet parsing: one packet per feed, as the reader mostly sees them at 20 packets per second.
+###
+
+def benchParse(scale):
+    samples = joystickSamples(1024)
+    csvPackets = [encodeJoystickPacket(*sample) for sample in samples]
+    binaryPackets = [encodeBinaryJoystickFrame(*sample) for sample in samples]
+    iterations = int(20000 * scale)
+    csvParser = CSVPacketParser()
+    binaryParser = BinaryPacketParser()
+    results = {}
+    cycle = iter(range(1 << 62))
+    results["parse.csvStrings"] = measure(lambda: parseCSVStrings(csvPackets[next(cycle) & 1023]), iterations, unit = "packets")
+    results["parse.csv"] = measure(lambda: csvParser.feed(csvPackets[next(cycle) & 1023]), iterations, unit = "packets")
+    results["parse.binary"] = measure(lambda: binaryParser.feed(binaryPackets[next(cycle) & 1023]), iterations, unit = "packets")
+    assert csvParser.corruptFrames == binaryParser.corruptFrames == 0
+    return results
+
+###
+# The serial reader thread, end to end: bytes from a fake serial port to published samples.
+# A throughput only - the reader is a thread, so there are no single operations to time.
+###
+
+def readerThroughput(data, packetCount, parser):
+    reader = JoystickReader(MemorySerial(data), parser)
+    startNs = time.perf_counter_ns()
+    reader.start()
+    while reader.goodFrames < packetCount and reader.is_alive():
+        time.sleep(0.001)
+    runNs = time.perf_counter_ns() - startNs
+    reader.stop()
+    assert reader.goodFrames == packetCount and reader.corruptFrames == 0
+    return {"unit": "packets", "count": packetCount, "perSecond": packetCount / (runNs / 1e9)}
+
+def benchReader(scale):
+    samples = joystickSamples(int(50000 * scale))
+    results = {}
+    results["reader.csv"] = readerThroughput(b"".join(encodeJoystickPacket(*sample) for sample in samples), len(samples), CSVPacketParser())
+    results["reader.binary"] = readerThroughput(b"".join(encodeBinaryJoystickFrame(*sample) for sample in samples), len(samples), BinaryPacketParser())
+    return results
+
+###
+# Zone selection: where is the ball going, and which boundaries apply?
+###
+
+def benchZones(scale):
+    zones = buildZones(ZONE_SIZE)
+    # Ball positions and changes from a real game, so the checks see the same mix of zones and corners.
+    balls = BallManager(zones, 64, BALL_RADIUS, zones.centres[zones.indexOf("7")])
+    balls.reset(np.random.default_rng(SEED))
+    positions = []
+    for frame in range(1024):
+        balls.locate()
+        positions.append((balls.pos.copy(), balls.change.copy()))
+        balls.move([0, 0, 0, 0])
+    scalarCases = [(pos[0].tolist(), change[0].tolist()) for (pos, change) in positions]
+    iterations = int(20000 * scale)
+    results = {}
+    cycle = iter(range(1 << 62))
+    def registry():
+        (pos, change) = scalarCases[next(cycle) & 1023]
+        return zones.boundsList[zones.locate(pos, change, BALL_RADIUS)]
+    def registryMany():
+        (pos, change) = positions[next(cycle) & 1023]
+        return zones.bounds[zones.locateMany(pos, change, BALL_RADIUS)]
+    results["zones.locate"] = measure(registry, iterations, unit = "balls")
+    results["zones.locateMany64"] = measure(registryMany, max(iterations // 16, 10), 64, unit = "balls")
+    return results
+
+###
+# Bat bounds: the joystick to bat position to hit box maths done every frame.
+###
+
+def benchBats(scale):
+    samples = joystickSamples(1024)
+    batSize = ZONE_SIZE / 2
+    batMoveScaler = ZONE_SIZE - batSize
+    bat = Bat((-ZONE_SIZE, 0, 1.5 * ZONE_SIZE), batSize)
+    iterations = int(20000 * scale)
+    results = {}
+    cycle = iter(range(1 << 62))
+    def updatePos():
+        (jstkXValue, jstkYValue, jstkZValue) = samples[next(cycle) & 1023]
+        bat.updatePos(batOffset(jstkXValue, batMoveScaler), batOffset(jstkYValue, batMoveScaler), batSize)
+    results["bats.updatePos"] = measure(updatePos, iterations, unit = "bats")
+    # The batch physics hit test, for 1024 games at once.
+    rng = np.random.default_rng(SEED)
+    pos = (rng.random((1024, 3)) - 0.5) * ZONE_SIZE
+    batPos = (rng.random((1024, 2)) - 0.5) * batMoveScaler
+    batSizes = np.full(1024, batSize)
+    results["bats.batHits1024"] = measure(lambda: batHits(pos, batPos, batSizes), max(iterations // 16, 10), 1024, unit = "bats")
+    return results
+
+###
+# Whole frames: the game's own frame loop, headless and unpaced - joystick sample, bat move, zones, balls, hits and commands.
+###
+
+# The joystick for the benchmark games. The stick follows the first ball, as a player would, so the games go on.
+# The samples are encoded as the Arduino sends them, into an in-memory serial port, and a JoystickReader that is not started
+# reads the port each frame, as the arena server does - so the frames include the parse, but do not wait on a thread.
+class FollowingJoystick():
+    def __init__(self, game):
+        self.game = game
+        self.arduinoDataStream = MemorySerial(bytearray())
+        self.joystickReader = JoystickReader(self.arduinoDataStream, BinaryPacketParser())
+        self.jstkZValue = 1
+        self.frames = 0
+
+    # The Arduino's side: a new packet every FRAMES_PER_PACKET frames.
+    def sendPacket(self):
+        game = self.game
+        (ballX, ballY) = game.balls.pos[0, :2].tolist()
+        wantedBat = int(ballX > 0)
+        bat = game.bats[wantedBat]
+        jstkXValue = min(max(int(((ballX - bat.centerPos[0]) / game.batMoveScaler + 0.5) * 1024), 0), 1023)
+        jstkYValue = min(max(int(((ballY - bat.centerPos[1]) / game.batMoveScaler + 0.5) * 1024), 0), 1023)
+        # Press the button to swap bats, then let it go.
+        self.jstkZValue = 0 if wantedBat != game.batInUse and self.jstkZValue != 0 else 1
+        self.arduinoDataStream.data += encodeBinaryJoystickFrame(jstkXValue, jstkYValue, self.jstkZValue)
+
+    def sample(self):
+        if self.frames % FRAMES_PER_PACKET == 0:
+            self.sendPacket()
+        self.frames += 1
+        arduinoDataStream = self.arduinoDataStream
+        if arduinoDataStream.in_waiting:
+            self.joystickReader.feed(arduinoDataStream.read(arduinoDataStream.in_waiting))
+        return self.joystickReader.sample()
+
+    def takeButtonPresses(self):
+        return self.joystickReader.takeButtonPresses()
+
+    def takeSampleTime(self):
+        return self.joystickReader.takeSampleTime()
+
+    def stats(self):
+        return self.joystickReader.stats()
+
+def gameFrames(ballCount, frameCount, physicsRate):
+    settings = GameSettings()
+    settings.serialPort = None
+    settings.headless = True
+    settings.verbose = False
+    settings.ballCount = ballCount
+    settings.physicsRate = physicsRate
+    settings.randomSeed = SEED
+    # A command writer that is never started: send() only merges, as it does in the game loop.
+    game = Game(settings, commandWriter = CommandWriter(MemorySerial(), BinaryFraming()), renderer = HeadlessRenderer(paced = False))
+    # Unpaced, so each frame moves the physics on one frame time, as a paced frame would.
+    game.fixedFrameTimes = True
+    game.joystick = FollowingJoystick(game)
+    timesNs = np.empty(frameCount, dtype = np.int64)
+    perfCounterNs = time.perf_counter_ns
+    game.newGame()
+    for frame in range(frameCount):
+        startNs = perfCounterNs()
+        if game.frame():
+            # Game over, start the next one.
+            game.endGame()
+            game.newGame()
+        timesNs[frame] = perfCounterNs() - startNs
+    assert game.joystick.stats()["corruptFrames"] == 0
+    return latencyResult(timesNs, unit = "frames")
+
+def benchFrames(scale):
+    frameCount = int(20000 * scale)
+    results = {}
+    # The game's own physics, 1kHz fixed time steps with swept collisions, and the original one move per frame.
+    results["frames.game1Ball"] = gameFrames(1, frameCount, 1000)
+    results["frames.game16Balls"] = gameFrames(16, frameCount, 1000)
+    results["frames.game1BallDiscrete"] = gameFrames(1, frameCount, 0)
+    # The batch physics engine, 256 games per step.
+    physics = BatchPhysics(256, ZONE_SIZE, seed = SEED)
+    results["frames.batch256Games"] = measure(lambda: physics.step(*trackingJoystick(physics)), max(frameCount // 20, 10), 256, unit = "frames")
+    # The same, with 1kHz fixed time step physics and swept collisions.
+    physics = BatchPhysics(256, ZONE_SIZE, seed = SEED, physicsRate = 1000)
+    results["frames.batch256GamesSwept"] = measure(lambda: physics.step(*trackingJoystick(physics)), max(frameCount // 20, 10), 256, unit = "frames")
+    return results
+
+BENCHMARKS = {"crc8": benchCRC8, "parse": benchParse, "reader": benchReader, "zones": benchZones, "bats": benchBats, "frames": benchFrames}
+
+###
+# Results: saved as JSON, with enough about the machine to know if two runs can be compared.
+###
+
+def runBenchmarks(only = None, scale = 1.0):
+    results = {}
+    for (group, benchmark) in BENCHMARKS.items():
+        if only and not any(group.startswith(name) or name.startswith(group) for name in only):
+            continue
+        for (name, result) in benchmark(scale).items():
+            if only and not any(name.startswith(wanted) for wanted in only):
+                continue
+            results[name] = result
+            printResult(name, result)
+    return results
+
+def printResult(name, result):
+    line = "%-24s %12.0f %s/s" % (name, result["perSecond"], result["unit"])
+    if "p99Us" in result:
+        line += "   p50 %8.2fus  p99 %8.2fus  p99.9 %8.2fus  max %9.2fus" % (result["p50Us"], result["p99Us"], result["p999Us"], result["maxUs"])
+    print(line)
+
+def saveResults(results, name, scale):
+    os.makedirs(RESULTS_DIR, exist_ok = True)
+    path = os.path.join(RESULTS_DIR, name + ".json")
+    with open(path, "w") as resultsFile:
+        json.dump({"name": name,
+                   "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                   "scale": scale,
+                   "python": platform.python_version(),
+                   "numpy": np.__version__,
+                   "machine": platform.machine(),
+                   "platform": platform.platform(),
+                   "results": results}, resultsFile, indent = 1)
+    return path
+
+# Compare two saved runs: throughput ratios above 1 and p99 ratios below 1 are the new run doing better.
+def compareResults(oldPath, newPath):
+    with open(oldPath) as oldFile, open(newPath) as newFile:
+        (old, new) = (json.load(oldFile), json.load(newFile))
+    print("%s (%s) -> %s (%s)" % (old["name"], old["created"], new["name"], new["created"]))
+    if (old["python"], old["numpy"], old["platform"]) != (new["python"], new["numpy"], new["platform"]):
+        print("Warning: the runs were on different platforms or versions, the ratios may not mean much.")
+    print("%-24s %14s %14s %8s %10s %10s %8s" % ("", "old /s", "new /s", "ratio", "old p99", "new p99", "ratio"))
+    for name in sorted(set(old["results"]) | set(new["results"])):
+        (oldResult, newResult) = (old["results"].get(name), new["results"].get(name))
+        if oldResult is None or newResult is None:
+            print("%-24s only in the %s run" % (name, "new" if oldResult is None else "old"))
+            continue
+        line = "%-24s %14.0f %14.0f %7.2fx" % (name, oldResult["perSecond"], newResult["perSecond"], newResult["perSecond"] / oldResult["perSecond"])
+        if "p99Us" in oldResult and "p99Us" in newResult:
+            line += " %8.2fus %8.2fus %7.2fx" % (oldResult["p99Us"], newResult["p99Us"], newResult["p99Us"] / oldResult["p99Us"])
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description = "3D Pong benchmark suite.")
+    parser.add_argument("--name", default = time.strftime("%Y%m%d-%H%M%S"), help = "the results file name, in benchmarks/results")
+    parser.add_argument("--only", nargs = "+", help = "only run the benchmarks whose names start with these")
+    parser.add_argument("--scale", type = float, default = 1.0, help = "scale the iteration counts, e.g. 0.1 for a quick run")
+    parser.add_argument("--no-save", action = "store_true", help = "do not save the results")
+    parser.add_argument("--compare", nargs = 2, metavar = ("OLD", "NEW"), help = "compare two saved results files, and do not run anything")
+    args = parser.parse_args()
+    if args.compare:
+        compareResults(*args.compare)
+        return
+    results = runBenchmarks(args.only, args.scale)
+    if not args.no_save:
+        print("Saved to %s" % saveResults(results, args.name, args.scale))
+
+if __name__ == "__main__":
+    main()
+
+# EOF
@@ -0,0 +1,99 @@
+# Soak test: the computer plays game after game, headless, with the bats shrunk as small as they go, for as long as you like.
+# Every window it prints the frame times (are they stable?) and the memory in use (is it growing?), then a summary at the end.
+# By default the game time runs as fast as it can: each frame moves the physics on one frame time, with no waiting.
+# With --real-time the frames are paced, as in a real game, and the frame times include the wait.
+# Run from the repository root: python benchmarks/soakAutoplay.py --minutes 120 [--real-time] [--tracemalloc]
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pong3d.autoplay import AutoPlayer
+from pong3d.game import Game, GameSettings, HeadlessRenderer
+from pong3d.physics import BAT_SHRINK_HITS
+from pong3d.timing import Histogram
+
+# The memory the process is using now (MB). Linux has it in /proc, elsewhere the peak will do.
+def residentMB():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+def main():
+    parser = argparse.ArgumentParser(description = "Autoplay soak test.")
+    parser.add_argument("--minutes", type = float, default = 5, help = "how long to run, wall clock (default %(default)s)")
+    parser.add_argument("--window", type = float, default = 30, help = "seconds between reports (default %(default)s)")
+    parser.add_argument("--real-time", action = "store_true", help = "pace the frames, as in a real game")
+    parser.add_argument("--balls", type = int, default = 1)
+    parser.add_argument("--physics-rate", type = int, default = 1000)
+    parser.add_argument("--speed", type = float, default = 1.0)
+    parser.add_argument("--bat-shrinks", type = int, default = BAT_SHRINK_HITS - 1, help = "start with the bats shrunk (default %(default)s, the smallest)")
+    parser.add_argument("--tracemalloc", action = "store_true", help = "also count the Python allocations (slower frames)")
+    args = parser.parse_args()
+
+    settings = GameSettings()
+    settings.serialPort = None
+    settings.headless = True
+    settings.verbose = False
+    settings.ballCount = args.balls
+    settings.physicsRate = args.physics_rate
+    settings.ballSpeedScale = args.speed
+    settings.startBatShrinks = args.bat_shrinks
+    game = Game(settings, renderer = HeadlessRenderer(paced = args.real_time))
+    # Without pacing, each frame is one frame time of game time.
+    game.fixedFrameTimes = not args.real_time
+    autoPlayer = game.joystick = AutoPlayer(game)
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    print("%8s %9s %9s %7s %8s %8s %8s %8s %9s %8s %10s" % ("Wall s", "Frames", "Game min", "Games", "Hits/gm", "p50us", "p99us", "maxus",
+                                                          "Frames/s", "RSS MB", "Traced KB"))
+    windowHistogram = Histogram()
+    (games, hits) = (0, 0)
+    windows = []
+    startTime = windowStart = time.perf_counter()
+    endTime = startTime + args.minutes * 60
+    windowFrames = 0
+    game.newGame()
+    while True:
+        frameStartNs = time.perf_counter_ns()
+        if game.frame():
+            games += 1
+            hits += game.hitCounter
+            game.endGame()
+            game.newGame()
+        windowHistogram.add(time.perf_counter_ns() - frameStartNs)
+        windowFrames += 1
+        timeNow = time.perf_counter()
+        if timeNow - windowStart >= args.window or timeNow >= endTime:
+            summary = windowHistogram.summary()
+            tracedKB = tracemalloc.get_traced_memory()[0] / 1e3 if args.tracemalloc else 0
+            window = (timeNow - startTime, game.frameNumber, game.frameNumber / game.frameRate / 60, games,
+                      (hits + game.hitCounter) / (games + 1), summary["p50Us"], summary["p99Us"], summary["maxUs"], windowFrames / (timeNow - windowStart),
+                      residentMB(), tracedKB)
+            windows.append(window)
+            print("%8.0f %9d %9.1f %7d %8.1f %8.0f %8.0f %8.0f %9.0f %8.1f %10.1f" % window)
+            windowHistogram.reset()
+            windowStart = timeNow
+            windowFrames = 0
+            if timeNow >= endTime:
+                break
+
+    # Stable? Compare the first and last windows.
+    (first, last) = (windows[0], windows[-1])
+    print("Frame p99: first window %.0fus, last window %.0fus. Worst frame: %.0fus." % (first[6], last[6], max(window[7] for window in windows)))
+    print("Memory: %.1fMB -> %.1fMB (%+.2fMB)." % (first[9], last[9], last[9] - first[9]) +
+          (" Traced: %.1fKB -> %.1fKB." % (first[10], last[10]) if args.tracemalloc else ""))
+    print("Autoplayer: %(predictions)d predictions, %(cacheHits)d from the cache, p99 %(predictP99Us).0fus each." % autoPlayer.stats())
+
+if __name__ == "__main__":
+    main()
+
+# EOF
@@ -0,0 +1,2 @@
+# Using an Arduino with Python LESSON 17: Controlling Paddle Position with a Joystick.
+# The reusable, rendering-independent parts of the 3D Pong game.
@@ -0,0 +1,7 @@
+# python -m pong3d -> play the game. python -m pong3d --help for the settings.
+
+from pong3d.game import main
+
+main()
+
+# EOF
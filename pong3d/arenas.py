@@ -0,0 +1,309 @@
+# Many game arenas, one per Arduino controller, all played in one process -> python -m pong3d.arenas --ports ...
+# One selectors loop reads every serial port as its data arrives, and plays a frame of every arena at the frame rate.
+# Nothing ever waits on a port: a controller that goes quiet or is unplugged is dropped, and retried now and then,
+# while the other arenas play on. The arenas are headless. For more arenas than one core can play, use --processes.
+
+import argparse
+import multiprocessing
+import os
+import selectors
+import time
+
+import serial
+
+from pong3d.game import Game, GameSettings, HeadlessRenderer
+from pong3d.inputstage import createInputStage
+from pong3d.protocol import CSVPacketParser, BinaryPacketParser, CSVFraming, BinaryFraming, BINARY_MODE_COMMAND
+from pong3d.serialio import JoystickReader, CommandWriter
+from pong3d.timing import Histogram
+
+# How long a controller can send nothing before it is dropped, and how long to wait before trying it again (seconds).
+QUIET_TIMEOUT = 1.0
+RECONNECT_INTERVAL = 1.0
+# How long to wait for binary frames after asking for them. The Arduino only parses commands every JOB3CYCLE (0.2s).
+NEGOTIATE_TIMEOUT = 0.5
+
+# Writes to a port without ever waiting. pyserial's write, with write_timeout 0, goes round and round until the port takes
+# something, so a controller that has stopped reading would hold up every arena. This takes what the port will take now, maybe
+# nothing, and the CommandWriter keeps the rest for next time.
+class NonBlockingWriter():
+    def __init__(self, arduinoDataStream):
+        self.fd = arduinoDataStream.fileno()
+
+    def write(self, data):
+        try:
+            return os.write(self.fd, data)
+        except BlockingIOError:
+            return 0
+
+# One arena: a game, and the controller that plays it. Each arena keeps its own stats, and its own serial troubles.
+class Arena():
+    def __init__(self, name, port, settings, baudRate = 115200):
+        self.name = name
+        self.port = port
+        self.baudRate = baudRate
+        self.binary = settings.serialBinaryFraming
+        self.arduinoDataStream = None
+        self.joystickReader = None # Only once the framing is agreed. The reader and writer are not started - the loop drives them.
+        self.commandWriter = None
+        self.framing = None
+        self.negotiation = None    # While the framing is agreed -> (CSV parser, binary parser, deadline).
+        self.lastDataTime = 0
+        self.nextConnectTime = 0
+        # The game, with nothing to show and no pacing - the loop keeps the time.
+        self.game = Game(settings, renderer = HeadlessRenderer(paced = False))
+        self.game.newGame()
+        self.tickHistogram = Histogram()
+        self.games = self.hits = 0
+        self.connects = self.disconnects = 0
+        # Serial stats from earlier connections.
+        self.goodFrames = self.corruptFrames = self.sentCommands = self.serialErrors = 0
+
+    @property
+    def connected(self):
+        return self.joystickReader is not None
+
+    # Open the port and ask for binary framing. No waiting here: the answer turns up in onReadable().
+    def connect(self, selector, timeNow):
+        try:
+            # Non-blocking reads and writes, so one slow controller can not hold up the loop.
+            self.arduinoDataStream = serial.Serial(self.port, self.baudRate, timeout = 0, write_timeout = 0)
+        except (serial.SerialException, OSError):
+            self.nextConnectTime = timeNow + RECONNECT_INTERVAL
+            return False
+        self.connects += 1
+        self.lastDataTime = timeNow
+        self.negotiation = (CSVPacketParser(), BinaryPacketParser(), timeNow + NEGOTIATE_TIMEOUT)
+        if self.binary:
+            try:
+                NonBlockingWriter(self.arduinoDataStream).write(BINARY_MODE_COMMAND)
+            except (serial.SerialException, OSError):
+                self.serialErrors += 1
+        selector.register(self.arduinoDataStream.fileno(), selectors.EVENT_READ, self)
+        return True
+
+    # Framing agreed: start reading the joystick with the parser that found it, and send it the samples already found.
+    def startReading(self, framing, parser, samples):
+        self.framing = framing
+        self.negotiation = None
+        self.joystickReader = JoystickReader(self.arduinoDataStream, parser)
+        for sample in samples:
+            self.joystickReader.publish(*sample)
+        self.commandWriter = CommandWriter(NonBlockingWriter(self.arduinoDataStream), framing)
+        self.game.joystick = createInputStage(self.joystickReader, self.game.settings)
+        self.game.commandWriter = self.commandWriter
+
+    def disconnect(self, selector, timeNow):
+        if self.arduinoDataStream is None:
+            return
+        selector.unregister(self.arduinoDataStream.fileno())
+        try:
+            self.arduinoDataStream.close()
+        except (serial.SerialException, OSError):
+            pass
+        if self.joystickReader is not None:
+            self.goodFrames += self.joystickReader.goodFrames
+            self.corruptFrames += self.joystickReader.corruptFrames
+            self.serialErrors += self.joystickReader.serialErrors + self.commandWriter.serialErrors
+            self.sentCommands += self.commandWriter.sentCommands
+        self.arduinoDataStream = self.joystickReader = self.commandWriter = self.framing = self.negotiation = None
+        # Play on with the joystick centred until the controller is back.
+        self.game.joystick = self.game.commandWriter = None
+        self.disconnects += 1
+        self.nextConnectTime = timeNow + RECONNECT_INTERVAL
+
+    # The port has data (or has gone away).
+    def onReadable(self, selector, timeNow):
+        try:
+            data = self.arduinoDataStream.read(max(1, self.arduinoDataStream.in_waiting))
+        except (serial.SerialException, OSError):
+            self.serialErrors += 1
+            self.disconnect(selector, timeNow)
+            return
+        self.lastDataTime = timeNow
+        if self.joystickReader is not None:
+            self.joystickReader.feed(data)
+            return
+        # Still agreeing the framing. Binary joystick frames mean the Arduino has switched.
+        (csvParser, binaryParser, deadline) = self.negotiation
+        csvSamples = csvParser.feed(data)
+        binarySamples = binaryParser.feed(data)
+        if binarySamples:
+            self.startReading(BinaryFraming(), binaryParser, binarySamples)
+        elif not self.binary:
+            self.startReading(CSVFraming(), csvParser, csvSamples)
+
+    # Once a frame: drop a quiet controller, retry a dropped one, and give up waiting for binary framing.
+    def checkConnection(self, selector, timeNow):
+        if self.arduinoDataStream is None:
+            if timeNow >= self.nextConnectTime:
+                self.connect(selector, timeNow)
+        elif timeNow - self.lastDataTime > QUIET_TIMEOUT:
+            self.disconnect(selector, timeNow)
+        elif self.negotiation is not None and timeNow > self.negotiation[2]:
+            # Older firmware ignores the request. Carry on with ASCII CSV.
+            self.startReading(CSVFraming(), self.negotiation[0], [])
+
+    # Play a frame, and write the next command if the Arduino is ready for it.
+    def tick(self):
+        tickStartNs = time.perf_counter_ns()
+        game = self.game
+        if game.gameOver:
+            self.games += 1
+            self.hits += game.hitCounter
+            game.endGame()
+            game.newGame()
+        game.frame()
+        if self.commandWriter is not None:
+            self.commandWriter.poll()
+        self.tickHistogram.add(time.perf_counter_ns() - tickStartNs)
+
+    def stats(self):
+        joystickReader = self.joystickReader
+        commandWriter = self.commandWriter
+        tickSummary = self.tickHistogram.summary()
+        return {"name": self.name,
+                "port": self.port,
+                "framing": self.framing.name if self.framing is not None else "-",
+                "frames": self.game.frameNumber,
+                "games": self.games,
+                "hits": self.hits + self.game.hitCounter,
+                "goodFrames": self.goodFrames + (joystickReader.goodFrames if joystickReader is not None else 0),
+                "corruptFrames": self.corruptFrames + (joystickReader.corruptFrames if joystickReader is not None else 0),
+                "sentCommands": self.sentCommands + (commandWriter.sentCommands if commandWriter is not None else 0),
+                "connects": self.connects,
+                "disconnects": self.disconnects,
+                "tickP50Us": tickSummary["p50Us"],
+                "tickP99Us": tickSummary["p99Us"],
+                "tickMaxUs": tickSummary["maxUs"]}
+
+    def close(self, selector):
+        self.disconnect(selector, time.perf_counter())
+        self.game.close()
+
+# Plays all the arenas: a frame of each, every frame, reading the ports between frames as their data arrives.
+class ArenaServer():
+    def __init__(self, arenas, frameRate = 100):
+        self.arenas = arenas
+        self.frameRate = frameRate
+        self.selector = selectors.DefaultSelector()
+        self.frames = 0
+        self.lateFrames = 0 # Frames that ended after the next one was due.
+        self.runTime = 0
+
+    # Play for this many seconds (None = until Ctrl-C). Can be called again to play on.
+    def run(self, seconds = None):
+        selector = self.selector
+        frameTime = 1 / self.frameRate
+        startTime = nextFrameTime = time.perf_counter()
+        endTime = startTime + seconds if seconds is not None else None
+        try:
+            while endTime is None or nextFrameTime < endTime:
+                # Read the ports until the next frame is due.
+                timeNow = time.perf_counter()
+                for (key, events) in selector.select(max(0, nextFrameTime - timeNow)):
+                    key.data.onReadable(selector, time.perf_counter())
+                timeNow = time.perf_counter()
+                if timeNow < nextFrameTime:
+                    continue
+                for arena in self.arenas:
+                    arena.checkConnection(selector, timeNow)
+                    arena.tick()
+                self.frames += 1
+                nextFrameTime += frameTime
+                # Late? If more than a frame behind, start again from now, rather than rushing to catch up.
+                timeNow = time.perf_counter()
+                if timeNow > nextFrameTime:
+                    self.lateFrames += 1
+                    if timeNow > nextFrameTime + frameTime:
+                        nextFrameTime = timeNow
+        except KeyboardInterrupt:
+            pass
+        self.runTime += time.perf_counter() - startTime
+
+    def stats(self):
+        arenaStats = [arena.stats() for arena in self.arenas]
+        for stats in arenaStats:
+            stats["framesPerSecond"] = stats["frames"] / self.runTime if self.runTime else 0
+        return arenaStats
+
+    def close(self):
+        for arena in self.arenas:
+            arena.close(self.selector)
+        self.selector.close()
+
+# The settings for an arena: headless, quiet, and straight on to the next game.
+def arenaSettings(ballCount = 1, binary = True):
+    settings = GameSettings()
+    settings.serialPort = None
+    settings.serialBinaryFraming = binary
+    settings.headless = True
+    settings.verbose = False
+    settings.autoRestart = True
+    settings.ballCount = ballCount
+    return settings
+
+def printStats(arenaStats, lateFrames = 0, frames = 0):
+    print("%-8s %-14s %-6s %7s %6s %5s %5s %7s %6s %6s %5s %8s %8s %8s" % ("Arena", "Port", "Frame", "Frames", "Rate", "Games", "Hits",
+                                                                           "Good", "CRC", "Cmds", "Drops", "p50us", "p99us", "maxus"))
+    for stats in arenaStats:
+        print("%(name)-8s %(port)-14.14s %(framing)-6s %(frames)7d %(framesPerSecond)6.1f %(games)5d %(hits)5d %(goodFrames)7d "
+              "%(corruptFrames)6d %(sentCommands)6d %(disconnects)5d %(tickP50Us)8.0f %(tickP99Us)8.0f %(tickMaxUs)8.0f" % stats)
+    if frames:
+        print("Late frames: %d of %d" % (lateFrames, frames))
+
+# Play a group of arenas in this process -> (arena stats, late frames, frames).
+def runArenas(ports, firstArena = 0, seconds = None, frameRate = 100, ballCount = 1, binary = True, baudRate = 115200):
+    settings = arenaSettings(ballCount, binary)
+    arenas = [Arena("arena%d" % (firstArena + arenaIndex), port, settings, baudRate) for (arenaIndex, port) in enumerate(ports)]
+    server = ArenaServer(arenas, frameRate)
+    try:
+        server.run(seconds)
+        return (server.stats(), server.lateFrames, server.frames)
+    finally:
+        server.close()
+
+def runArenaGroup(resultQueue, *args):
+    resultQueue.put(runArenas(*args))
+
+# Spread the arenas across processes, each with its own loop -> (arena stats, late frames, frames), all added up.
+def runArenaProcesses(ports, processes, seconds = None, frameRate = 100, ballCount = 1, binary = True, baudRate = 115200):
+    if processes <= 1:
+        return runArenas(ports, 0, seconds, frameRate, ballCount, binary, baudRate)
+    resultQueue = multiprocessing.Queue()
+    groupSize = -(-len(ports) // processes)
+    groups = []
+    for firstArena in range(0, len(ports), groupSize):
+        group = multiprocessing.Process(target = runArenaGroup, daemon = True,
+                                        args = (resultQueue, ports[firstArena:firstArena + groupSize], firstArena, seconds, frameRate, ballCount, binary, baudRate))
+        group.start()
+        groups.append(group)
+    results = []
+    while len(results) < len(groups):
+        try:
+            results.append(resultQueue.get())
+        except KeyboardInterrupt:
+            pass # The groups stop too, and send their stats.
+    for group in groups:
+        group.join()
+    arenaStats = sorted((stats for result in results for stats in result[0]), key = lambda stats: int(stats["name"][5:]))
+    return (arenaStats, sum(result[1] for result in results), sum(result[2] for result in results))
+
+# The entry point -> python -m pong3d.arenas --help
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog = "pong3d.arenas", description = "Many headless 3D Pong arenas, one per Arduino controller.")
+    parser.add_argument("--ports", nargs = "+", required = True, help = "the Arduino serial ports, one arena each")
+    parser.add_argument("--processes", type = int, default = 1, help = "spread the arenas across this many processes (default %(default)s)")
+    parser.add_argument("--seconds", type = float, help = "stop after this long (default: Ctrl-C)")
+    parser.add_argument("--rate", type = int, default = 100, help = "frames per second (default %(default)s)")
+    parser.add_argument("--baud", type = int, default = 115200, help = "the serial baud rate (default %(default)s)")
+    parser.add_argument("--balls", type = int, default = 1, help = "the number of balls in each arena (default %(default)s)")
+    parser.add_argument("--csv", action = "store_true", help = "do not ask the Arduinos for binary framing")
+    args = parser.parse_args(argv)
+    (arenaStats, lateFrames, frames) = runArenaProcesses(args.ports, args.processes, args.seconds, args.rate, args.balls, not args.csv, args.baud)
+    printStats(arenaStats, lateFrames, frames)
+
+if __name__ == "__main__":
+    main()
+
+# EOF
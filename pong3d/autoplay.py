@@ -0,0 +1,180 @@
+# An automatic player, for soak and load tests that would otherwise need someone on the joystick.
+# Where will the ball leave the arena? Rather than step it along frame by frame, its path is worked out analytically:
+# a straight line from contact to contact - a wall bounce, or a side into the next zone - until it reaches an open end.
+# Along an axis that is walled on both sides everywhere (the height of the standard arena), the bounces are unfolded:
+# the ball moves in a straight line through mirror images of the arena, and is folded back in at the end, with no contacts at all.
+# The prediction only changes when the ball change does, i.e. when it changes sign on a bounce, so it is cached until then.
+# A bounce on an unfolded axis is already in the prediction, so only the change along the other axes is checked.
+# The joystick samples are encoded as binary frames and fed to a JoystickReader, the same path as the Arduino's samples.
+
+import math
+import time
+
+from pong3d.physics import sideFacesOne, SWEEP_TOLERANCE
+from pong3d.protocol import BinaryPacketParser, encodeBinaryJoystickFrame
+from pong3d.serialio import JoystickReader
+from pong3d.timing import Histogram
+
+# The most contacts to follow before giving up on a prediction. The ball reaches an open end of the standard arena in a few.
+PREDICT_MAX_CONTACTS = 64
+
+# Where a ball at pos, moving by change, leaves its zone through an open end of the arena (the front) ->
+# (time, x, y, zone), with the time in ball changes. None if it does not get there within maxContacts.
+# The faces are touched as sweepBalls touches them (see physics.sideFaces): walls and open ends by the ball surface, sides into
+# the next zone by the centre, once the surface has reached them and is clear of the next zone's walls.
+# foldAxes are the axes with the same walls in every zone -> {axis: (low face, high face)} for the ball centre.
+def predictExit(zones, pos, change, zone, radius, foldAxes = None, maxContacts = PREDICT_MAX_CONTACTS):
+    foldAxes = foldAxes if foldAxes is not None else {}
+    tracedAxes = [axis for axis in range(3) if axis not in foldAxes]
+    pos = list(pos)
+    change = list(change)
+    startPos = tuple(pos)
+    totalTime = 0.0
+    for contact in range(maxContacts):
+        (faces, beyond, limited) = sideFacesOne(pos, radius, zone, zones, tracedAxes)
+        # The first side of this zone that the ball reaches.
+        contactTime = math.inf
+        contactSide = -1
+        for axis in tracedAxes:
+            axisChange = change[axis]
+            if axisChange == 0:
+                continue
+            side = 2 * axis + (axisChange > 0)
+            timeToFace = max((faces[side] - pos[axis]) / axisChange, 0)
+            if timeToFace < contactTime:
+                (contactTime, contactSide) = (timeToFace, side)
+        if contactSide < 0:
+            return None
+        for axis in tracedAxes:
+            pos[axis] += change[axis] * contactTime
+        totalTime += contactTime
+        axis = contactSide // 2
+        neighbour = zones.adjacencyList[zone][contactSide]
+        (facesNow, beyondNow, limitedNow) = sideFacesOne(pos, radius, zone, zones, tracedAxes)
+        if limited[contactSide]:
+            # A wall of the next zone that the ball is no longer partly in is not there.
+            if not limitedNow[contactSide]:
+                continue
+        elif beyond[contactSide]:
+            zone = neighbour
+            continue
+        elif neighbour >= 0:
+            # The ball surface reaching an open side: it goes on, if it is clear of the next zone's walls.
+            if all(facesNow[2 * otherAxis] - SWEEP_TOLERANCE <= pos[otherAxis] <= facesNow[2 * otherAxis + 1] + SWEEP_TOLERANCE
+                   for otherAxis in tracedAxes):
+                continue
+        elif contactSide == 5 and zones.exitSides[zone, 5]:
+            for (foldAxis, (lowFace, highFace)) in foldAxes.items():
+                pos[foldAxis] = foldPosition(startPos[foldAxis], change[foldAxis], totalTime, lowFace, highFace)
+            return (totalTime, pos[0], pos[1], zone)
+        # Anything else is a wall: bounce.
+        change[axis] = -change[axis]
+    return None
+
+# Where a ball bouncing between two faces is after some time: unfold the bounces, then fold the straight line back in.
+def foldPosition(startPos, change, elapsed, lowFace, highFace):
+    width = highFace - lowFace
+    if width <= 0:
+        return lowFace
+    unfolded = (startPos - lowFace + change * elapsed) % (2 * width)
+    return lowFace + (unfolded if unfolded <= width else 2 * width - unfolded)
+
+# The axes that can be unfolded: walled on both sides in every zone, at the same place -> {axis: (low face, high face)}.
+def foldableAxes(zones, radius):
+    foldAxes = {}
+    for axis in range(3):
+        (lowSide, highSide) = (2 * axis, 2 * axis + 1)
+        walled = all(adjacency[lowSide] < 0 and adjacency[highSide] < 0 and not (exitSides[lowSide] or exitSides[highSide])
+                     for (adjacency, exitSides) in zip(zones.adjacencyList, zones.exitSides.tolist()))
+        faces = {(bounds[lowSide], bounds[highSide]) for bounds in zones.boundsList}
+        if walled and len(faces) == 1:
+            (lowFace, highFace) = faces.pop()
+            foldAxes[axis] = (lowFace + radius, highFace - radius)
+    return foldAxes
+
+# Predicts where a ball leaves the arena, and keeps the prediction until the ball change changes along a traced axis.
+# The ball change only changes when it changes sign on a bounce, or when a new game starts. A bounce along an unfolded axis
+# (off the floor or the ceiling of the standard arena) keeps the ball on the unfolded line, so the prediction still holds.
+class TrajectoryPredictor():
+    def __init__(self, zones, radius):
+        self.zones = zones
+        self.radius = radius
+        self.foldAxes = foldableAxes(zones, radius)
+        self.tracedAxes = [axis for axis in range(3) if axis not in self.foldAxes]
+        self.cachedChange = None
+        self.prediction = None
+        self.predictions = 0
+        self.cacheHits = 0
+        self.predictHistogram = Histogram()
+
+    # The prediction for a ball -> (time, x, y, zone), or None. The time is from when the prediction was made.
+    def predict(self, pos, change, zone):
+        tracedChange = tuple(change[axis] for axis in self.tracedAxes)
+        if tracedChange == self.cachedChange:
+            self.cacheHits += 1
+            return self.prediction
+        predictStartNs = time.perf_counter_ns()
+        self.prediction = predictExit(self.zones, pos, change, zone, self.radius, self.foldAxes)
+        self.predictHistogram.add(time.perf_counter_ns() - predictStartNs)
+        self.cachedChange = tracedChange
+        self.predictions += 1
+        return self.prediction
+
+    def stats(self):
+        return {"predictions": self.predictions, "cacheHits": self.cacheHits, "predictP99Us": self.predictHistogram.percentile(99)}
+
+# Plays a game: the bat goes where the first ball will leave the arena, and the button swaps to the bat at that end.
+# Use it as the game's joystick. Each sample it is asked for, it works out the next move and feeds it in as a binary frame.
+class AutoPlayer():
+    def __init__(self, game):
+        self.game = game
+        self.predictor = TrajectoryPredictor(game.zones, game.ballRadius)
+        # Never started: the frames are fed in, not read from a port.
+        self.joystickReader = JoystickReader(None, BinaryPacketParser())
+        self.jstkZValue = 1
+        # The bat at each open end of the arena -> {zone: bat index}.
+        self.zoneBats = {}
+        for (zone, side) in game.zones.exits:
+            for (batIndex, bat) in enumerate(game.bats):
+                if bat.rPos[0] == game.zones.centres[zone][0] and bat.rPos[1] == game.zones.centres[zone][1]:
+                    self.zoneBats[zone] = batIndex
+
+    # The joystick value that puts the bat centre at position, along one axis.
+    def jstkValue(self, position, batCentre):
+        return min(max(int(round(((position - batCentre) / self.game.batMoveScaler + 0.5) * 1024.0)), 0), 1023)
+
+    # Work out the next move, and feed it in.
+    def play(self):
+        game = self.game
+        balls = game.balls
+        prediction = self.predictor.predict(balls.pos[0].tolist(), balls.change[0].tolist(), int(balls.zone[0]))
+        if prediction is None:
+            # No way out found: follow the ball, with the bat on its side of the arena.
+            (targetX, targetY) = balls.pos[0, :2].tolist()
+            wantedBat = int(targetX > 0)
+        else:
+            (exitTime, targetX, targetY, exitZone) = prediction
+            wantedBat = self.zoneBats.get(exitZone, game.batInUse)
+        # Press the button to swap bats, then let it go.
+        self.jstkZValue = 0 if wantedBat != game.batInUse and self.jstkZValue != 0 else 1
+        bat = game.bats[wantedBat]
+        frame = encodeBinaryJoystickFrame(self.jstkValue(targetX, bat.centerPos[0]), self.jstkValue(targetY, bat.centerPos[1]), self.jstkZValue)
+        self.joystickReader.feed(frame)
+
+    # The joystick interface, as a JoystickReader.
+    def sample(self):
+        self.play()
+        return self.joystickReader.sample()
+
+    def takeButtonPresses(self):
+        return self.joystickReader.takeButtonPresses()
+
+    def takeSampleTime(self):
+        return self.joystickReader.takeSampleTime()
+
+    def stats(self):
+        stats = self.joystickReader.stats()
+        stats.update(self.predictor.stats())
+        return stats
+
+# EOF
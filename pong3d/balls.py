@@ -0,0 +1,108 @@
+# The balls of one game, held as a struct of arrays: one numpy array per ball property, one row per ball.
+# Every check - zone location, arena escape, bat hit and wall bounce - runs over all the balls at once,
+# so there are no per-ball Python objects in the frame loop. A vpython sphere per ball is only for display.
+# One ball is the usual game, and numpy's per call overhead is far more than the work for one ball, so a single ball takes
+# the scalar zone lookup and sweep instead. They give exactly the same results as the array versions.
+
+import numpy as np
+
+from pong3d.physics import randomBallChange, reflectBalls, sweepBall, sweepBalls
+
+class BallManager():
+    def __init__(self, zones, count = 1, radius = 0.5, start = (0, 0, 0), escapeZ = np.inf):
+        self.zones = zones
+        self.count = count
+        self.start = np.array(start, dtype = float)
+        self.escapeZ = escapeZ
+        self.pos = np.zeros((count, 3))                       # Ball positions.
+        self.change = np.zeros((count, 3))                    # Ball position changes per frame.
+        self.radius = np.full(count, float(radius))           # Ball radii.
+        self.zone = np.full(count, -1, dtype = np.intp)       # The zone each ball is in, as a zone index.
+        self.location = np.zeros(count, dtype = np.intp)      # The zone each ball is in, numbered from 1 (0 = not known).
+        self.bounds = np.zeros((count, 6))                    # The boundaries of the zone each ball is in.
+        # What happened to each ball on the last step.
+        self.hits = np.zeros(count, dtype = bool)
+        self.misses = np.zeros(count, dtype = bool)
+        self.bounces = np.zeros(count, dtype = bool)
+        self.newZone = np.zeros(count, dtype = bool)
+        self.escaping = np.zeros(count, dtype = bool)
+        self.sweepOverruns = 0                                # Sweeps that ran out of contacts before the balls moved all the way.
+
+    # Put all the balls back at the start, each with a random position change vector.
+    def reset(self, rng = np.random):
+        self.pos[:] = self.start
+        self.change[:] = randomBallChange(rng, self.zones.zoneSize, self.count)
+        self.zone[:] = self.zones.cellsToZones(np.floor(self.pos / self.zones.zoneSize + 0.5).astype(np.intp))
+        self.bounds[:] = self.zones.bounds[self.zone]
+        self.location[:] = 0
+
+    # Move all the balls one frame, given the active bat bounds -> [x-left, x-right, y-bottom, y-top, ...].
+    def step(self, batBounds):
+        self.locate()
+        return self.move(batBounds)
+
+    # Check where the balls are going, and set the boundaries. The first half of a step.
+    def locate(self):
+        if self.count == 1:
+            return self.locateOne()
+        pos = self.pos
+        change = self.change
+        # Check if the balls are about to, or have, escaped from the open ends of the arena.
+        self.escaping = (pos[:, 2] + self.radius + change[:, 2]) >= self.escapeZ
+        zone = self.zones.locateMany(pos, change, self.radius)
+        located = zone >= 0
+        np.copyto(self.zone, zone, where = located)
+        location = np.where(located, zone + 1, 0)
+        self.newZone = location != self.location
+        self.location = location
+        self.bounds = self.zones.bounds[self.zone]
+        return self
+
+    # The same as locate, for one ball.
+    def locateOne(self):
+        (pos, change, radius) = (self.pos[0].tolist(), self.change[0].tolist(), float(self.radius[0]))
+        self.escaping = np.array([pos[2] + radius + change[2] >= self.escapeZ])
+        zone = self.zones.locate(pos, change, radius)
+        if zone >= 0:
+            self.zone[0] = zone
+        location = zone + 1
+        self.newZone = np.array([location != self.location[0]])
+        self.location = np.array([location])
+        self.bounds = self.zones.bounds[self.zone]
+        return self
+
+    # Move the balls, then check for bat hits, misses and wall bounces. The second half of a step.
+    def move(self, batBounds):
+        pos = self.pos
+        change = self.change
+        escaping = self.escaping
+        # Move the balls.
+        pos += change
+        # If a ball is about to escape, is the active bat in the right place to keep it in the arena?
+        batHit = ((batBounds[0] <= pos[:, 0]) & (pos[:, 0] <= batBounds[1])
+                  & (batBounds[2] <= pos[:, 1]) & (pos[:, 1] <= batBounds[3]))
+        self.hits = escaping & batHit
+        self.misses = escaping & ~batHit
+        # Check if the balls have hit a boundary, and if they are moving towards that boundary, reverse the direction.
+        self.bounces = reflectBalls(pos, change, self.bounds, self.radius)
+        return self
+
+    # Move all the balls a fraction of their change, with swept collisions - the fixed time step physics steps due this frame,
+    # instead of locate() and move(). The hits are counts, as a fast ball can hit the bat more than once.
+    def sweep(self, batBounds, fraction = 1.0):
+        if self.count == 1 and np.ndim(fraction) == 0:
+            (pos, change) = (self.pos[0].tolist(), self.change[0].tolist())
+            (zone, hits, missed, bounced, overrun) = sweepBall(pos, change, int(self.zone[0]), float(self.radius[0]), self.zones, batBounds, fraction)
+            (self.pos[0], self.change[0], self.zone[0]) = (pos, change, zone)
+            (self.hits, self.misses, self.bounces) = (np.array([hits]), np.array([missed]), np.array([bounced]))
+            self.sweepOverruns += overrun
+        else:
+            (self.hits, self.misses, self.bounces, overruns) = sweepBalls(self.pos, self.change, self.zone, self.radius, self.zones, batBounds, fraction)
+            self.sweepOverruns += int(overruns.sum())
+        location = self.zone + 1
+        self.newZone = location != self.location
+        self.location = location
+        self.bounds = self.zones.bounds[self.zone]
+        return self
+
+# EOF
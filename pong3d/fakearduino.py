@@ -0,0 +1,136 @@
+# A fake Arduino on a pseudo terminal (pty), for testing without the hardware. Linux/macOS only.
+# There is also an in-memory serial port, MemorySerial, for benchmarks that should not wait on real time.
+# It talks like TTB-AP-Lesson17.ino: it sends joystick packets every JOB2CYCLE, and parses one received command every JOB3CYCLE.
+# Open fakeArduino.port with serial.Serial() just like a real Arduino.
+
+import os
+import select
+import threading
+import time
+import tty
+
+from pong3d.protocol import encodeJoystickPacket, parseCommand, encodeBinaryJoystickFrame, parseBinaryCommand, COMMAND_FRAME, COMMAND_FRAME_SYNC
+
+# Code loop job cycles (seconds), as on the Arduino.
+JOB2CYCLE = 0.050 # Transmit the joystick data.
+JOB3CYCLE = 0.200 # Parse any received serial commands.
+
+class FakeArduino(threading.Thread):
+    def __init__(self, job2Cycle = JOB2CYCLE, job3Cycle = JOB3CYCLE):
+        threading.Thread.__init__(self, name = "FakeArduino", daemon = True)
+        self.job2Cycle = job2Cycle
+        self.job3Cycle = job3Cycle
+        (self.masterFd, self.slaveFd) = os.openpty()
+        tty.setraw(self.slaveFd) # No echo, and no CR/LF translation.
+        self.port = os.ttyname(self.slaveFd)
+        # What the joystick is doing. Set these from the test.
+        self.jstkXValue = self.jstkYValue = 512
+        self.jstkZValue = 1
+        self.silent = False       # Stop transmitting, like a stalled Arduino.
+        self.corruptEvery = 0     # Corrupt every Nth joystick packet, 0 for never.
+        self.supportsBinary = True # Set False to behave like the older, CSV only, firmware.
+        self.binaryMode = False
+        # What the Arduino has done.
+        self.packetsSent = 0
+        self.commands = []        # Every command parsed -> {subject: action}, or None if it was corrupt.
+        self.LEDs = 0
+        self.beeps = []           # (note, duration) pairs.
+        self.rxBuffer = bytearray()
+        self.running = threading.Event()
+        self.running.set()
+
+    def run(self):
+        timeMark2 = timeMark3 = time.monotonic()
+        while self.running.is_set():
+            timeNow = time.monotonic()
+            # Job 2 - Share the results: Transmit the joystick data.
+            if timeNow - timeMark2 >= self.job2Cycle:
+                timeMark2 = timeNow
+                if not self.silent:
+                    self.sendPacket()
+            # Job 3 - Read commands: Parse a received serial command, one per cycle.
+            if timeNow - timeMark3 >= self.job3Cycle:
+                timeMark3 = timeNow
+                self.parseCommand()
+            # Collect any received data while waiting for the next job.
+            (readable, writable, exceptional) = select.select([self.masterFd], [], [], min(self.job2Cycle, self.job3Cycle) / 5)
+            if readable:
+                try:
+                    self.rxBuffer += os.read(self.masterFd, 1024)
+                except OSError:
+                    break
+
+    def sendPacket(self):
+        self.packetsSent += 1
+        if self.binaryMode:
+            packet = encodeBinaryJoystickFrame(self.jstkXValue, self.jstkYValue, self.jstkZValue)
+            if self.corruptEvery and self.packetsSent % self.corruptEvery == 0:
+                packet = packet[:-1] + bytes([packet[-1] ^ 0xff])
+        else:
+            packet = encodeJoystickPacket(self.jstkXValue, self.jstkYValue, self.jstkZValue)
+            if self.corruptEvery and self.packetsSent % self.corruptEvery == 0:
+                packet = packet.replace(b",", b";", 1)
+        try:
+            os.write(self.masterFd, packet)
+        except OSError:
+            pass
+
+    def parseCommand(self):
+        if self.binaryMode:
+            # Skip anything that is not the start of a binary command.
+            frameStart = self.rxBuffer.find(bytes([COMMAND_FRAME_SYNC]))
+            if frameStart < 0 or len(self.rxBuffer) < frameStart + COMMAND_FRAME.size:
+                return
+            command = parseBinaryCommand(bytes(self.rxBuffer[frameStart:frameStart + COMMAND_FRAME.size]))
+            del self.rxBuffer[:frameStart + COMMAND_FRAME.size]
+        else:
+            lineEnd = self.rxBuffer.find(b"\n")
+            if lineEnd < 0:
+                return
+            command = parseCommand(bytes(self.rxBuffer[:lineEnd]))
+            del self.rxBuffer[:lineEnd + 1]
+        self.commands.append(command)
+        if command:
+            if command.get("Mode") == "B" and self.supportsBinary:
+                self.binaryMode = True
+            if "LEDs" in command:
+                self.LEDs = int(command["LEDs"])
+            if "Beep" in command:
+                self.beeps.append((command["Beep"][0], int(command["Beep"][1:])))
+
+    def stop(self):
+        self.running.clear()
+        if self.is_alive():
+            self.join()
+        os.close(self.masterFd)
+        os.close(self.slaveFd)
+
+# An in-memory stand-in for serial.Serial, for benchmarks: the bytes to be "received" are given up front,
+# and everything written is kept. When the data runs out, read() returns nothing, like a port timeout.
+class MemorySerial():
+    def __init__(self, data = b""):
+        self.data = data
+        self.readPos = 0
+        self.written = bytearray()
+        self.timeout = 0
+
+    @property
+    def in_waiting(self):
+        return len(self.data) - self.readPos
+
+    def read(self, size = 1):
+        chunk = self.data[self.readPos:self.readPos + size]
+        self.readPos += len(chunk)
+        return chunk
+
+    def write(self, data):
+        self.written += data
+        return len(data)
+
+    def reset_input_buffer(self):
+        self.readPos = len(self.data)
+
+    def close(self):
+        pass
+
+# EOF
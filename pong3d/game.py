@@ -0,0 +1,536 @@
+# The 3D Pong game: the settings, the game loop and the entry point -> python -m pong3d, or python Lesson17.py
+# Importing this starts nothing. vpython is only imported, and the scene only built, when the game is shown on the
+# screen, and the serial port is only opened by main(). A headless game (--headless) never imports vpython at all.
+
+import argparse
+import time
+
+import numpy as np
+
+from pong3d.zones import buildZones
+from pong3d.balls import BallManager
+from pong3d.physics import FixedStepper, stepFraction, batOffset, BAT_SHRINK_HITS
+from pong3d.recording import InputRecorder, InputRecording, ReplayReader, newSeed
+from pong3d.timing import FrameTimer
+
+class GameSettings():
+    def __init__(self):
+        # My Arduino happens to connect as serial port 'com3'. Yours may be different! (None = no Arduino.)
+        self.serialPort = "com3"
+        self.serialBaudRate = 115200
+        # How long to wait for the first good joystick packet after opening the port (seconds).
+        self.serialReadyTimeout = 3.0
+        # Ask the Arduino for compact binary framing. Older Arduino code ignores the request, and ASCII CSV is used instead.
+        self.serialBinaryFraming = True
+        # Smooth the joystick samples, or predict where the stick is at render time: "none", "exponential", "oneeuro" or "velocity".
+        self.joystickFilter = "none"
+        # The joystick calibration: the raw (X, Y) values at rest, and at the ends of the travel. And a deadzone around the centre.
+        self.joystickCentre = (512, 512)
+        self.joystickLow = (0, 0)
+        self.joystickHigh = (1023, 1023)
+        self.joystickDeadzone = 0
+
+        # vPython refresh rate.
+        self.vPythonRefreshRate = 100
+        # No vpython and no window: the game runs in the terminal, paced to the refresh rate.
+        self.headless = False
+        # Only show ball and bat moves bigger than this (in arena units). Smaller moves are not worth sending to the browser.
+        self.renderPosThreshold = 0.01
+
+        # Standard sizes!
+        self.zoneSize = 10
+        # The number of balls in play. The first ball drives the Arduino LEDs.
+        self.ballCount = 1
+
+        # Physics: the balls move in fixed time steps of 1/physicsRate seconds, whatever the frame rate, with swept collisions that find
+        # the exact moment a ball touches a wall or the bat, so even a fast ball can not pass through them.
+        # 0 = the original physics, one discrete move per frame.
+        self.physicsRate = 1000
+        # The ball speed, relative to the original game. Only for the fixed time step physics - turn it up for a harder game.
+        self.ballSpeedScale = 1.0
+        # Start each game with the bats already shrunk this many times, as if that many hits had been made (at most BAT_SHRINK_HITS - 1).
+        self.startBatShrinks = 0
+
+        # Record the game inputs to a file, to replay the games exactly later (None = do not record).
+        self.recordPath = None
+        # Replay a recording instead of reading the joystick (None = play live). Headless replays run as fast as they can.
+        # To replay with the headless physics engine instead, use: python -m pong3d.recording <recording>
+        self.replayPath = None
+        # The random seed for the balls (None = a new one each time). A replay always uses the recording's seed.
+        self.randomSeed = None
+
+        # Frame timing: time each phase of the game loop, and print a summary every so often (seconds).
+        # Press "t" in the game window to switch it on or off while playing.
+        self.frameTimingEnable = False
+        self.frameTimingSummaryInterval = 10
+        # Export the frame timing at each game over, to a JSON file, or a CSV file if the name ends with .csv (None = do not export).
+        self.frameTimingExportPath = None
+
+        # Buzzer enable, or not - it can get annoying after a while.
+        self.buzzerEnable = True
+
+        # Start the next game straight away, instead of waiting for RETURN to be pressed.
+        self.autoRestart = False
+        # Let the computer play, instead of the joystick. The Arduino still shows the LEDs and beeps, if it is connected.
+        self.autoPlay = False
+        # Print the hits, misses and game over stats. Many arenas in one terminal would rather not.
+        self.verbose = True
+
+# A bat: where it is, and its bounds for collision detection -> [x-left, x-right, y-bottom, y-top, z-back, z-front].
+class Bat():
+    def __init__(self, rPos = (0, 0, 0), batSize = 1):
+        batThickness = batSize / 10
+        self.rPos = rPos
+        self.centerPos = (rPos[0], rPos[1], rPos[2] + batThickness / 2)
+        self.bounds = [-batSize      / 2 + rPos[0],                    batSize      / 2 + rPos[0],
+                       -batSize      / 2 + rPos[1],                    batSize      / 2 + rPos[1],
+                       -batThickness / 2 + batThickness / 2 + rPos[2], batThickness / 2 + batThickness / 2 + rPos[2],]
+        self.batPosX = self.centerPos[0]
+        self.batPosY = self.centerPos[1]
+    def updatePos(self, chgPosX = 0, chgPosY = 0, batSize = 1):
+        # Move the bat.
+        self.batPosX = self.centerPos[0] + chgPosX
+        self.batPosY = self.centerPos[1] + chgPosY
+        # Update the bounds for collision detection.
+        self.bounds[0] = -batSize / 2 + self.batPosX
+        self.bounds[1] =  batSize / 2 + self.batPosX
+        self.bounds[2] = -batSize / 2 + self.batPosY
+        self.bounds[3] =  batSize / 2 + self.batPosY
+
+# The renderer for a headless game: nothing to show, but the frames are still paced to the frame rate (unless paced is False).
+class HeadlessRenderer():
+    def __init__(self, paced = True):
+        self.paced = paced
+        self.nextFrameTime = None
+
+    def bindKey(self, keyPressed):
+        pass
+
+    # Sleep until the next frame is due. If the game has fallen behind, start again from now, rather than rushing to catch up.
+    def rate(self, frameRate):
+        if not self.paced:
+            return
+        frameTime = 1 / frameRate
+        timeNow = time.perf_counter()
+        if self.nextFrameTime is None or timeNow > self.nextFrameTime + frameTime:
+            self.nextFrameTime = timeNow
+        elif timeNow < self.nextFrameTime:
+            time.sleep(self.nextFrameTime - timeNow)
+        self.nextFrameTime += frameTime
+
+    def showActiveBat(self, batInUse):
+        pass
+
+    def moveBat(self, batIndex, batPosX, batPosY):
+        pass
+
+    def resizeBats(self, batSize):
+        pass
+
+    def moveBalls(self, ballPositions):
+        pass
+
+    def showMissedBall(self, ball):
+        pass
+
+    def resetBalls(self):
+        pass
+
+    def showGameOver(self, shown = True):
+        pass
+
+    def flush(self):
+        pass
+
+    def stats(self):
+        return None
+
+# One game arena: the zones, the bats, the balls, and the loop that plays them.
+# The joystick is a JoystickReader or anything like it (None = joystick centred), the command writer is a CommandWriter or None.
+# The renderer is built to suit the settings, unless one is given.
+class Game():
+    def __init__(self, settings = None, joystick = None, commandWriter = None, frameTimer = None, renderer = None):
+        self.settings = settings = settings if settings is not None else GameSettings()
+        self.zoneSize = zoneSize = settings.zoneSize
+        self.frameRate = settings.vPythonRefreshRate
+        self.physicsRate = settings.physicsRate
+        self.ballSpeedScale = settings.ballSpeedScale
+        self.ballCount = settings.ballCount
+        # A harder game starts with the bats already shrunk.
+        self.startBatShrinks = min(settings.startBatShrinks, BAT_SHRINK_HITS - 1)
+        self.frameTimer = frameTimer if frameTimer is not None else FrameTimer(enabled = settings.frameTimingEnable, summaryInterval = settings.frameTimingSummaryInterval)
+
+        # Where does the joystick data come from - a replay, the Arduino, or nowhere?
+        self.recording = None
+        if settings.replayPath:
+            self.recording = InputRecording(settings.replayPath)
+            joystick = ReplayReader(self.recording)
+            randomSeed = self.recording.seed # The same seed makes the same balls.
+            # And the same physics, the same number of balls and the same bats make the same game.
+            (self.frameRate, self.physicsRate, self.ballSpeedScale) = (self.recording.frameRate, self.recording.physicsRate, self.recording.speedScale)
+            (self.ballCount, self.startBatShrinks) = (self.recording.ballCount, self.recording.startBatShrinks)
+        elif settings.randomSeed is not None:
+            randomSeed = settings.randomSeed
+        else:
+            randomSeed = newSeed()
+        self.joystick = joystick
+        self.commandWriter = commandWriter
+        self.rng = np.random.default_rng(randomSeed)
+        self.inputRecorder = None
+        if settings.recordPath:
+            self.inputRecorder = InputRecorder(settings.recordPath, randomSeed, self.ballCount, self.frameRate, self.physicsRate,
+                                               self.ballSpeedScale, self.startBatShrinks)
+
+        # The zones - the standard "U" shaped arena, registered for ball location lookups.
+        self.zones = zones = buildZones(zoneSize)
+        # The ball escapes the arena through the open front sides (zone 1 and zone 4 for the standard arena).
+        escapeZ = min(zones.boundsList[zone][5] for (zone, side) in zones.exits if side == 5)
+        # Zone 1 bat and zone 4 bat.
+        self.batSize = zoneSize / 2 # Yes, I know a big bat, but it will not stay big!
+        self.batMoveScaler = zoneSize - self.batSize
+        self.bats = (Bat((-zoneSize, 0, 1.5 * zoneSize), self.batSize), Bat((zoneSize, 0, 1.5 * zoneSize), self.batSize))
+        self.batInUse = 0
+        # The balls.
+        self.ballRadius = 0.05 * zoneSize
+        self.balls = BallManager(zones, self.ballCount, self.ballRadius, zones.centres[zones.indexOf("7")], escapeZ)
+
+        # The fixed time step physics clock. Recordings and replays step the physics by exactly one frame time each frame,
+        # so the same inputs always take the same physics steps.
+        if self.physicsRate:
+            self.physicsStepper = FixedStepper(self.physicsRate)
+            self.physicsStepFraction = stepFraction(self.physicsRate, self.ballSpeedScale)
+        self.fixedFrameTimes = bool(settings.recordPath or settings.replayPath)
+
+        # Set some beep durations (milliseconds).
+        if settings.buzzerEnable:
+            (self.newZoneBeepDuration, self.wallBounceBeepDuration, self.gameOverBeepDuration) = (150, 20, 750)
+        else:
+            self.newZoneBeepDuration = self.wallBounceBeepDuration = self.gameOverBeepDuration = 0
+
+        # Initialise the sensor reading variables.
+        self.jstkXValue = self.jstkYValue = 512  # Joystick centered.
+        self.jstkZValue = 1                      # Button not pressed.
+        self.frameNumber = 0
+        self.hitCounter = 0
+        self.gameOver = False
+        self.LEDsArduino = 0
+        self.lastFrameNs = time.perf_counter_ns()
+        self.firstFrameNs = 0
+
+        # The scene, built now only if the game is to be seen. Headless replays run as fast as they can.
+        if renderer is not None:
+            self.renderer = renderer
+        elif settings.headless:
+            self.renderer = HeadlessRenderer(paced = not settings.replayPath)
+        else:
+            from pong3d.render import GameRenderer
+            self.renderer = GameRenderer(self)
+        self.renderer.bindKey(self.keyPressed)
+
+    # The "t" key switches the frame timer on and off.
+    def keyPressed(self, key):
+        if key == "t":
+            self.frameTimer.enabled = not self.frameTimer.enabled
+            print("Frame timing %s." % ("on" if self.frameTimer.enabled else "off"))
+
+    # Get ready for a game: big bats in the middle, and the balls in zone 7, each with a random position change vector.
+    def newGame(self):
+        zoneSize = self.zoneSize
+        renderer = self.renderer
+        self.gameOver = False
+        self.hitCounter = 0
+        renderer.showGameOver(False)
+        # Reset the bats. A harder game starts with them already shrunk.
+        self.batSize = zoneSize / 2 - self.startBatShrinks * zoneSize / 20
+        self.batMoveScaler = zoneSize - self.batSize
+        renderer.resizeBats(self.batSize)
+        for (batIndex, bat) in enumerate(self.bats):
+            bat.updatePos(0, 0, self.batSize)
+            renderer.moveBat(batIndex, bat.batPosX, bat.batPosY)
+        # Set up the active bat.
+        self.batInUse = 0
+        renderer.showActiveBat(self.batInUse)
+        # Reset the balls.
+        renderer.resetBalls()
+        self.balls.reset(self.rng)
+        if self.physicsRate:
+            self.physicsStepper.reset()
+            self.lastFrameNs = time.perf_counter_ns()
+        # Initialise the variable for Arduino binary display LEDs.
+        self.LEDsArduino = 0
+
+    # Play one frame -> True when the game is over.
+    def frame(self):
+        frameTimer = self.frameTimer
+        renderer = self.renderer
+        balls = self.balls
+        joystick = self.joystick
+        # Only time the frame if the timer was on at the start of it.
+        frameTiming = frameTimer.enabled
+        if frameTiming:
+            frameTimer.beginFrame()
+
+        renderer.rate(self.frameRate)
+        if frameTiming:
+            frameTimer.endPhase() # Wait.
+
+        buttonPresses = 0
+        if joystick is not None:
+            # A replay moves on a frame at a time.
+            if self.recording is not None:
+                joystick.advance(self.frameNumber)
+            # Get the latest joystick data, and any button presses since the last frame.
+            (self.jstkXValue, self.jstkYValue, self.jstkZValue) = joystick.sample()
+            buttonPresses = joystick.takeButtonPresses()
+        if self.inputRecorder is not None:
+            self.inputRecorder.record(self.frameNumber, self.jstkXValue, self.jstkYValue, self.jstkZValue, buttonPresses)
+        if frameTiming:
+            frameTimer.endPhase() # Input.
+
+        # If the joystick button has been pressed, change active bat. The bat colours only need changing when it does.
+        if buttonPresses % 2:
+            self.batInUse ^= 1
+            renderer.showActiveBat(self.batInUse)
+
+        # Move active bat.
+        bat = self.bats[self.batInUse]
+        bat.updatePos(batOffset(self.jstkXValue, self.batMoveScaler), batOffset(self.jstkYValue, self.batMoveScaler), self.batSize)
+        renderer.moveBat(self.batInUse, bat.batPosX, bat.batPosY)
+        if frameTiming:
+            # How long since the joystick sample arrived? Only measured the first time a sample is used.
+            sampleTimeNs = joystick.takeSampleTime() if joystick is not None else 0
+            if sampleTimeNs:
+                frameTimer.record("inputLatency", time.perf_counter_ns() - sampleTimeNs)
+            frameTimer.endPhase() # Bats.
+
+        # How many physics steps are due since the last frame? Or, with the original physics, where are the balls going?
+        if self.physicsRate:
+            if self.fixedFrameTimes:
+                frameTimeNs = 1000000000 // self.frameRate
+            else:
+                frameNs = time.perf_counter_ns()
+                frameTimeNs = frameNs - self.lastFrameNs
+                self.lastFrameNs = frameNs
+            physicsSteps = self.physicsStepper.advance(frameTimeNs)
+        else:
+            balls.locate()
+        if frameTiming:
+            frameTimer.endPhase() # Zones.
+
+        # Move the balls, and check for bat hits, misses and wall bounces.
+        # The swept collisions are exact, and the bats only move between frames, so the physics steps due are swept in one go.
+        if self.physicsRate:
+            balls.sweep(bat.bounds, physicsSteps * self.physicsStepFraction)
+        else:
+            balls.move(bat.bounds)
+        ball1Location = balls.location[0]
+        wall1Bounce = balls.bounces.any()
+        # Did the active bat keep the balls in the arena?
+        for ballHit in range(balls.hits.sum()):
+            self.hitCounter += 1
+            if self.settings.verbose:
+                print("Hit! (%d)" % self.hitCounter)
+            # Increase the difficulty: Make the bats a bit smaller.
+            if self.hitCounter + self.startBatShrinks < BAT_SHRINK_HITS:
+                self.batSize -= self.zoneSize / 20
+                self.batMoveScaler = self.zoneSize - self.batSize
+                renderer.resizeBats(self.batSize)
+        if balls.misses.any():
+            if self.settings.verbose:
+                print("Miss!")
+            self.gameOver = True
+            renderer.showGameOver(True)
+            for ballMissed in np.flatnonzero(balls.misses):
+                renderer.showMissedBall(ballMissed)
+        if frameTiming:
+            frameTimer.endPhase() # Balls.
+
+        # Show the balls where they are now, and send everything that has changed this frame to the browser.
+        renderer.moveBalls(balls.pos.tolist())
+        renderer.flush()
+        if frameTiming:
+            frameTimer.endPhase() # Render.
+
+        # Update the real world, if it is connected.
+        commandWriter = self.commandWriter
+        if commandWriter is not None:
+            # Queue the commands for the Arduino. The command writer merges them and sends them when the Arduino is ready.
+            if not self.gameOver:
+                # Only send an LED update and a low beep to the Arduino if the ball location status has changed from the last time.
+                if ball1Location != self.LEDsArduino:
+                    commandWriter.send(ball1Location, "L", self.newZoneBeepDuration)
+                    # Update the current Arduino LEDs status.
+                    self.LEDsArduino = ball1Location
+                # Only send a high beep to the Arduino if the ball has hit a wall.
+                elif wall1Bounce:
+                    commandWriter.send(-1, "H", self.wallBounceBeepDuration)
+            else:
+                commandWriter.send(0, "L", self.gameOverBeepDuration)
+        if frameTiming:
+            frameTimer.endPhase() # Commands.
+            frameTimer.endFrame()
+
+        if self.frameNumber == 0:
+            self.firstFrameNs = time.perf_counter_ns()
+        self.frameNumber += 1
+        return self.gameOver
+
+    # The game is over: how did it go?
+    def endGame(self):
+        if self.settings.verbose:
+            # How did the serial data get on?
+            if self.joystick is not None and self.recording is None:
+                print("Joystick data: %(goodFrames)d good, %(corruptFrames)d CRC fail, %(droppedFrames)d not used." % self.joystick.stats())
+            if self.commandWriter is not None:
+                print("Commands: %(sentCommands)d sent, %(coalescedCommands)d merged, %(droppedCommands)d replaced." % self.commandWriter.stats())
+            # How much did the scene state save?
+            renderStats = self.renderer.stats()
+            if renderStats is not None:
+                print("Scene: %(attributeWrites)d attribute writes, %(savedWrites)d not needed, in %(flushes)d frames." % renderStats)
+            # Did any ball have more contacts in a sweep than it could follow?
+            if self.balls.sweepOverruns:
+                print("Physics: %d sweeps ran out of contacts before the ball moved all the way." % self.balls.sweepOverruns)
+        # Export the frame timing so far.
+        if self.settings.frameTimingExportPath and self.frameTimer.frameHistogram.count:
+            self.frameTimer.export(self.settings.frameTimingExportPath)
+        # Mark the end of the game in the recording.
+        if self.inputRecorder is not None:
+            self.inputRecorder.record(self.frameNumber - 1, self.jstkXValue, self.jstkYValue, self.jstkZValue, force = True)
+            self.inputRecorder.flush()
+
+    # Play games until the replay runs out, or for ever. maxFrames stops after that many frames, game over or not.
+    def run(self, maxFrames = None):
+        # An infinite loop: When is True, True? It is always True!
+        while True:
+            # Lets play the game.
+            self.newGame()
+            while not self.frame():
+                if maxFrames is not None and self.frameNumber >= maxFrames:
+                    return
+            self.endGame()
+            if maxFrames is not None and self.frameNumber >= maxFrames:
+                return
+            # A replay carries straight on to the next game, until the recording runs out.
+            if self.recording is not None:
+                if self.joystick.finished:
+                    return
+            # Start another game when the player is ready.
+            elif not self.settings.autoRestart:
+                try:
+                    input("Press RETURN to play again...")
+                except EOFError:
+                    return
+                # Forget any button presses made while waiting. Prevents trouble if the game has been waiting for a while.
+                if self.joystick is not None:
+                    self.joystick.takeButtonPresses()
+
+    # Stop recording.
+    def close(self):
+        if self.inputRecorder is not None:
+            self.inputRecorder.close()
+        if self.recording is not None:
+            self.joystick = None # The replay holds views of the memory mapped recording.
+            self.recording.close()
+
+# An argparse type: a whole number from low to high (no upper limit if high is None).
+def wholeNumber(low = 0, high = None):
+    def parse(text):
+        try:
+            value = int(text)
+        except ValueError:
+            raise argparse.ArgumentTypeError("%s is not a whole number" % text)
+        if value < low:
+            raise argparse.ArgumentTypeError("%s is less than %d" % (text, low))
+        if high is not None and value > high:
+            raise argparse.ArgumentTypeError("%s is more than %d" % (text, high))
+        return value
+    return parse
+
+# Command line settings -> the game settings.
+def parseArguments(argv = None, settings = None):
+    settings = settings if settings is not None else GameSettings()
+    parser = argparse.ArgumentParser(prog = "pong3d", description = "A playable 3D Pong game, with an Arduino joystick.")
+    parser.add_argument("--port", default = settings.serialPort, help = "the Arduino serial port (default %(default)s)")
+    parser.add_argument("--baud", type = int, default = settings.serialBaudRate, help = "the serial baud rate (default %(default)s)")
+    parser.add_argument("--no-serial", action = "store_true", help = "play without an Arduino")
+    parser.add_argument("--csv", action = "store_true", help = "do not ask the Arduino for binary framing")
+    parser.add_argument("--filter", default = settings.joystickFilter, choices = ("none", "exponential", "oneeuro", "velocity"),
+                        help = "smooth or predict the joystick (default %(default)s)")
+    parser.add_argument("--stick-centre", type = int, nargs = 2, default = settings.joystickCentre, metavar = ("X", "Y"), help = "the joystick values at rest")
+    parser.add_argument("--deadzone", type = int, default = settings.joystickDeadzone, help = "joystick units around the centre that count as the centre")
+    parser.add_argument("--headless", action = "store_true", help = "no vpython and no window")
+    parser.add_argument("--frames", type = int, help = "stop after this many frames")
+    parser.add_argument("--auto-restart", action = "store_true", help = "start the next game straight away")
+    parser.add_argument("--balls", type = wholeNumber(1), default = settings.ballCount, help = "the number of balls (default %(default)s)")
+    parser.add_argument("--physics-rate", type = int, default = settings.physicsRate, help = "physics steps per second, 0 for one per frame (default %(default)s)")
+    parser.add_argument("--speed", type = float, default = settings.ballSpeedScale, help = "the ball speed scale (default %(default)s)")
+    parser.add_argument("--bat-shrinks", type = wholeNumber(0, BAT_SHRINK_HITS - 1), default = settings.startBatShrinks,
+                        help = "start with the bats shrunk this many times, up to %d for the smallest bats (default %%(default)s)" % (BAT_SHRINK_HITS - 1))
+    parser.add_argument("--autoplay", action = "store_true", default = settings.autoPlay, help = "let the computer play")
+    parser.add_argument("--record", default = settings.recordPath, help = "record the game inputs to this file")
+    parser.add_argument("--replay", default = settings.replayPath, help = "replay a recording")
+    parser.add_argument("--seed", type = int, default = settings.randomSeed, help = "the random seed for the balls (default a new one each time)")
+    parser.add_argument("--timing", action = "store_true", default = settings.frameTimingEnable, help = "time the game loop")
+    parser.add_argument("--timing-export", default = settings.frameTimingExportPath, help = "export the frame timing at each game over to this file")
+    parser.add_argument("--no-buzzer", action = "store_true", help = "no beeps")
+    args = parser.parse_args(argv)
+    settings.serialPort = None if args.no_serial else args.port
+    settings.serialBaudRate = args.baud
+    settings.serialBinaryFraming = settings.serialBinaryFraming and not args.csv
+    settings.joystickFilter = args.filter
+    settings.joystickCentre = tuple(args.stick_centre)
+    settings.joystickDeadzone = args.deadzone
+    settings.headless = settings.headless or args.headless
+    settings.autoRestart = settings.autoRestart or args.auto_restart
+    settings.ballCount = args.balls
+    settings.physicsRate = args.physics_rate
+    settings.ballSpeedScale = args.speed
+    settings.startBatShrinks = args.bat_shrinks
+    settings.autoPlay = args.autoplay
+    settings.recordPath = args.record
+    settings.replayPath = args.replay
+    settings.randomSeed = args.seed
+    settings.frameTimingEnable = args.timing
+    settings.frameTimingExportPath = args.timing_export
+    settings.buzzerEnable = settings.buzzerEnable and not args.no_buzzer
+    return (settings, args.frames)
+
+# The entry point -> python -m pong3d --help
+def main(argv = None, settings = None):
+    startNs = time.perf_counter_ns()
+    (settings, maxFrames) = parseArguments(argv, settings)
+    frameTimer = FrameTimer(enabled = settings.frameTimingEnable, summaryInterval = settings.frameTimingSummaryInterval)
+    # Connect to the Arduino on the correct serial port! The serial modules are only imported if there is a port to open.
+    # A replay takes its joystick from the recording, so it does not need the Arduino.
+    joystickReader = commandWriter = None
+    if settings.serialPort and not settings.replayPath:
+        from pong3d.serialio import connectArduino
+        connection = connectArduino(settings.serialPort, settings.serialBaudRate, settings.serialBinaryFraming, frameTimer, settings.serialReadyTimeout)
+        if connection is None:
+            print("Serial port not found!")
+        else:
+            (joystickReader, commandWriter) = connection
+    # Calibrate, smooth and predict the joystick samples, if the settings ask for it.
+    joystick = None
+    if joystickReader is not None:
+        from pong3d.inputstage import createInputStage
+        joystick = createInputStage(joystickReader, settings, frameTimer)
+    game = Game(settings, joystick, commandWriter, frameTimer)
+    if settings.autoPlay and not settings.replayPath:
+        from pong3d.autoplay import AutoPlayer
+        game.joystick = AutoPlayer(game)
+    try:
+        game.run(maxFrames)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        game.close()
+        if joystickReader is not None:
+            joystickReader.stop()
+            commandWriter.stop()
+    if settings.frameTimingEnable:
+        frameTimer.printSummary()
+        if game.firstFrameNs:
+            print("First frame %.1fms after main() started." % ((game.firstFrameNs - startNs) / 1e6))
+
+# EOF
@@ -0,0 +1,191 @@
+# The joystick input stage, between the packet parser and the bat: calibration, deadzone, smoothing and prediction.
+# The Arduino reads the joystick every 25ms and averages two readings, but only sends every 50ms, so the raw samples
+# make the bat jerky, and what it shows is already old by the time it arrives. Each sample is timestamped when it is
+# received (less the time it spent in the Arduino), filtered, and the bat goes where the filter says the stick is at render time.
+# Filters -> "none", "exponential" (smooth, but adds a little lag), "oneeuro" (smooth when slow, quick when fast),
+# or "velocity" (constant velocity extrapolation to render time, which takes the lag out).
+
+import math
+import time
+
+# How old a joystick reading is when its packet arrives: half the two reading average, and half the wait to be sent, on average.
+SAMPLE_AGE_NS = 25000000
+# The filter settings, in joystick units (0 - 1023) and seconds.
+EXPONENTIAL_TIME_CONSTANT = 0.030
+ONE_EURO_MIN_CUTOFF = 1.0       # Hz, when the stick is still.
+ONE_EURO_BETA = 0.01            # Extra cutoff (Hz) per joystick unit per second of stick speed.
+ONE_EURO_DERIVATIVE_CUTOFF = 1.0
+# Never extrapolate further ahead than this, in case the samples stop.
+VELOCITY_MAX_LEAD = 0.100
+VELOCITY_SMOOTHING = 1.0        # How much of each new velocity is taken (1 = all of it - the Arduino has already averaged the readings).
+
+# Maps the raw joystick values so the stick centre is 512 and the full travel is 0 - 1024 each way, with a deadzone in the middle.
+class JoystickCalibration():
+    def __init__(self, centre = (512, 512), low = (0, 0), high = (1023, 1023), deadzone = 0):
+        self.centre = centre
+        self.low = low
+        self.high = high
+        self.deadzone = deadzone # Joystick units either side of the centre that count as the centre.
+
+    def applyAxis(self, jstkValue, axis):
+        centre = self.centre[axis]
+        if jstkValue >= centre:
+            offset = (jstkValue - centre) / max(self.high[axis] - centre, 1) * 512
+        else:
+            offset = (jstkValue - centre) / max(centre - self.low[axis], 1) * 512
+        # Inside the deadzone is the centre, and outside it the travel is stretched to still reach the ends.
+        deadzone = self.deadzone
+        if deadzone:
+            if abs(offset) <= deadzone:
+                offset = 0
+            else:
+                offset = math.copysign((abs(offset) - deadzone) / (512 - deadzone) * 512, offset)
+        return min(max(512 + offset, 0), 1024)
+
+    def apply(self, jstkXValue, jstkYValue):
+        return (self.applyAxis(jstkXValue, 0), self.applyAxis(jstkYValue, 1))
+
+# Each filter smooths one joystick axis: update() with each reading and when it was made, and predict() the stick at a time.
+# The readings only come every 50ms, so the smoothing filters glide towards the newest one frame by frame, rather than
+# stepping to a new value when a reading arrives - a first order low pass filter, run in continuous time.
+class ExponentialFilter():
+    def __init__(self, timeConstant = EXPONENTIAL_TIME_CONSTANT):
+        self.timeConstant = timeConstant
+        self.value = None  # Where the filter was at timeNs.
+        self.target = None # The newest reading, that it is heading for.
+        self.timeNs = 0
+
+    # How much of the way to the newest reading the filter has gone, after some time.
+    def progress(self, timeNs):
+        return 1 - math.exp(-max(timeNs - self.timeNs, 0) / 1e9 / self.timeConstant)
+
+    def update(self, value, timeNs):
+        if self.value is None:
+            self.value = value
+        else:
+            self.value = self.predict(timeNs)
+        self.target = value
+        self.timeNs = timeNs
+
+    def predict(self, timeNs):
+        return self.value + (self.target - self.value) * self.progress(timeNs)
+
+# The 1-euro filter (Casiez, Roussel and Vogel, 2012): a low pass filter whose cutoff goes up with the stick speed,
+# so it is smooth when the stick is slow, and quick when it is fast. The stick speed is filtered too, at its own cutoff.
+class OneEuroFilter(ExponentialFilter):
+    def __init__(self, minCutoff = ONE_EURO_MIN_CUTOFF, beta = ONE_EURO_BETA, derivativeCutoff = ONE_EURO_DERIVATIVE_CUTOFF):
+        ExponentialFilter.__init__(self, 1 / (2 * math.pi * minCutoff))
+        self.minCutoff = minCutoff
+        self.beta = beta
+        self.derivativeCutoff = derivativeCutoff
+        self.derivative = 0.0 # Joystick units per second.
+
+    def update(self, value, timeNs):
+        if self.target is not None and timeNs > self.timeNs:
+            timeStep = (timeNs - self.timeNs) / 1e9
+            alpha = 1 / (1 + 1 / (2 * math.pi * self.derivativeCutoff * timeStep))
+            self.derivative += alpha * ((value - self.target) / timeStep - self.derivative)
+        ExponentialFilter.update(self, value, timeNs)
+        # The faster the stick, the higher the cutoff, and the shorter the time constant.
+        self.timeConstant = 1 / (2 * math.pi * (self.minCutoff + self.beta * abs(self.derivative)))
+
+# Where the stick is now, if it has kept going as it was: the newest reading plus its (smoothed) velocity times its age.
+class VelocityPredictor():
+    def __init__(self, maxLead = VELOCITY_MAX_LEAD, smoothing = VELOCITY_SMOOTHING):
+        self.maxLeadNs = maxLead * 1e9
+        self.smoothing = smoothing
+        self.value = None
+        self.velocity = 0.0 # Joystick units per nanosecond.
+        self.timeNs = 0
+
+    def update(self, value, timeNs):
+        if self.value is not None and timeNs > self.timeNs:
+            self.velocity += self.smoothing * ((value - self.value) / (timeNs - self.timeNs) - self.velocity)
+        self.value = value
+        self.timeNs = timeNs
+
+    def leadNs(self, timeNs):
+        return min(max(timeNs - self.timeNs, 0), self.maxLeadNs)
+
+    def predict(self, timeNs):
+        return self.value + self.velocity * self.leadNs(timeNs)
+
+# No filter: the newest reading, as it is.
+class NoFilter():
+    def __init__(self):
+        self.value = None
+
+    def update(self, value, timeNs):
+        self.value = value
+
+    def predict(self, timeNs):
+        return self.value
+
+INPUT_FILTERS = {"none": NoFilter, "exponential": ExponentialFilter, "oneeuro": OneEuroFilter, "velocity": VelocityPredictor}
+
+# A filter for one axis, by name.
+def createFilter(name = "none"):
+    if name not in INPUT_FILTERS:
+        raise ValueError("Unknown joystick filter %s, use one of %s" % (name, ", ".join(INPUT_FILTERS)))
+    return INPUT_FILTERS[name]()
+
+# The input stage: wraps a JoystickReader (or anything like it), and is used by the game in its place.
+# Each new sample is calibrated and given to the filters, and every frame the filters say where the stick is now.
+# If enabled, the frame timer records how old the newest stick reading is when it is shown ("stickAge"). That is before the
+# smoothing or prediction: how far behind the stick the filtered value is can only be measured against the real stick,
+# which the game does not know, so benchInputLatency measures it with a known stick movement.
+class InputStage():
+    def __init__(self, joystick, filterName = "none", calibration = None, sampleAgeNs = SAMPLE_AGE_NS, frameTimer = None):
+        self.joystick = joystick
+        self.filters = (createFilter(filterName), createFilter(filterName))
+        self.calibration = calibration if calibration is not None else JoystickCalibration()
+        self.sampleAgeNs = sampleAgeNs
+        self.frameTimer = frameTimer
+        self.readingTimeNs = 0 # When the newest stick reading was made (perf_counter_ns), as near as we know.
+        self.timedSamples = False # Only samples from the Arduino have times. Replays and the first sample do not.
+        self.sampleTimeNs = 0
+
+    # The stick at render time (now, if not given) -> (jstkXValue, jstkYValue, jstkZValue), as a JoystickReader gives it.
+    def sample(self, renderTimeNs = None):
+        (jstkXValue, jstkYValue, jstkZValue) = self.joystick.sample()
+        sampleTimeNs = self.joystick.takeSampleTime()
+        if renderTimeNs is None:
+            renderTimeNs = time.perf_counter_ns()
+        (filterX, filterY) = self.filters
+        (calibratedX, calibratedY) = self.calibration.apply(jstkXValue, jstkYValue)
+        if sampleTimeNs or filterX.value is None:
+            # A new sample. The reading was made a while before it arrived.
+            if sampleTimeNs:
+                self.sampleTimeNs = sampleTimeNs
+                self.readingTimeNs = sampleTimeNs - self.sampleAgeNs
+                self.timedSamples = True
+            else:
+                self.readingTimeNs = renderTimeNs
+            filterX.update(calibratedX, self.readingTimeNs)
+            filterY.update(calibratedY, self.readingTimeNs)
+        predictedX = filterX.predict(renderTimeNs)
+        predictedY = filterY.predict(renderTimeNs)
+        frameTimer = self.frameTimer
+        if frameTimer is not None and frameTimer.enabled and self.timedSamples:
+            frameTimer.record("stickAge", renderTimeNs - self.readingTimeNs)
+        return (min(max(int(round(predictedX)), 0), 1023), min(max(int(round(predictedY)), 0), 1023), jstkZValue)
+
+    def takeButtonPresses(self):
+        return self.joystick.takeButtonPresses()
+
+    # When the newest sample arrived, the first time it is asked for, as a JoystickReader.
+    def takeSampleTime(self):
+        (sampleTimeNs, self.sampleTimeNs) = (self.sampleTimeNs, 0)
+        return sampleTimeNs
+
+    def stats(self):
+        return self.joystick.stats()
+
+# The input stage the settings ask for, around a joystick, or the joystick as it is if they ask for nothing.
+def createInputStage(joystick, settings, frameTimer = None):
+    calibration = JoystickCalibration(settings.joystickCentre, settings.joystickLow, settings.joystickHigh, settings.joystickDeadzone)
+    if joystick is None or (settings.joystickFilter == "none" and vars(calibration) == vars(JoystickCalibration())):
+        return joystick
+    return InputStage(joystick, settings.joystickFilter, calibration, frameTimer = frameTimer)
+
+# EOF
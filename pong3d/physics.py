@@ -0,0 +1,386 @@
+# A headless physics engine for the 3D Pong game, with no vpython and no serial port.
+# The state of many independent games is held in numpy arrays, and they all move on one frame with each step() call.
+# The rules are the same as the Lesson17.py game loop: the ball reflects off the zone boundaries, the active bat must
+# be in the way when the ball reaches an open end of the arena, each hit shrinks the bats and a miss is game over.
+# There are two ways to move the balls: the original discrete move per frame, or fixed time steps (1kHz, say) with swept
+# collisions, which find the exact moment a ball touches a wall or the bat, so a fast ball can not pass through either.
+
+import time
+import numpy as np
+
+from pong3d.zones import buildZones
+
+# The game starts with big bats, and they shrink on each of the first few hits.
+BAT_SHRINK_HITS = 10
+
+# The ball position changes are per frame at this rate, the original game frame rate.
+BALL_CHANGE_RATE = 100
+
+# The most wall, bat and zone side contacts a ball can have in one sweep. A ball in a corner has 3 at once.
+SWEEP_MAX_CONTACTS = 32
+
+# Which way each zone side moves in to touch a ball with a radius -> [x-left, x-right, y-bottom, y-top, z-back, z-front].
+SIDE_INSETS = np.array([1.0, -1.0, 1.0, -1.0, 1.0, -1.0])
+# The bit of each zone side in a set of sides -> [x-left, x-right, y-bottom, y-top, z-back, z-front].
+SIDE_MASK_BITS = 1 << np.arange(6)
+# How close (in zone units) a ball must be to a face to be touching it, to allow for rounding.
+SWEEP_TOLERANCE = 1e-9
+
+# A random position change vector for the ball, or for count balls.
+def randomBallChange(rng, zoneSize = 10, count = None):
+    if count is None:
+        return (rng.random(3) - 0.5) / (zoneSize / 2)
+    return (rng.random((count, 3)) - 0.5) / (zoneSize / 2)
+
+# The bat position, from the joystick reading, relative to the bat centre.
+def batOffset(jstkValue, batMoveScaler):
+    return ((jstkValue / 1024.0) - 0.5) * batMoveScaler
+
+# Ball/bat hit tests. The ball positions are (N, 3), the bat centres are (N, 2) and the bat sizes are N or scalar.
+def batHits(pos, batPos, batSize):
+    batHalf = np.reshape(batSize, (-1, 1)) / 2
+    return np.all((batPos - batHalf <= pos[:, :2]) & (pos[:, :2] <= batPos + batHalf), axis = 1)
+
+# If a ball has hit a boundary, and it is moving towards that boundary, reverse the direction. Returns the bounced balls.
+def reflectBalls(pos, change, bounds, radius):
+    radius = np.reshape(radius, (-1, 1))
+    towardsWall = (((bounds[:, 0::2] + radius) >= pos) & (change < 0)) | ((pos >= (bounds[:, 1::2] - radius)) & (change > 0))
+    np.negative(change, out = change, where = towardsWall)
+    return np.any(towardsWall, axis = 1)
+
+# How much of a ball change is moved in each fixed time step.
+def stepFraction(physicsRate = 1000, speedScale = 1.0):
+    return speedScale * BALL_CHANGE_RATE / physicsRate
+
+# Where a ball touches each side of its zone -> (faces, beyond, limited), each (N, 6) for the balls at pos (N, 3).
+# Walls, and open sides that the ball surface has not reached yet, are touched by the ball surface. Once the surface has
+# reached an open side (beyond), the ball is partly in the next zone: that side is crossed when the centre gets to it, and
+# until then the next zone's walls hold the ball in too. Those walls are the limited faces.
+def sideFaces(pos, radii, insets, zone, zones):
+    bounds = zones.bounds[zone]
+    beyond = np.empty(bounds.shape, dtype = bool)
+    beyond[:, 0::2] = pos - radii <= bounds[:, 0::2] + SWEEP_TOLERANCE
+    beyond[:, 1::2] = pos + radii >= bounds[:, 1::2] - SWEEP_TOLERANCE
+    beyond &= zones.adjacency[zone] >= 0
+    faces = bounds + np.where(beyond, 0, insets)
+    # The walls of the zones the ball is partly in, moved in to touch the ball centre.
+    limits = zones.overlapWalls[zone, beyond @ SIDE_MASK_BITS] + insets
+    limited = np.empty(bounds.shape, dtype = bool)
+    limited[:, 0::2] = limits[:, 0::2] > faces[:, 0::2]
+    limited[:, 1::2] = limits[:, 1::2] < faces[:, 1::2]
+    faces = np.where(limited, limits, faces)
+    return (faces, beyond, limited)
+
+# The same as sideFaces, for one ball, with Python lists rather than numpy arrays, which are much quicker for one ball.
+# Only the sides on the axes given are checked for being beyond: the autoplayer leaves out the axes it unfolds.
+def sideFacesOne(pos, radius, zone, zones, axes = (0, 1, 2)):
+    bounds = zones.boundsList[zone]
+    adjacency = zones.adjacencyList[zone]
+    beyond = [False] * 6
+    for axis in axes:
+        beyond[2 * axis] = adjacency[2 * axis] >= 0 and pos[axis] - radius <= bounds[2 * axis] + SWEEP_TOLERANCE
+        beyond[2 * axis + 1] = adjacency[2 * axis + 1] >= 0 and pos[axis] + radius >= bounds[2 * axis + 1] - SWEEP_TOLERANCE
+    walls = zones.overlapWallsList[zone][sum(1 << side for side in range(6) if beyond[side])]
+    faces = []
+    limited = []
+    for side in range(6):
+        inset = radius if side % 2 == 0 else -radius
+        face = bounds[side] + (0 if beyond[side] else inset)
+        limit = walls[side] + inset
+        sideLimited = limit > face if side % 2 == 0 else limit < face
+        faces.append(limit if sideLimited else face)
+        limited.append(sideLimited)
+    return (faces, beyond, limited)
+
+# Swept collisions: move the balls by a fraction of their change (a scalar, or one per ball), stopping at each contact on the way.
+# Walls, and the open ends of the arena, are touched when the ball surface reaches them. Open sides into the next zone are
+# crossed when the ball centre reaches them. When the ball surface reaches an open side, it must be clear of the next zone's walls,
+# or it hits the end of one of them - at the corners, where a zone is open on the side and the next one is walled. See sideFaces.
+# At an open end (the front), the ball bounces if it is on the bat, and stops if not.
+# The pos, change and zone arrays (zone indexes) are updated in place. The bat bounds are [x-left, x-right, y-bottom, y-top, ...],
+# or one row of them per ball. Returns the (hits, misses, bounces, overruns) of the balls - the hits are counts, the rest are
+# True/False. An overrun is a ball that had more than SWEEP_MAX_CONTACTS contacts, and did not get to move all the way.
+def sweepBalls(pos, change, zone, radius, zones, batBounds, fraction = 1.0):
+    count = len(pos)
+    rows = np.arange(count)
+    radii = np.reshape(radius, (-1, 1))
+    insets = SIDE_INSETS * radii
+    batBounds = np.broadcast_to(np.asarray(batBounds, dtype = float)[..., :4], (count, 4))
+    remaining = np.array(np.broadcast_to(fraction, count), dtype = float)
+    hits = np.zeros(count, dtype = np.int64)
+    misses = np.zeros(count, dtype = bool)
+    bounces = np.zeros(count, dtype = bool)
+    for contactCount in range(SWEEP_MAX_CONTACTS):
+        # Where each ball touches the sides of its zone, and how long until it touches the ones it is moving towards.
+        (faces, beyond, limited) = sideFaces(pos, radii, insets, zone, zones)
+        towardsHigh = change > 0
+        target = np.where(towardsHigh, faces[:, 1::2], faces[:, 0::2])
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            timeToFace = np.where(change != 0, np.maximum((target - pos) / change, 0), np.inf)
+        axis = np.argmin(timeToFace, axis = 1)
+        contactTime = timeToFace[rows, axis]
+        contact = (remaining > 0) & (contactTime < remaining)
+        # Move to the contact, or all the way.
+        moveTime = np.where(contact, contactTime, remaining)
+        pos += change * moveTime[:, np.newaxis]
+        remaining -= moveTime
+        if not contact.any():
+            break
+        side = 2 * axis + towardsHigh[rows, axis]
+        neighbour = zones.adjacency[zone, side]
+        sideLimited = limited[rows, side]
+        # The ball has moved on, so are the next zone's walls where they were?
+        (facesNow, beyondNow, limitedNow) = sideFaces(pos, radii, insets, zone, zones)
+        # Through an open side into the next zone.
+        crossing = contact & beyond[rows, side] & ~sideLimited
+        # The ball surface reaching an open side: it goes on, if it is clear of the next zone's walls.
+        reaching = contact & (neighbour >= 0) & ~beyond[rows, side] & ~sideLimited
+        clear = np.all((facesNow[:, 0::2] - SWEEP_TOLERANCE <= pos) & (pos <= facesNow[:, 1::2] + SWEEP_TOLERANCE), axis = 1)
+        # A wall of the next zone that the ball is no longer partly in is not there.
+        gone = contact & sideLimited & ~limitedNow[rows, side]
+        carryOn = (reaching & clear) | gone
+        # At an open end of the arena: is the active bat in the right place to keep the ball in?
+        atBat = contact & ~sideLimited & zones.exitSides[zone, side] & (side == 5)
+        onBat = np.all((batBounds[:, 0::2] <= pos[:, :2]) & (pos[:, :2] <= batBounds[:, 1::2]), axis = 1)
+        hits += atBat & onBat
+        missed = atBat & ~onBat
+        misses |= missed
+        remaining[missed] = 0
+        # Anything else is a wall (or the bat): bounce.
+        bounced = contact & ~crossing & ~carryOn & ~missed
+        bounces |= bounced
+        change[rows[bounced], axis[bounced]] *= -1
+        zone[crossing] = neighbour[crossing]
+    return (hits, misses, bounces, remaining > 0)
+
+# The same as sweepBalls, for one ball, with Python lists and numbers: the pos and change lists are updated in place.
+# The steps are the same, in the same order, so the ball ends up exactly where sweepBalls would put it.
+# Returns (zone, hits, missed, bounced, overrun).
+def sweepBall(pos, change, zone, radius, zones, batBounds, fraction = 1.0):
+    remaining = fraction
+    hits = 0
+    (missed, bounced) = (False, False)
+    for contactCount in range(SWEEP_MAX_CONTACTS):
+        (faces, beyond, limited) = sideFacesOne(pos, radius, zone, zones)
+        # The first side of the zone that the ball touches.
+        (contactTime, axis) = (np.inf, 0)
+        for changeAxis in range(3):
+            if change[changeAxis] != 0:
+                target = faces[2 * changeAxis + 1] if change[changeAxis] > 0 else faces[2 * changeAxis]
+                timeToFace = max((target - pos[changeAxis]) / change[changeAxis], 0)
+                if timeToFace < contactTime:
+                    (contactTime, axis) = (timeToFace, changeAxis)
+        contact = remaining > 0 and contactTime < remaining
+        moveTime = contactTime if contact else remaining
+        for changeAxis in range(3):
+            pos[changeAxis] += change[changeAxis] * moveTime
+        remaining -= moveTime
+        if not contact:
+            break
+        side = 2 * axis + (change[axis] > 0)
+        neighbour = zones.adjacencyList[zone][side]
+        sideLimited = limited[side]
+        (facesNow, beyondNow, limitedNow) = sideFacesOne(pos, radius, zone, zones)
+        crossing = beyond[side] and not sideLimited
+        if crossing:
+            zone = neighbour
+            continue
+        if sideLimited:
+            if not limitedNow[side]:
+                continue
+        elif neighbour >= 0:
+            if all(facesNow[2 * otherAxis] - SWEEP_TOLERANCE <= pos[otherAxis] <= facesNow[2 * otherAxis + 1] + SWEEP_TOLERANCE for otherAxis in range(3)):
+                continue
+        elif side == 5 and zones.exitSides[zone, 5]:
+            if batBounds[0] <= pos[0] <= batBounds[1] and batBounds[2] <= pos[1] <= batBounds[3]:
+                hits += 1
+            else:
+                missed = True
+                remaining = 0
+                continue
+        # Anything else is a wall (or the bat): bounce.
+        bounced = True
+        change[axis] = -change[axis]
+    return (zone, hits, missed, bounced, remaining > 0)
+
+# A fixed time step clock for the physics. Each frame, the time since the last frame goes into an accumulator, and the
+# whole steps that are due come out, so the physics runs at stepRate whatever the frame rate. The accumulator is integer
+# nanoseconds times the step rate, so there is no rounding drift, and the same frame times always make the same steps.
+class FixedStepper():
+    def __init__(self, stepRate = 1000, maxFrameTimeNs = 250000000):
+        self.stepRate = stepRate
+        # Longer frames (a pause, a window being dragged) are cut short, rather than running thousands of steps to catch up.
+        self.maxFrameTimeNs = maxFrameTimeNs
+        self.reset()
+
+    def reset(self):
+        self.accumulator = 0
+        self.steps = 0
+        self.droppedNs = 0
+
+    # Add a frame time -> the number of steps due.
+    def advance(self, frameTimeNs):
+        if frameTimeNs > self.maxFrameTimeNs:
+            self.droppedNs += frameTimeNs - self.maxFrameTimeNs
+            frameTimeNs = self.maxFrameTimeNs
+        self.accumulator += frameTimeNs * self.stepRate
+        steps = self.accumulator // 1000000000
+        self.accumulator -= steps * 1000000000
+        self.steps += steps
+        return steps
+
+# Physics rate 0 is the original discrete move per frame. Otherwise, the balls move in fixed time steps at the physics rate,
+# with swept collisions, and each step() is one frame of frameRate frames per second.
+# A harder game starts with the bats already shrunk startBatShrinks times, as the game's --bat-shrinks.
+class BatchPhysics():
+    def __init__(self, games = 1, zoneSize = 10, zones = None, seed = None, physicsRate = 0, frameRate = 100, speedScale = 1.0, startBatShrinks = 0):
+        self.games = games
+        self.zoneSize = zoneSize
+        self.zones = zones if zones is not None else buildZones(zoneSize)
+        self.ballRadius = 0.05 * zoneSize
+        # The ball starts in zone 7, and escapes through the open front sides of the arena.
+        self.ballStart = np.array(self.zones.centres[self.zones.indexOf("7")], dtype = float)
+        self.escapeZ = min(self.zones.boundsList[zone][5] for (zone, side) in self.zones.exits if side == 5)
+        # Zone 1 bat and zone 4 bat.
+        self.batCentres = np.array([[-zoneSize, 0], [zoneSize, 0]], dtype = float)
+        self.rng = np.random.default_rng(seed)
+        self.stepper = FixedStepper(physicsRate) if physicsRate else None
+        self.frameTimeNs = 1000000000 // frameRate
+        self.stepFraction = stepFraction(physicsRate, speedScale) if physicsRate else 1.0
+        self.startBatShrinks = min(startBatShrinks, BAT_SHRINK_HITS - 1)
+        self.reset()
+
+    # Start all the games again.
+    def reset(self):
+        games = self.games
+        self.frames = np.zeros(games, dtype = np.int64)
+        self.ballPos = np.tile(self.ballStart, (games, 1))
+        self.ballChange = randomBallChange(self.rng, self.zoneSize, games)
+        self.ballZone = np.full(games, self.zones.indexOf("7"), dtype = np.intp)
+        self.ballLocation = np.zeros(games, dtype = np.intp)
+        self.bounds = self.zones.bounds[self.ballZone]
+        self.batSize = np.full(games, self.zoneSize / 2 - self.startBatShrinks * self.zoneSize / 20)
+        self.batInUse = np.zeros(games, dtype = np.intp)      # 0 = zone 1 bat, 1 = zone 4 bat.
+        self.batPos = self.batCentres[self.batInUse].copy()
+        self.jstkZValueOld = np.ones(games, dtype = np.intp)  # Button not pressed.
+        self.hitCounter = np.zeros(games, dtype = np.int64)
+        self.gameOver = np.zeros(games, dtype = bool)
+        # What happened on the last step.
+        self.hits = np.zeros(games, dtype = bool)
+        self.misses = np.zeros(games, dtype = bool)
+        self.bounces = np.zeros(games, dtype = bool)
+        self.sweepOverruns = 0
+        if self.stepper is not None:
+            self.stepper.reset()
+
+    # Play one frame of every game that is not over. The joystick values are scalars or one per game.
+    # Button presses that have already been edge detected, as from a JoystickReader, can be given instead of Z.
+    def step(self, jstkXValue = 512, jstkYValue = 512, jstkZValue = 1, buttonPresses = None):
+        live = ~self.gameOver
+        # If the joystick button is pressed, change active bat.
+        if buttonPresses is None:
+            jstkZValue = np.broadcast_to(jstkZValue, self.games)
+            pressed = live & (jstkZValue == 0) & (self.jstkZValueOld != 0)
+            self.jstkZValueOld = np.where(live, jstkZValue, self.jstkZValueOld)
+        else:
+            pressed = live & (np.asarray(buttonPresses) % 2 == 1)
+        self.batInUse ^= pressed
+        # Move the active bat.
+        batMoveScaler = self.zoneSize - self.batSize
+        batPos = self.batCentres[self.batInUse].copy()
+        batPos[:, 0] += batOffset(np.asarray(jstkXValue, dtype = float), batMoveScaler)
+        batPos[:, 1] += batOffset(np.asarray(jstkYValue, dtype = float), batMoveScaler)
+        self.batPos = np.where(live[:, np.newaxis], batPos, self.batPos)
+        if self.stepper is None:
+            self.discreteMove(live)
+        else:
+            self.sweptMove(live)
+        self.frames += live
+        return self
+
+    # The original physics: one move per frame, then check for hits, misses and bounces.
+    def discreteMove(self, live):
+        ballPos = self.ballPos
+        ballChange = self.ballChange
+        # Check if the ball is about to, or has, escaped from the open ends of the arena.
+        escaping = (ballPos[:, 2] + self.ballRadius + ballChange[:, 2]) >= self.escapeZ
+        # Check where the ball is going, and set the boundaries.
+        ballZone = self.zones.locateMany(ballPos, ballChange, self.ballRadius)
+        located = ballZone >= 0
+        self.ballZone = np.where(located, ballZone, self.ballZone)
+        self.ballLocation = np.where(located, ballZone + 1, 0)
+        self.bounds = self.zones.bounds[self.ballZone]
+        # Move the ball.
+        ballPos += ballChange * live[:, np.newaxis]
+        # If the ball is about to escape, is the active bat in the right place to keep it in the arena?
+        escaping &= live
+        batHit = batHits(ballPos, self.batPos, self.batSize)
+        self.hits = escaping & batHit
+        self.misses = escaping & ~batHit
+        self.hitCounter += self.hits
+        # Increase the difficulty: Make the bats a bit smaller.
+        shrink = self.hits & (self.hitCounter + self.startBatShrinks < BAT_SHRINK_HITS)
+        self.batSize = np.where(shrink, self.batSize - self.zoneSize / 20, self.batSize)
+        self.gameOver |= self.misses
+        # Check if the ball has hit a boundary, and if it is moving towards that boundary, reverse the direction.
+        liveChange = ballChange[live]
+        self.bounces = np.zeros(self.games, dtype = bool)
+        self.bounces[live] = reflectBalls(ballPos[live], liveChange, self.bounds[live], self.ballRadius)
+        ballChange[live] = liveChange
+
+    # Fixed time steps with swept collisions, as many as are due this frame. The bats only move and shrink between frames,
+    # and the sweep is exact, so all the steps due are swept in one go - the same as one at a time, without the loop.
+    def sweptMove(self, live):
+        batHalf = self.batSize / 2
+        batBounds = np.column_stack((self.batPos[:, 0] - batHalf, self.batPos[:, 0] + batHalf, self.batPos[:, 1] - batHalf, self.batPos[:, 1] + batHalf))
+        physicsSteps = self.stepper.advance(self.frameTimeNs)
+        (hitCounts, self.misses, self.bounces, overruns) = sweepBalls(self.ballPos, self.ballChange, self.ballZone, self.ballRadius, self.zones, batBounds, physicsSteps * self.stepFraction * live)
+        self.hits = hitCounts > 0
+        self.sweepOverruns += int(overruns.sum())
+        self.ballLocation = self.ballZone + 1
+        self.bounds = self.zones.bounds[self.ballZone]
+        # Increase the difficulty: Make the bats a bit smaller, once for each hit.
+        for hit in range(hitCounts.max(initial = 0)):
+            hitNow = hitCounts > hit
+            self.hitCounter += hitNow
+            shrink = hitNow & (self.hitCounter + self.startBatShrinks < BAT_SHRINK_HITS)
+            self.batSize = np.where(shrink, self.batSize - self.zoneSize / 20, self.batSize)
+        self.gameOver |= self.misses
+
+    # Play frames until every game is over, or maxFrames have been played.
+    # The joystick is a function of the physics engine that returns the (X, Y, Z) joystick values for the next frame.
+    def run(self, maxFrames = 100000, joystick = None):
+        for frame in range(maxFrames):
+            if self.gameOver.all():
+                break
+            if joystick is None:
+                self.step()
+            else:
+                self.step(*joystick(self))
+        return self
+
+# The perfect player: the joystick follows the ball and the active bat is the one at the ball's side of the arena.
+def trackingJoystick(physics):
+    batInUse = physics.batInUse
+    wantedBat = (physics.ballPos[:, 0] > 0).astype(np.intp)
+    batMoveScaler = physics.zoneSize - physics.batSize
+    target = physics.ballPos[:, :2] - physics.batCentres[wantedBat]
+    jstkValues = np.clip((target / np.reshape(batMoveScaler, (-1, 1)) + 0.5) * 1024.0, 0, 1023)
+    # Press the button to swap bats, or release it.
+    jstkZValue = np.where((wantedBat != batInUse) & (physics.jstkZValueOld != 0), 0, 1)
+    return (jstkValues[:, 0], jstkValues[:, 1], jstkZValue)
+
+# A quick headless sweep -> python -m pong3d.physics
+def main(games = 10000, maxFrames = 2000, seed = 17):
+    physics = BatchPhysics(games, seed = seed)
+    startTime = time.perf_counter()
+    physics.run(maxFrames, trackingJoystick)
+    runTime = time.perf_counter() - startTime
+    frames = physics.frames.sum()
+    print("%d games, %d frames in %.2fs -> %.0f frames/s (%.0fx real time at 100Hz)" % (games, frames, runTime, frames / runTime, frames / runTime / 100))
+    print("Hits: mean %.1f, max %d. Games over: %d" % (physics.hitCounter.mean(), physics.hitCounter.max(), physics.gameOver.sum()))
+
+if __name__ == "__main__":
+    main()
+
+# EOF
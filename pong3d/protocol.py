@@ -0,0 +1,197 @@
+# The Arduino serial protocol.
+# Joystick data from the Arduino -> "X,Y,Z!CRC8\r\n", e.g. "512,512,1!167\r\n".
+# Commands to the Arduino -> "Subject=Action[,Subject=Action]!CRC8\n", e.g. "LEDs=3,Beep=L150!67\n".
+# Binary framing, if both ends agree to it with the "Mode=B" command:
+#   Joystick data -> 0xa5 0x5a, X (uint16), Y (uint16), Z (uint8), CRC8 of X, Y and Z. 8 bytes, little endian.
+#   Commands      -> 0xc3, LEDs (int8, -1 = no change), note ('L', 'H' or 0 = no beep), duration (uint16), CRC8 of LEDs to duration. 6 bytes.
+
+import struct
+
+from pong3d.crc8 import calcCRC8, CRC8_TABLE
+
+# The binary frame layouts.
+JOYSTICK_FRAME = struct.Struct("<2sHHBB")
+JOYSTICK_FRAME_SYNC = b"\xa5\x5a"
+COMMAND_FRAME = struct.Struct("<BbcHB")
+COMMAND_FRAME_SYNC = 0xc3
+
+# A line that grows longer than this without a newline is rubbish, not a packet.
+MAX_PACKET_SIZE = 64
+
+# Parse a joystick data packet (bytes, with or without the CRLF) -> (jstkXValue, jstkYValue, jstkZValue), or None if it is corrupt.
+def parseJoystickPacket(arduinoDataPacket = b""):
+    # Split the CSV bytes into data and CRC8 checksum parts, if there is a CRC8 checksum.
+    (sensorData, chksumFound, chksumCRC8) = arduinoDataPacket.strip(b"\r\n").partition(b"!")
+    # The sensor data is only good if the CRC8 checksum passes, or if no CRC8 checksum was provided.
+    if chksumFound:
+        # calcCRC8, inline: this runs for every packet.
+        table = CRC8_TABLE
+        crc = 0
+        for dataByte in sensorData:
+            crc = table[crc ^ dataByte]
+        if not (chksumCRC8.isdigit() and crc == int(chksumCRC8)):
+            return None
+    sensorValues = sensorData.split(b",")
+    if len(sensorValues) != 3:
+        return None
+    (jstkXValue, jstkYValue, jstkZValue) = sensorValues
+    if not (jstkXValue.isdigit() and jstkYValue.isdigit() and jstkZValue.isdigit()):
+        return None
+    return (int(jstkXValue), int(jstkYValue), int(jstkZValue))
+
+# Build a joystick data packet, exactly as the Arduino sends it.
+def encodeJoystickPacket(jstkXValue = 512, jstkYValue = 512, jstkZValue = 1):
+    sensorData = b"%d,%d,%d" % (jstkXValue, jstkYValue, jstkZValue)
+    return b"%s!%d\r\n" % (sensorData, calcCRC8(sensorData))
+
+# Build a command for the Arduino: the command, the delimiter, its CRC8 checksum and a newline.
+def encodeCommand(arduinoCmd = ""):
+    arduinoCmd = arduinoCmd.encode()
+    return b"%s!%d\n" % (arduinoCmd, calcCRC8(arduinoCmd))
+
+# Parse a command received from Python, as the Arduino does -> {subject: action}, or None if it is corrupt.
+def parseCommand(arduinoCmd = b""):
+    (commands, chksumFound, chksumCRC8) = arduinoCmd.strip(b"\r\n").partition(b"!")
+    if chksumFound and not (chksumCRC8.isdigit() and calcCRC8(commands) == int(chksumCRC8)):
+        return None
+    commandParts = commands.replace(b"=", b",").split(b",")
+    return {subject.decode(): action.decode() for (subject, action) in zip(commandParts[0::2], commandParts[1::2])}
+
+# Turns a stream of bytes, received in pieces of any size, into joystick samples.
+class CSVPacketParser():
+    def __init__(self):
+        self.pending = b"" # A partly received packet.
+        self.goodFrames = 0
+        self.corruptFrames = 0
+
+    # Add some received bytes, and return a list of the joystick samples they completed.
+    def feed(self, data = b""):
+        # The usual case, one whole packet per read and nothing pending, needs no joining or splitting.
+        if not self.pending and data and data.find(b"\n") == len(data) - 1:
+            sample = parseJoystickPacket(data)
+            if sample is None:
+                self.corruptFrames += 1
+                return []
+            self.goodFrames += 1
+            return [sample]
+        arduinoDataPackets = (self.pending + data).split(b"\n")
+        self.pending = arduinoDataPackets.pop()
+        # Never let a missing newline grow the pending packet forever.
+        if len(self.pending) > MAX_PACKET_SIZE:
+            self.corruptFrames += 1
+            self.pending = b""
+        samples = []
+        for arduinoDataPacket in arduinoDataPackets:
+            sample = parseJoystickPacket(arduinoDataPacket)
+            if sample is None:
+                self.corruptFrames += 1
+            else:
+                self.goodFrames += 1
+                samples.append(sample)
+        return samples
+
+    # Forget any partly received packet.
+    def reset(self):
+        self.pending = b""
+
+# Build a binary joystick data frame, exactly as the Arduino sends it.
+def encodeBinaryJoystickFrame(jstkXValue = 512, jstkYValue = 512, jstkZValue = 1):
+    frame = bytearray(JOYSTICK_FRAME.pack(JOYSTICK_FRAME_SYNC, jstkXValue, jstkYValue, jstkZValue, 0))
+    frame[-1] = calcCRC8(memoryview(frame)[2:-1])
+    return bytes(frame)
+
+# Turns a stream of bytes into joystick samples, straight out of one reusable buffer with no intermediate strings.
+class BinaryPacketParser():
+    def __init__(self):
+        self.buffer = bytearray()
+        self.goodFrames = 0
+        self.corruptFrames = 0
+
+    # Add some received bytes, and return a list of the joystick samples they completed.
+    def feed(self, data = b""):
+        # Locals are quicker than globals and attributes in the loop.
+        unpackFrame = JOYSTICK_FRAME.unpack_from
+        frameSize = JOYSTICK_FRAME.size
+        table = CRC8_TABLE
+        buffer = self.buffer
+        # The usual case, one whole frame per read and nothing pending, is unpacked straight from the read.
+        if not buffer and len(data) == frameSize and data[:2] == JOYSTICK_FRAME_SYNC:
+            (frameSync, jstkXValue, jstkYValue, jstkZValue, chksumCRC8) = unpackFrame(data)
+            if table[table[table[table[table[data[2]] ^ data[3]] ^ data[4]] ^ data[5]] ^ jstkZValue] == chksumCRC8:
+                self.goodFrames += 1
+                return [(jstkXValue, jstkYValue, jstkZValue)]
+        buffer += data
+        samples = []
+        lastFrameStart = len(buffer) - frameSize
+        frameStart = buffer.find(JOYSTICK_FRAME_SYNC)
+        while 0 <= frameStart <= lastFrameStart:
+            (frameSync, jstkXValue, jstkYValue, jstkZValue, chksumCRC8) = unpackFrame(buffer, frameStart)
+            # The CRC8 checksum of the 5 data bytes, unrolled.
+            crc = table[buffer[frameStart + 2]]
+            crc = table[crc ^ buffer[frameStart + 3]]
+            crc = table[crc ^ buffer[frameStart + 4]]
+            crc = table[crc ^ buffer[frameStart + 5]]
+            crc = table[crc ^ jstkZValue]
+            if crc == chksumCRC8:
+                self.goodFrames += 1
+                samples.append((jstkXValue, jstkYValue, jstkZValue))
+                frameStart += frameSize
+            else:
+                # Not a frame, or a damaged one. Look for the next sync after this one.
+                self.corruptFrames += 1
+                frameStart += 1
+            frameStart = buffer.find(JOYSTICK_FRAME_SYNC, frameStart)
+        # Keep only what could be the start of the next frame.
+        if frameStart < 0:
+            del buffer[:max(0, len(buffer) - 1)]
+        else:
+            del buffer[:frameStart]
+        return samples
+
+    # Forget any partly received frame.
+    def reset(self):
+        self.buffer.clear()
+
+# Build a binary command for the Arduino.
+def encodeBinaryCommand(LEDs = -1, beepNote = "", beepDuration = 0):
+    frame = bytearray(COMMAND_FRAME.pack(COMMAND_FRAME_SYNC, LEDs, beepNote.encode() or b"\x00", beepDuration, 0))
+    frame[-1] = calcCRC8(memoryview(frame)[1:-1])
+    return bytes(frame)
+
+# Parse a binary command, as the Arduino does -> {subject: action}, the same as parseCommand, or None if it is corrupt.
+def parseBinaryCommand(frame = b""):
+    if len(frame) != COMMAND_FRAME.size or frame[0] != COMMAND_FRAME_SYNC or calcCRC8(frame[1:-1]) != frame[-1]:
+        return None
+    (frameSync, LEDs, beepNote, beepDuration, chksumCRC8) = COMMAND_FRAME.unpack(frame)
+    command = {}
+    if LEDs >= 0:
+        command["LEDs"] = str(LEDs)
+    if beepNote != b"\x00":
+        command["Beep"] = "%s%d" % (beepNote.decode(), beepDuration)
+    return command
+
+# The two framings, each with a parser for the joystick data and an encoder for the commands.
+# A command is an LED update, a beep or both. LEDs = -1, or no beep note, leaves that part out.
+class CSVFraming():
+    name = "csv"
+    def createParser(self):
+        return CSVPacketParser()
+    def encodeCommand(self, LEDs = -1, beepNote = "", beepDuration = 0):
+        arduinoCmd = []
+        if LEDs >= 0:
+            arduinoCmd.append("LEDs=%d" % LEDs)
+        if beepNote:
+            arduinoCmd.append("Beep=%s%d" % (beepNote, beepDuration))
+        return encodeCommand(",".join(arduinoCmd))
+
+class BinaryFraming():
+    name = "binary"
+    def createParser(self):
+        return BinaryPacketParser()
+    def encodeCommand(self, LEDs = -1, beepNote = "", beepDuration = 0):
+        return encodeBinaryCommand(LEDs, beepNote, beepDuration)
+
+# Ask the Arduino to change to binary framing.
+BINARY_MODE_COMMAND = encodeCommand("Mode=B")
+
+# EOF
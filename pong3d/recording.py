@@ -0,0 +1,171 @@
+# Recording and replaying the game inputs, so a game can be played again exactly - for bug hunting and benchmarking.
+# A recording is a compact, append only, binary file:
+#   Header -> "P3DR", version (uint16), RNG seed (uint64), ball count (uint16),
+#             frame rate (uint16), physics rate (uint16, 0 = one discrete move per frame), ball speed scale (float64),
+#             start bat shrinks (uint16).
+#   Record -> frame number (uint32), X (uint16), Y (uint16), Z (uint8), button presses (uint8). One per joystick sample used.
+# Recordings are read through a memory map, so even hour long sessions are not loaded into memory.
+# The header is written as soon as recording starts, and the records at least every second, so a crash loses very little.
+
+import mmap
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+from pong3d.physics import BatchPhysics
+
+RECORDING_MAGIC = b"P3DR"
+RECORDING_VERSION = 1
+RECORDING_HEADER = struct.Struct("<4sHQHHHdH")
+RECORDING_RECORD = struct.Struct("<IHHBB")
+RECORD_DTYPE = np.dtype([("frame", "<u4"), ("jstkXValue", "<u2"), ("jstkYValue", "<u2"), ("jstkZValue", "u1"), ("buttonPresses", "u1")])
+# Write the records to disk at least this often (seconds), or after this many records, whichever comes first.
+RECORDING_FLUSH_INTERVAL = 1.0
+RECORDING_FLUSH_RECORDS = 1024
+
+# A new random seed, for a game that is being recorded.
+def newSeed():
+    return int(np.random.SeedSequence().entropy) & 0xffffffffffffffff
+
+# Writes the joystick samples, as the game loop uses them, to a recording.
+# The physics settings are recorded too, as a replay only matches with the same physics.
+class InputRecorder():
+    def __init__(self, path, seed, ballCount = 1, frameRate = 100, physicsRate = 0, speedScale = 1.0, startBatShrinks = 0,
+                 flushInterval = RECORDING_FLUSH_INTERVAL, flushRecords = RECORDING_FLUSH_RECORDS):
+        self.path = path
+        self.seed = seed
+        self.flushInterval = flushInterval
+        self.flushRecords = flushRecords
+        self.recordFile = open(path, "wb")
+        self.recordFile.write(RECORDING_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, seed, ballCount, frameRate, physicsRate, speedScale,
+                                                   startBatShrinks))
+        self.lastSample = None
+        self.records = 0
+        self.flush()
+
+    # Record the joystick sample used for a frame, if it has changed or the button has been pressed.
+    # Force a record at the end of each game, so a replay knows how long the last game went on for.
+    def record(self, frame, jstkXValue, jstkYValue, jstkZValue, buttonPresses = 0, force = False):
+        sample = (jstkXValue, jstkYValue, jstkZValue)
+        if sample != self.lastSample or buttonPresses or force:
+            self.recordFile.write(RECORDING_RECORD.pack(frame, jstkXValue, jstkYValue, jstkZValue, min(buttonPresses, 255)))
+            self.lastSample = sample
+            self.records += 1
+            if self.records - self.flushedRecords >= self.flushRecords or time.monotonic() >= self.nextFlushTime:
+                self.flush()
+
+    def flush(self):
+        self.recordFile.flush()
+        self.flushedRecords = self.records
+        self.nextFlushTime = time.monotonic() + self.flushInterval
+
+    def close(self):
+        self.recordFile.close()
+
+# A recording, memory mapped. The records are a numpy structured array view of the file, not a copy of it.
+class InputRecording():
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as recordFile:
+            # An empty file can not be memory mapped, and one that stops in the header has nothing to replay.
+            if os.fstat(recordFile.fileno()).st_size < RECORDING_HEADER.size:
+                raise ValueError("%s is an empty or truncated recording" % path)
+            self.mappedFile = mmap.mmap(recordFile.fileno(), 0, access = mmap.ACCESS_READ)
+        (magic, version, self.seed, self.ballCount, self.frameRate, self.physicsRate, self.speedScale,
+         self.startBatShrinks) = RECORDING_HEADER.unpack_from(self.mappedFile)
+        if magic != RECORDING_MAGIC or version != RECORDING_VERSION:
+            self.mappedFile.close()
+            raise ValueError("%s is not a version %d recording" % (path, RECORDING_VERSION))
+        # Ignore a partly written last record, from a game that did not finish cleanly.
+        recordCount = (len(self.mappedFile) - RECORDING_HEADER.size) // RECORD_DTYPE.itemsize
+        if recordCount == 0:
+            self.mappedFile.close()
+            raise ValueError("%s is an empty or truncated recording: it has a header, but no records" % path)
+        self.records = np.frombuffer(self.mappedFile, dtype = RECORD_DTYPE, count = recordCount, offset = RECORDING_HEADER.size)
+
+    def __len__(self):
+        return len(self.records)
+
+    # The last frame number in the recording.
+    @property
+    def lastFrame(self):
+        return int(self.records["frame"][-1]) if len(self.records) else 0
+
+    def close(self):
+        self.records = None
+        self.mappedFile.close()
+
+# Plays a recording back into the game loop, in place of the JoystickReader. Call advance() with the frame number each frame.
+class ReplayReader():
+    def __init__(self, recording):
+        self.recording = recording
+        self.frames = recording.records["frame"]
+        self.records = recording.records
+        self.nextRecord = 0
+        self.latest = (512, 512, 1) # Joystick centered, button not pressed.
+        self.buttonPresses = 0
+
+    # Apply the records up to, and including, a frame.
+    def advance(self, frame):
+        # Most frames have no new record.
+        if self.nextRecord >= len(self.frames) or self.frames[self.nextRecord] > frame:
+            return
+        lastRecord = int(np.searchsorted(self.frames, frame, side = "right"))
+        if lastRecord > self.nextRecord:
+            (recordFrame, jstkXValue, jstkYValue, jstkZValue, buttonPresses) = self.records[lastRecord - 1].item()
+            self.latest = (jstkXValue, jstkYValue, jstkZValue)
+            self.buttonPresses += int(self.records["buttonPresses"][self.nextRecord:lastRecord].sum())
+            self.nextRecord = lastRecord
+
+    @property
+    def finished(self):
+        return self.nextRecord >= len(self.records)
+
+    def sample(self):
+        return self.latest
+
+    def takeButtonPresses(self):
+        (buttonPresses, self.buttonPresses) = (self.buttonPresses, 0)
+        return buttonPresses
+
+    # A replay has no receive times, so no input latency.
+    def takeSampleTime(self):
+        return 0
+
+    def stats(self):
+        return {"records": len(self.records), "recordsPlayed": self.nextRecord}
+
+# Replay a recording as fast as possible with no rendering, using the headless physics engine -> the hits of each game.
+def replayHeadless(recording, zoneSize = 10):
+    if recording.ballCount != 1:
+        raise ValueError("Headless replay is for 1 ball games, this recording has %d balls" % recording.ballCount)
+    physics = BatchPhysics(1, zoneSize, seed = recording.seed, physicsRate = recording.physicsRate, frameRate = recording.frameRate,
+                           speedScale = recording.speedScale, startBatShrinks = recording.startBatShrinks)
+    replay = ReplayReader(recording)
+    gameHits = []
+    for frame in range(recording.lastFrame + 1):
+        replay.advance(frame)
+        (jstkXValue, jstkYValue, jstkZValue) = replay.sample()
+        physics.step(jstkXValue, jstkYValue, buttonPresses = replay.takeButtonPresses())
+        if physics.gameOver[0]:
+            gameHits.append(int(physics.hitCounter[0]))
+            physics.reset()
+    return gameHits
+
+# python -m pong3d.recording <recording> -> replay it headless.
+def main(argv = sys.argv[1:]):
+    recording = InputRecording(argv[0])
+    startTime = time.perf_counter()
+    gameHits = replayHeadless(recording)
+    runTime = time.perf_counter() - startTime
+    print("%d records, %d frames replayed in %.2fs (%.0f frames/s)" % (len(recording), recording.lastFrame + 1, runTime, (recording.lastFrame + 1) / runTime))
+    print("Games: %d, hits per game: %s" % (len(gameHits), gameHits))
+    recording.close()
+
+if __name__ == "__main__":
+    main()
+
+# EOF
@@ -0,0 +1,124 @@
+# The vpython scene for the game: the arena, the bats, the balls and the game over messages.
+# Only imported when the game is shown on the screen - a headless game, a test or a tool never imports vpython.
+
+from vpython import canvas, box, sphere, text, vector, color, rate
+
+from pong3d.scene import SceneState
+
+# A function to draw a zone cube.
+def drawZoneCube(rPos = vector(0, 0, 0), cubeSize = 1, sides = 0b111111, name = "NoName"):
+    wallThickness = cubeSize / 50
+    wallThicknessLeft = wallThicknessRight = wallThicknessBottom = wallThicknessTop = wallThicknessBack = wallThicknessFront = 0
+    if (sides & 0b100000):
+        wallLeft   = box(color = color.gray(0.5), opacity = 0.5, pos = vector(-cubeSize / 2,  0, 0) + rPos, size = vector(wallThickness, cubeSize, cubeSize))
+        wallThicknessLeft = wallThickness
+    if (sides & 0b010000):
+        wallRight  = box(color = color.gray(0.5), opacity = 0.5, pos = vector( cubeSize / 2,  0, 0) + rPos, size = vector(wallThickness, cubeSize, cubeSize))
+        wallThicknessRight = wallThickness
+    if (sides & 0b001000):
+        wallBottom = box(color = color.gray(0.5), opacity = 0.5, pos = vector( 0, -cubeSize / 2, 0) + rPos, size = vector(cubeSize, wallThickness, cubeSize))
+        wallThicknessBottom = wallThickness
+    if (sides & 0b000100):
+        wallTop    = box(color = color.gray(0.5), opacity = 0.5, pos = vector( 0,  cubeSize / 2, 0) + rPos, size = vector(cubeSize, wallThickness, cubeSize))
+        wallThicknessTop = wallThickness
+    if (sides & 0b000010):
+        wallBack   = box(color = color.gray(0.5), opacity = 0.5, pos = vector( 0, 0, -cubeSize / 2) + rPos, size = vector(cubeSize, cubeSize, wallThickness))
+        wallThicknessBack = wallThickness
+    if (sides & 0b000001):
+        wallFront  = box(color = color.gray(0.5), opacity = 0.5, pos = vector( 0, 0,  cubeSize / 2) + rPos, size = vector(cubeSize, cubeSize, wallThickness))
+        wallThicknessFront = wallThickness
+    # If there is a room name, display it centered horizontally and vertically.
+    if (name != "NoName"):
+        boxIdentifier = text(text = name, color = color.blue, opacity = 0.25, align = "center", height = cubeSize / 4, pos = vector( 0, - cubeSize / 4 / 2, 0) + rPos, axis = vector(1, 0, 0))
+    # Return the cube boundaries -> [x-left, x-right, y-bottom, y-top, z-back, z-front].
+    return([(-cubeSize / 2 + wallThicknessLeft / 2 + rPos.x), (cubeSize / 2 - wallThicknessRight / 2 + rPos.x),
+            (-cubeSize / 2 + wallThicknessBottom / 2 + rPos.y), (cubeSize / 2 - wallThicknessTop / 2 + rPos.y),
+            (-cubeSize / 2 + wallThicknessBack / 2 + rPos.z), (cubeSize / 2 - wallThicknessFront / 2 + rPos.z)])
+
+# A bat that can have its color, position and size changed. The game works out where it is, this only shows it.
+class drawBat():
+    def __init__(self, sceneState, rPos = vector(0, 0, 0), batSize = 1, inActiveColor = color.gray(0.5)):
+        batThickness = batSize / 10
+        self.centerPos = vector(0, 0, batThickness / 2) + rPos
+        self.inActiveColor = inActiveColor
+        self.bat = box(color = self.inActiveColor, opacity = 0.25, pos = self.centerPos, size = vector(batSize, batSize, batThickness))
+        self.batState = sceneState.track(self.bat)
+    def updateColor(self, batColor = "inactive"):
+        if batColor == "inactive":
+            self.batState.setColor(self.inActiveColor)
+        else:
+            self.batState.setColor(batColor)
+    def updatePos(self, batPosX = 0, batPosY = 0):
+        self.batState.setPos(batPosX, batPosY, self.centerPos.z)
+    def updateSize(self, batSize = 1):
+        batThickness = batSize / 10
+        self.batState.setSize(batSize, batSize, batThickness)
+
+# The game, on the screen. The game calls these as it plays, and the scene state sends only the changes, once per frame.
+class GameRenderer():
+    def __init__(self, game):
+        zoneSize = game.zoneSize
+        # A place on which to put our things...
+        self.arena = canvas(title = "<b><i>Arduino with Python - A Playable 3D Pong Game!</i></b>", background = color.cyan, width = 800, height = 600, autoscale = False)
+        self.arena.range = 2 * zoneSize + zoneSize / 10 # Ensure the game arena is consistantly placed on the canvas.
+        # The things that move or change are tracked, so only real changes are sent to the browser, once per frame.
+        self.sceneState = SceneState(vector, game.settings.renderPosThreshold)
+        # The zones.
+        zones = game.zones
+        for (zoneName, zoneCentre, zoneSides) in zip(zones.names, zones.centres, zones.sides):
+            drawZoneCube(vector(*zoneCentre), zoneSize, zoneSides, zoneName)
+        # The bats.
+        self.bats = [drawBat(self.sceneState, vector(*bat.rPos), game.batSize) for bat in game.bats]
+        # The balls.
+        self.ballStart = vector(*game.balls.start)
+        ballSpheres = [sphere(color = color.green, opacity = 1, radius = game.ballRadius, pos = self.ballStart) for ball in range(game.balls.count)]
+        self.ballStates = [self.sceneState.track(ballSphere) for ballSphere in ballSpheres]
+        # Game end messages.
+        gameOverMessage = text(text = "Game Over!", color = color.red, opacity = 0, align = "center", height = zoneSize / 5, pos = vector(0, zoneSize / 2, zoneSize * 1.5), axis = vector(1, 0, 0))
+        playAgainMessage = text(text = "Press RETURN to play again...", color = color.red, opacity = 0, align = "center", height = zoneSize / 8, pos = vector(0, -(zoneSize / 2 + zoneSize / 8), zoneSize * 1.5), axis = vector(1, 0, 0))
+        self.messageStates = (self.sceneState.track(gameOverMessage), self.sceneState.track(playAgainMessage))
+
+    # Call keyPressed(key) when a key is pressed in the game window.
+    def bindKey(self, keyPressed):
+        self.arena.bind("keydown", lambda evt: keyPressed(evt.key))
+
+    # The vPython rate command is obligatory in animation loops.
+    def rate(self, frameRate):
+        rate(frameRate)
+
+    def showActiveBat(self, batInUse):
+        for (batIndex, bat) in enumerate(self.bats):
+            bat.updateColor(color.red if batIndex == batInUse else "inactive")
+
+    def moveBat(self, batIndex, batPosX, batPosY):
+        self.bats[batIndex].updatePos(batPosX, batPosY)
+
+    def resizeBats(self, batSize):
+        for bat in self.bats:
+            bat.updateSize(batSize)
+
+    # Show the balls where they are now -> a list of (x, y, z).
+    def moveBalls(self, ballPositions):
+        for (ballState, ballPos) in zip(self.ballStates, ballPositions):
+            ballState.setPos(*ballPos)
+
+    def showMissedBall(self, ball):
+        self.ballStates[ball].setColor(color.red)
+
+    def resetBalls(self):
+        for ballState in self.ballStates:
+            ballState.setColor(color.green)
+            ballState.setPos(self.ballStart.x, self.ballStart.y, self.ballStart.z)
+
+    def showGameOver(self, shown = True):
+        for messageState in self.messageStates:
+            messageState.setOpacity(1 if shown else 0)
+
+    # Send everything that has changed this frame to the browser.
+    def flush(self):
+        self.sceneState.flush()
+
+    def stats(self):
+        return self.sceneState.stats()
+
+# EOF
@@ -0,0 +1,97 @@
+# The scene state: a layer between the game logic and the vpython objects.
+# Every vpython attribute write is sent to the browser, so the game sets what it wants shown, as often as it likes,
+# and each tracked object only writes the attributes that have really changed, once per frame, when the scene is flushed.
+# Position moves smaller than the threshold (sub-pixel) are held back until they add up to something worth showing.
+# No vpython import here - the vector type is handed in, so the game logic can use this without a display.
+
+# The vpython attributes that are tracked, if the object has them.
+SCENE_ATTRIBUTES = ("pos", "color", "size", "opacity")
+
+# A vpython vector (or any x, y, z) as a plain tuple, for cheap comparisons. Numbers are left as they are.
+def asTuple(value):
+    if hasattr(value, "x"):
+        return (value.x, value.y, value.z)
+    if isinstance(value, (tuple, list)):
+        return tuple(value)
+    return value
+
+class SceneObject():
+    def __init__(self, sceneState, vpythonObject):
+        self.sceneState = sceneState
+        self.vpythonObject = vpythonObject
+        # What the browser is showing, and what the game wants shown at the next flush.
+        self.shown = {name: asTuple(getattr(vpythonObject, name)) for name in SCENE_ATTRIBUTES if hasattr(vpythonObject, name)}
+        self.wanted = {}
+        self.isDirty = False
+
+    def set(self, name, value, threshold = 0):
+        value = asTuple(value)
+        shownValue = self.shown.get(name)
+        if threshold and shownValue is not None:
+            unchanged = max(abs(wantedAxis - shownAxis) for (wantedAxis, shownAxis) in zip(value, shownValue)) < threshold
+        else:
+            unchanged = value == shownValue
+        sceneState = self.sceneState
+        if unchanged:
+            # Already showing (or near enough). Forget anything wanted since the last flush too.
+            if self.wanted.pop(name, None) is not None:
+                sceneState.savedWrites += 1
+            sceneState.savedWrites += 1
+            return
+        if name in self.wanted:
+            sceneState.savedWrites += 1 # Replaced before it was written.
+        elif not self.isDirty:
+            sceneState.dirtyObjects.append(self)
+            self.isDirty = True
+        self.wanted[name] = value
+
+    def setPos(self, x, y, z):
+        self.set("pos", (x, y, z), self.sceneState.posThreshold)
+
+    def setColor(self, objectColor):
+        self.set("color", objectColor)
+
+    def setSize(self, x, y, z):
+        self.set("size", (x, y, z))
+
+    def setOpacity(self, opacity):
+        self.set("opacity", opacity)
+
+    def flush(self):
+        vector = self.sceneState.vector
+        for (name, value) in self.wanted.items():
+            setattr(self.vpythonObject, name, vector(*value) if isinstance(value, tuple) else value)
+            self.shown[name] = value
+        self.sceneState.attributeWrites += len(self.wanted)
+        self.wanted.clear()
+        self.isDirty = False
+
+class SceneState():
+    def __init__(self, vector, posThreshold = 0.0):
+        self.vector = vector # The vpython vector type, to write vector attributes with.
+        self.posThreshold = posThreshold
+        self.objects = []
+        self.dirtyObjects = []
+        self.attributeWrites = 0 # Attributes written to vpython.
+        self.savedWrites = 0     # Attribute sets that did not need a write: unchanged, too small, or replaced before the flush.
+        self.flushes = 0
+
+    # Track a vpython object. Returns its scene object, to set its attributes with.
+    def track(self, vpythonObject):
+        sceneObject = SceneObject(self, vpythonObject)
+        self.objects.append(sceneObject)
+        return sceneObject
+
+    # Write everything that has changed since the last flush. Once per frame, at the end of the frame.
+    def flush(self):
+        for sceneObject in self.dirtyObjects:
+            sceneObject.flush()
+        self.dirtyObjects.clear()
+        self.flushes += 1
+
+    def stats(self):
+        return {"attributeWrites": self.attributeWrites,
+                "savedWrites": self.savedWrites,
+                "flushes": self.flushes}
+
+# EOF
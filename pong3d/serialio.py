@@ -0,0 +1,278 @@
+# Serial I/O with the Arduino, off the game loop thread.
+# The game loop never waits for the serial port: it picks up the latest joystick sample whenever it wants one.
+
+import collections
+import threading
+import time
+
+import serial
+
+from pong3d.protocol import CSVPacketParser, BinaryPacketParser, CSVFraming, BinaryFraming, BINARY_MODE_COMMAND
+
+# Wait until the Arduino is ready: it resets when the port is opened, and takes a second or so to start sending.
+# Rather than sleeping for a fixed time, wait for the first good (CRC checked) joystick packet, CSV or binary -> True,
+# or False if there is nothing good within the timeout.
+def waitForArduino(arduinoDataStream, timeout = 3.0):
+    parsers = (CSVPacketParser(), BinaryPacketParser())
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        data = arduinoDataStream.read(max(1, arduinoDataStream.in_waiting))
+        if any(parser.feed(data) for parser in parsers):
+            return True
+    return False
+
+# Agree the framing with the Arduino when connecting. Ask for binary framing, and if binary joystick frames do not
+# start arriving within the timeout (older firmware ignores the request), carry on with ASCII CSV.
+# The Arduino only parses commands every JOB3CYCLE (0.2s), so the timeout must be longer than that.
+def negotiateFraming(arduinoDataStream, binary = True, timeout = 0.5):
+    if binary:
+        arduinoDataStream.write(BINARY_MODE_COMMAND)
+        parser = BinaryPacketParser()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if parser.feed(arduinoDataStream.read(max(1, arduinoDataStream.in_waiting))):
+                return BinaryFraming()
+    return CSVFraming()
+
+# Reads, parses and CRC8 checks joystick packets on a background thread.
+# Only the latest good sample is kept, in a slot that is swapped in one (atomic) assignment, so no lock is needed to read it.
+# Button presses are edge triggered and queued, so a press that comes and goes between two frames is never lost.
+class JoystickReader(threading.Thread):
+    def __init__(self, arduinoDataStream, parser = None, frameTimer = None):
+        threading.Thread.__init__(self, name = "JoystickReader", daemon = True)
+        self.arduinoDataStream = arduinoDataStream
+        self.parser = parser if parser is not None else CSVPacketParser()
+        self.frameTimer = frameTimer # If enabled, the packet parse times are recorded here.
+        # The latest sample -> (jstkXValue, jstkYValue, jstkZValue, sequence number, perf_counter_ns when received).
+        self.latest = (512, 512, 1, 0, time.perf_counter_ns()) # Joystick centered, button not pressed.
+        self.takenSequence = 0
+        self.takenTimeNs = 0
+        self.jstkZValueOld = 1
+        self.buttonPresses = collections.deque()
+        self.droppedFrames = 0 # Good samples that were replaced before the game loop took them.
+        self.serialErrors = 0
+        self.running = threading.Event()
+        self.running.set()
+
+    @property
+    def goodFrames(self):
+        return self.parser.goodFrames
+
+    @property
+    def corruptFrames(self):
+        return self.parser.corruptFrames
+
+    def run(self):
+        arduinoDataStream = self.arduinoDataStream
+        while self.running.is_set():
+            try:
+                # Wait (up to the port timeout) for a byte, then take everything else that is waiting.
+                data = arduinoDataStream.read(1)
+                if data:
+                    data += arduinoDataStream.read(arduinoDataStream.in_waiting)
+            except (serial.SerialException, OSError):
+                self.serialErrors += 1
+                time.sleep(0.1)
+                continue
+            self.feed(data)
+
+    # Parse received data, and publish the good samples. The thread does this, or call it directly when the reader is not
+    # started, e.g. when an event loop reads the port.
+    def feed(self, data):
+        if self.frameTimer is not None and self.frameTimer.enabled:
+            parseStartNs = time.perf_counter_ns()
+            samples = self.parser.feed(data)
+            self.frameTimer.record("parse", time.perf_counter_ns() - parseStartNs)
+        else:
+            samples = self.parser.feed(data)
+        for sample in samples:
+            self.publish(*sample)
+
+    # Make a sample the latest, and queue a button press if the button has just been pressed.
+    def publish(self, jstkXValue, jstkYValue, jstkZValue):
+        if jstkZValue == 0 and self.jstkZValueOld != 0:
+            self.buttonPresses.append(time.perf_counter_ns())
+        self.jstkZValueOld = jstkZValue
+        sequence = self.latest[3] + 1
+        if sequence - 1 > self.takenSequence:
+            self.droppedFrames += 1
+        self.latest = (jstkXValue, jstkYValue, jstkZValue, sequence, time.perf_counter_ns())
+
+    # The latest joystick sample -> (jstkXValue, jstkYValue, jstkZValue).
+    def sample(self):
+        latest = self.latest
+        if latest[3] != self.takenSequence:
+            self.takenSequence = latest[3]
+            self.takenTimeNs = latest[4]
+        return latest[:3]
+
+    # When the last sample taken was received (perf_counter_ns), the first time it is asked for, otherwise 0.
+    def takeSampleTime(self):
+        (takenTimeNs, self.takenTimeNs) = (self.takenTimeNs, 0)
+        return takenTimeNs
+
+    # The number of button presses since the last time they were taken.
+    def takeButtonPresses(self):
+        buttonPresses = 0
+        while self.buttonPresses:
+            self.buttonPresses.popleft()
+            buttonPresses += 1
+        return buttonPresses
+
+    def stop(self):
+        self.running.clear()
+        if self.is_alive():
+            self.join()
+
+    def stats(self):
+        return {"goodFrames": self.goodFrames, "corruptFrames": self.corruptFrames, "droppedFrames": self.droppedFrames, "serialErrors": self.serialErrors}
+
+# The Arduino only parses one command every JOB3CYCLE (0.2s), into a 32 byte buffer.
+JOB3CYCLE = 0.200
+# How long stop() waits for the commands still waiting to be written, before they are dropped (seconds).
+STOP_TIMEOUT = 1.0
+# How long the writer thread waits before trying again, when the port took none of the rest of a short write (seconds).
+UNSENT_RETRY = 0.002
+
+# Writes LED and buzzer commands to the Arduino on a background thread, no faster than the Arduino parses them.
+# Commands waiting to be written are merged: the newest LED update replaces an older one, and the longer beep wins
+# (a game over beep beats a new zone beep, which beats a wall bounce beep). An LED update that is already showing is skipped.
+# On a non-blocking port a write can be short: the rest of the command is kept, and written first next time, before anything new.
+class CommandWriter(threading.Thread):
+    def __init__(self, arduinoDataStream, framing, writeCycle = JOB3CYCLE):
+        threading.Thread.__init__(self, name = "CommandWriter", daemon = True)
+        self.arduinoDataStream = arduinoDataStream
+        self.framing = framing
+        self.writeCycle = writeCycle
+        self.pendingLEDs = -1     # No LED update waiting.
+        self.pendingBeep = None   # No beep waiting -> (note, duration).
+        self.LEDsSent = -1        # What the Arduino LEDs are showing, as far as we know.
+        self.unsent = b""         # The rest of a command the port did not take all of.
+        self.unsentLEDs = -1      # The LEDs in that command.
+        self.sentCommands = 0     # Commands written to the Arduino.
+        self.coalescedCommands = 0 # Commands merged into one already waiting, or already showing.
+        self.droppedCommands = 0  # Commands replaced before they could be written.
+        self.serialErrors = 0
+        self.commandReady = threading.Condition()
+        self.running = True
+        self.stopDeadline = 0.0   # When stop() gives up on the commands still waiting.
+        self.lastWriteTime = time.monotonic() - writeCycle
+
+    # Queue an LED update (LEDs >= 0), a beep (beepNote = "L" or "H"), or both. This never waits for the serial port.
+    def send(self, LEDs = -1, beepNote = "", beepDuration = 0):
+        with self.commandReady:
+            if LEDs >= 0:
+                if LEDs == self.pendingLEDs or (self.pendingLEDs < 0 and LEDs == self.LEDsSent):
+                    self.coalescedCommands += 1
+                else:
+                    if self.pendingLEDs >= 0:
+                        self.droppedCommands += 1
+                    self.pendingLEDs = LEDs
+            if beepNote:
+                beep = (beepNote, beepDuration)
+                if beep == self.pendingBeep:
+                    self.coalescedCommands += 1
+                elif self.pendingBeep is None:
+                    self.pendingBeep = beep
+                else:
+                    self.droppedCommands += 1
+                    if beepDuration >= self.pendingBeep[1]:
+                        self.pendingBeep = beep
+            self.commandReady.notify()
+
+    def run(self):
+        while True:
+            with self.commandReady:
+                # Wait for something to write.
+                while self.running and not self.unsent and self.pendingLEDs < 0 and self.pendingBeep is None:
+                    self.commandReady.wait()
+                if not self.unsent and self.pendingLEDs < 0 and self.pendingBeep is None:
+                    break
+                # Stopping, and the port has not taken everything in time: drop what is left, rather than wait for ever.
+                if not self.running and time.monotonic() >= self.stopDeadline:
+                    self.droppedCommands += bool(self.unsent) + (self.pendingLEDs >= 0 or self.pendingBeep is not None)
+                    (self.unsent, self.unsentLEDs, self.pendingLEDs, self.pendingBeep) = (b"", -1, -1, None)
+                    break
+            # Pace the writes to the Arduino command parse cycle. More commands may be merged while we wait.
+            # The rest of a short write is part of a command already paced, so it goes at once.
+            unsentBytes = len(self.unsent)
+            if not unsentBytes:
+                time.sleep(max(0, self.lastWriteTime + self.writeCycle - time.monotonic()))
+            self.writePending()
+            # A full port that took none of it: try again shortly, rather than spin.
+            if unsentBytes and len(self.unsent) == unsentBytes:
+                time.sleep(UNSENT_RETRY)
+
+    # Write the merged command waiting, if there is one. The rest of a short write goes first, on its own.
+    def writePending(self):
+        if self.unsent:
+            self.writeCommand(self.unsent, self.unsentLEDs)
+            return
+        with self.commandReady:
+            (LEDs, beep) = (self.pendingLEDs, self.pendingBeep)
+            self.pendingLEDs = -1
+            self.pendingBeep = None
+        if LEDs < 0 and beep is None:
+            return
+        (beepNote, beepDuration) = beep if beep is not None else ("", 0)
+        self.writeCommand(self.framing.encodeCommand(LEDs, beepNote, beepDuration), LEDs)
+        self.lastWriteTime = time.monotonic()
+
+    # Write a command, or what the port will take of it. It is only sent once all of it is written.
+    def writeCommand(self, command, LEDs):
+        try:
+            written = self.arduinoDataStream.write(command)
+        except (serial.SerialException, OSError):
+            self.serialErrors += 1
+            (self.unsent, self.unsentLEDs) = (b"", -1)
+            return
+        if written is not None and written < len(command):
+            (self.unsent, self.unsentLEDs) = (command[written:], LEDs)
+            return
+        (self.unsent, self.unsentLEDs) = (b"", -1)
+        self.sentCommands += 1
+        if LEDs >= 0:
+            self.LEDsSent = LEDs
+
+    # Without the thread: write the command waiting, if the Arduino is ready for it, and the rest of a short write at once.
+    # Call this often, e.g. every frame.
+    def poll(self):
+        if self.unsent or time.monotonic() - self.lastWriteTime >= self.writeCycle:
+            self.writePending()
+
+    # Stop, after writing anything still waiting, if the port takes it within the timeout. Anything left then is dropped.
+    def stop(self, timeout = STOP_TIMEOUT):
+        with self.commandReady:
+            self.running = False
+            self.stopDeadline = time.monotonic() + timeout
+            self.commandReady.notify()
+        if self.is_alive():
+            # A blocking write that never returns is left to the daemon thread.
+            self.join(timeout + self.writeCycle + UNSENT_RETRY)
+
+    def stats(self):
+        return {"sentCommands": self.sentCommands, "coalescedCommands": self.coalescedCommands, "droppedCommands": self.droppedCommands, "serialErrors": self.serialErrors,
+                "unsentBytes": len(self.unsent)}
+
+# Open the serial port, wait for the Arduino, agree the framing, and start the background reader and writer.
+# Returns (joystickReader, commandWriter), or None if the port can not be opened.
+def connectArduino(port = "com3", baudRate = 115200, binary = True, frameTimer = None, readyTimeout = 3.0):
+    try:
+        # The timeout lets the background reader check if it should stop.
+        arduinoDataStream = serial.Serial(port, baudRate, timeout = 0.1)
+    except serial.SerialException:
+        return None
+    if not waitForArduino(arduinoDataStream, readyTimeout):
+        print("No joystick data from the Arduino on %s yet." % port)
+    # Agree the serial data framing with the Arduino - binary or CSV.
+    framing = negotiateFraming(arduinoDataStream, binary)
+    print("Serial framing: %s" % framing.name)
+    # Read the joystick data in the background, so the game loop never waits for the Arduino.
+    joystickReader = JoystickReader(arduinoDataStream, framing.createParser(), frameTimer)
+    joystickReader.start()
+    # Write the commands in the background too, merged and paced to suit the Arduino.
+    commandWriter = CommandWriter(arduinoDataStream, framing)
+    commandWriter.start()
+    return (joystickReader, commandWriter)
+
+# EOF
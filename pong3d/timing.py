@@ -0,0 +1,140 @@
+# Frame timing: where does each frame's time go?
+# Each phase of the game loop is timed with perf_counter_ns into a fixed-bucket histogram - no lists that grow,
+# and only a few integer operations and an add per phase. When the timer is disabled the game loop skips it completely.
+
+import time
+
+# The histogram buckets are log-linear, in nanoseconds: each power of two (octave) is split into 2^HISTOGRAM_SUB_BITS
+# equal buckets, so a bucket is never wider than 1/8 of the time it starts at, and neither is the error of a percentile.
+# Times under 16ns have a bucket each. The last bucket is everything over ~8s.
+HISTOGRAM_SUB_BITS = 3
+HISTOGRAM_BUCKETS = 248
+
+# The bucket that holds a time.
+def histogramBucket(timeNs):
+    shift = timeNs.bit_length() - HISTOGRAM_SUB_BITS - 1
+    if shift <= 0:
+        return max(timeNs, 0)
+    return min((shift << HISTOGRAM_SUB_BITS) + (timeNs >> shift), HISTOGRAM_BUCKETS - 1)
+
+# The time at the top of a bucket (the next bucket starts here), in nanoseconds.
+def histogramBucketTopNs(bucket):
+    shift = (bucket >> HISTOGRAM_SUB_BITS) - 1
+    if shift <= 0:
+        return bucket + 1
+    return ((bucket & ((1 << HISTOGRAM_SUB_BITS) - 1)) + (1 << HISTOGRAM_SUB_BITS) + 1) << shift
+
+HISTOGRAM_BUCKET_TOPS_NS = [histogramBucketTopNs(bucket) for bucket in range(HISTOGRAM_BUCKETS)]
+
+# The phases of the game loop frame, in order.
+FRAME_PHASES = ("wait", "input", "bats", "zones", "balls", "render", "commands")
+
+class Histogram():
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.totalNs = 0
+        self.maxNs = 0
+
+    def add(self, timeNs):
+        # histogramBucket(), written out: this is on every phase of every frame.
+        shift = timeNs.bit_length() - 4
+        if shift <= 0:
+            self.counts[max(timeNs, 0)] += 1
+        else:
+            self.counts[min((shift << 3) + (timeNs >> shift), HISTOGRAM_BUCKETS - 1)] += 1
+        self.count += 1
+        self.totalNs += timeNs
+        if timeNs > self.maxNs:
+            self.maxNs = timeNs
+
+    # The top of the bucket that holds the given percentile, or the longest time if that is less, in microseconds.
+    def percentile(self, percent):
+        if self.count == 0:
+            return 0
+        wanted = self.count * percent / 100
+        seen = 0
+        for (bucket, bucketCount) in enumerate(self.counts):
+            seen += bucketCount
+            if seen >= wanted:
+                return min(HISTOGRAM_BUCKET_TOPS_NS[bucket], self.maxNs) / 1000
+        return self.maxNs / 1000
+
+    def summary(self):
+        return {"count": self.count,
+                "meanUs": self.totalNs / self.count / 1000 if self.count else 0,
+                "p50Us": self.percentile(50),
+                "p99Us": self.percentile(99),
+                "maxUs": self.maxNs / 1000,
+                # The buckets with anything in -> {the time at the top of the bucket (ns): count}.
+                "buckets": {HISTOGRAM_BUCKET_TOPS_NS[bucket]: bucketCount for (bucket, bucketCount) in enumerate(self.counts) if bucketCount}}
+
+class FrameTimer():
+    def __init__(self, phases = FRAME_PHASES, enabled = False, summaryInterval = 10.0):
+        self.phases = phases
+        self.enabled = enabled
+        self.summaryInterval = summaryInterval # Seconds between printed summaries, 0 for none.
+        # One histogram per phase, plus the whole frame, the input to bat move latency, the background packet parse,
+        # and the age of the joystick reading the bat shows, before and after the input stage filter.
+        self.histograms = {name: Histogram() for name in phases + ("frame", "inputLatency", "parse", "stickAge")}
+        self.phaseHistograms = [self.histograms[name] for name in phases]
+        self.frameHistogram = self.histograms["frame"]
+        self.frameStartNs = self.markNs = time.perf_counter_ns()
+        self.phase = 0
+        self.lastSummaryNs = self.frameStartNs
+
+    def beginFrame(self):
+        self.frameStartNs = self.markNs = time.perf_counter_ns()
+        self.phase = 0
+
+    # The current phase has finished, the next one starts.
+    def endPhase(self):
+        timeNow = time.perf_counter_ns()
+        self.phaseHistograms[self.phase].add(timeNow - self.markNs)
+        self.markNs = timeNow
+        self.phase += 1
+
+    def endFrame(self):
+        timeNow = time.perf_counter_ns()
+        self.frameHistogram.add(timeNow - self.frameStartNs)
+        if self.summaryInterval and timeNow - self.lastSummaryNs >= self.summaryInterval * 1e9:
+            self.lastSummaryNs = timeNow
+            self.printSummary()
+
+    # Time something else, e.g. the input latency or the packet parse -> record("parse", timeNs).
+    def record(self, name, timeNs):
+        self.histograms[name].add(timeNs)
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+    def summary(self):
+        return {name: histogram.summary() for (name, histogram) in self.histograms.items()}
+
+    def printSummary(self):
+        print("%-14s %8s %10s %10s %10s %10s" % ("Phase", "count", "mean(us)", "p50(us)", "p99(us)", "max(us)"))
+        for (name, histogram) in self.histograms.items():
+            if histogram.count:
+                summary = histogram.summary()
+                print("%-14s %8d %10.1f %10.0f %10.0f %10.0f" % (name, summary["count"], summary["meanUs"], summary["p50Us"], summary["p99Us"], summary["maxUs"]))
+
+    # Export the histograms to a JSON file, or a CSV file if the file name ends with .csv.
+    # The CSV has a column per bucket, named by the time at the top of the bucket: "under1152ns" counts the times from 1024ns up to 1152ns.
+    def export(self, path):
+        import json # Only needed here, and it is not free to import at start up.
+        summary = self.summary()
+        with open(path, "w") as exportFile:
+            if path.endswith(".csv"):
+                exportFile.write("phase,count,meanUs,p50Us,p99Us,maxUs,%s\n" % ",".join("under%dns" % topNs for topNs in HISTOGRAM_BUCKET_TOPS_NS))
+                for (name, histogram) in self.histograms.items():
+                    phaseSummary = summary[name]
+                    exportFile.write("%s,%d,%.3f,%.3f,%.3f,%.3f,%s\n" % (name, phaseSummary["count"], phaseSummary["meanUs"], phaseSummary["p50Us"],
+                                                                      phaseSummary["p99Us"], phaseSummary["maxUs"], ",".join(str(count) for count in histogram.counts)))
+            else:
+                json.dump(summary, exportFile, indent = 2)
+
+# EOF
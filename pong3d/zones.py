@@ -0,0 +1,182 @@
+# A registry of the arena zone cubes, with constant time "which zone is the ball in?" lookups.
+# The zones sit on a uniform grid of zoneSize cells, so the ball position maps straight to a grid cell,
+# and the open sides of neighbouring zones are joined up in an adjacency table.
+
+import math
+import numpy as np
+
+# The side bits used by drawZoneCube -> [x-left, x-right, y-bottom, y-top, z-back, z-front].
+SIDE_BITS = (0b100000, 0b010000, 0b001000, 0b000100, 0b000010, 0b000001)
+# The grid cell step through each side, and the matching side of the neighbouring cell.
+SIDE_STEPS = ((-1, 0, 0), (1, 0, 0), (0, -1, 0), (0, 1, 0), (0, 0, -1), (0, 0, 1))
+OPPOSITE_SIDE = (1, 0, 3, 2, 5, 4)
+
+# The standard "U" shaped arena -> (name, grid cell of the centre, sides).
+STANDARD_ARENA = (("1", (-1, 0,  1), 0b111100),
+                  ("2", (-1, 0,  0), 0b111100),
+                  ("3", (-1, 0, -1), 0b101110),
+                  ("4", ( 1, 0,  1), 0b111100),
+                  ("5", ( 1, 0,  0), 0b111100),
+                  ("6", ( 1, 0, -1), 0b011110),
+                  ("7", ( 0, 0, -1), 0b001111))
+
+# The zone cube boundaries, exactly as drawZoneCube calculates them -> [x-left, x-right, y-bottom, y-top, z-back, z-front].
+def zoneCubeBounds(rPos = (0, 0, 0), cubeSize = 1, sides = 0b111111):
+    wallThickness = cubeSize / 50
+    wallThicknesses = [wallThickness if (sides & sideBit) else 0 for sideBit in SIDE_BITS]
+    return([(-cubeSize / 2 + wallThicknesses[0] / 2 + rPos[0]), (cubeSize / 2 - wallThicknesses[1] / 2 + rPos[0]),
+            (-cubeSize / 2 + wallThicknesses[2] / 2 + rPos[1]), (cubeSize / 2 - wallThicknesses[3] / 2 + rPos[1]),
+            (-cubeSize / 2 + wallThicknesses[4] / 2 + rPos[2]), (cubeSize / 2 - wallThicknesses[5] / 2 + rPos[2])])
+
+class ZoneRegistry():
+    def __init__(self, zoneSize = 1):
+        self.zoneSize = zoneSize
+        self.names = []
+        self.centres = []
+        self.sides = []
+        self.boundsList = []                                   # Python lists, for the single ball frame loop.
+        self.bounds = np.zeros((0, 6))                         # One contiguous array of all the zone boundaries.
+        self.adjacency = np.zeros((0, 6), dtype = np.intp)     # The neighbouring zone through each side, or -1.
+        self.adjacencyList = []                                # The same, as Python lists.
+        self.exits = []                                        # The open sides that lead out of the arena -> (zone, side).
+        self.exitSides = np.zeros((0, 6), dtype = bool)        # The same, as a table of each zone's sides.
+        self.neighbourWalls = np.zeros((0, 6, 6))              # The walls of the neighbouring zone through each side (open = +-inf).
+        self.overlapWalls = np.zeros((0, 64, 6))               # The walls of all the neighbours through a set of sides (a bit mask).
+        self.overlapWallsList = []                             # The same, as Python lists.
+        self._cells = {}                                       # The uniform grid -> {(i, j, k): zone}.
+        self.cellGrid = np.zeros((0, 0, 0), dtype = np.intp)   # The same grid as a dense array, for many balls at once.
+        self.cellMin = np.zeros(3, dtype = np.intp)            # The grid cell at cellGrid[0, 0, 0].
+
+    # Add a zone, centred on a grid cell, and return its boundaries. The zone is not found by locate until finalize is called.
+    def addZone(self, cell = (0, 0, 0), sides = 0b111111, name = "NoName"):
+        cell = tuple(int(cellIndex) for cellIndex in cell)
+        if cell in self._cells:
+            raise ValueError("Zone %s overlaps zone %s" % (name, self.names[self._cells[cell]]))
+        zoneCentre = tuple(cellIndex * self.zoneSize for cellIndex in cell)
+        zoneBounds = zoneCubeBounds(zoneCentre, self.zoneSize, sides)
+        self._cells[cell] = len(self.names)
+        self.names.append(name)
+        self.centres.append(zoneCentre)
+        self.sides.append(sides)
+        self.boundsList.append(zoneBounds)
+        return zoneBounds
+
+    # Build the lookup tables, once all the zones are added. Building them on every add was O(n^2), with a large temporary.
+    def finalize(self):
+        self.bounds = np.array(self.boundsList, dtype = float)
+        self._buildAdjacency()
+        self._buildCellGrid()
+        return self
+
+    # The dense grid has a border of empty cells, so anything just outside the arena finds no zone.
+    def _buildCellGrid(self):
+        cells = np.array(list(self._cells.keys()), dtype = np.intp)
+        self.cellMin = cells.min(axis = 0) - 1
+        self.cellGrid = np.full(cells.max(axis = 0) - self.cellMin + 2, -1, dtype = np.intp)
+        self.cellGrid[tuple((cells - self.cellMin).T)] = list(self._cells.values())
+
+    # Two zones are joined if they are grid neighbours and both of the sides between them are open.
+    def _buildAdjacency(self):
+        self.adjacency = np.full((len(self.names), 6), -1, dtype = np.intp)
+        self.exits = []
+        for (cell, zone) in self._cells.items():
+            for side in range(6):
+                if self.sides[zone] & SIDE_BITS[side]:
+                    continue
+                neighbourCell = (cell[0] + SIDE_STEPS[side][0], cell[1] + SIDE_STEPS[side][1], cell[2] + SIDE_STEPS[side][2])
+                neighbour = self._cells.get(neighbourCell, -1)
+                if neighbour >= 0 and not (self.sides[neighbour] & SIDE_BITS[OPPOSITE_SIDE[side]]):
+                    self.adjacency[zone, side] = neighbour
+                elif neighbour < 0:
+                    self.exits.append((zone, side))
+        self.exitSides = np.zeros((len(self.names), 6), dtype = bool)
+        for (zone, side) in self.exits:
+            self.exitSides[zone, side] = True
+        self.adjacencyList = self.adjacency.tolist()
+        # A ball can only cross into a neighbouring zone if it is clear of that zone's walls. Where there is no neighbour, or
+        # the neighbour's side is open, there is nothing to be clear of.
+        openFaces = np.tile([-np.inf, np.inf], 3)
+        self.neighbourWalls = np.tile(openFaces, (len(self.names), 6, 1))
+        for (zone, neighbours) in enumerate(self.adjacency):
+            for (side, neighbour) in enumerate(neighbours):
+                if neighbour >= 0:
+                    self.neighbourWalls[zone, side] = np.where(self.adjacency[neighbour] < 0, self.bounds[neighbour], openFaces)
+        # A ball that overlaps the neighbours through some sides is held in by all their walls: the innermost of them.
+        sideMasks = (np.arange(64)[:, np.newaxis] >> np.arange(6)) & 1 == 1
+        walls = np.where(sideMasks[np.newaxis, :, :, np.newaxis], self.neighbourWalls[:, np.newaxis, :, :], openFaces)
+        self.overlapWalls = np.empty((len(self.names), 64, 6))
+        self.overlapWalls[:, :, 0::2] = walls[:, :, :, 0::2].max(axis = 2)
+        self.overlapWalls[:, :, 1::2] = walls[:, :, :, 1::2].min(axis = 2)
+        self.overlapWallsList = self.overlapWalls.tolist()
+
+    # The zone index of a zone name.
+    def indexOf(self, name):
+        return self.names.index(name)
+
+    # The zone that holds a grid cell, or -1.
+    def zoneAt(self, cell):
+        return self._cells.get(cell, -1)
+
+    # The grid cell of a point.
+    def cellOf(self, x, y, z):
+        zoneSize = self.zoneSize
+        return (math.floor(x / zoneSize + 0.5), math.floor(y / zoneSize + 0.5), math.floor(z / zoneSize + 0.5))
+
+    # Find the zone a ball is travelling into, or -1 if it is not inside the arena.
+    # A ball with a radius can be in 2 zones, so the zone is the one its leading edge is moving into,
+    # as long as the side between the zones is open.
+    def locate(self, pos = (0, 0, 0), change = (0, 0, 0), radius = 0):
+        zoneSize = self.zoneSize
+        nextPos = (pos[0] + change[0], pos[1] + change[1], pos[2] + change[2])
+        nextCell = (math.floor(nextPos[0] / zoneSize + 0.5), math.floor(nextPos[1] / zoneSize + 0.5), math.floor(nextPos[2] / zoneSize + 0.5))
+        zone = self._cells.get(nextCell, -1)
+        if zone < 0:
+            return -1
+        for axis in range(3):
+            if change[axis] > 0:
+                leadingEdge = nextPos[axis] + radius
+                side = 2 * axis + 1
+            elif change[axis] < 0:
+                leadingEdge = nextPos[axis] - radius
+                side = 2 * axis
+            else:
+                continue
+            # Has the leading edge crossed into the next grid cell?
+            if math.floor(leadingEdge / zoneSize + 0.5) != nextCell[axis]:
+                neighbour = self.adjacencyList[zone][side]
+                if neighbour >= 0:
+                    zone = neighbour
+        return zone
+
+    # The same as locate, but for arrays of balls -> pos (N, 3), change (N, 3) and radius (scalar or N).
+    def locateMany(self, pos, change, radius = 0):
+        nextPos = pos + change
+        nextCells = np.floor(nextPos / self.zoneSize + 0.5).astype(np.intp)
+        zone = self.cellsToZones(nextCells)
+        inArena = zone >= 0
+        # Keep the -1s out of the adjacency table look ups.
+        safeZone = np.where(inArena, zone, 0)
+        direction = np.sign(change)
+        leadingCells = np.floor((nextPos + direction * np.reshape(radius, (-1, 1))) / self.zoneSize + 0.5).astype(np.intp)
+        for axis in range(3):
+            side = np.where(direction[:, axis] > 0, 2 * axis + 1, 2 * axis)
+            crossed = inArena & (direction[:, axis] != 0) & (leadingCells[:, axis] != nextCells[:, axis])
+            neighbour = self.adjacency[safeZone, side]
+            safeZone = np.where(crossed & (neighbour >= 0), neighbour, safeZone)
+        return np.where(inArena, safeZone, -1)
+
+    # The zones that hold an array of grid cells (N, 3), or -1.
+    def cellsToZones(self, cells):
+        gridCells = cells - self.cellMin
+        onGrid = np.all((gridCells >= 0) & (gridCells < self.cellGrid.shape), axis = 1)
+        gridCells = np.where(onGrid[:, np.newaxis], gridCells, 0)
+        return np.where(onGrid, self.cellGrid[gridCells[:, 0], gridCells[:, 1], gridCells[:, 2]], -1)
+
+# Build a zone registry for a zone layout, STANDARD_ARENA by default.
+def buildZones(zoneSize = 1, layout = STANDARD_ARENA):
+    zones = ZoneRegistry(zoneSize)
+    for (name, cell, sides) in layout:
+        zones.addZone(cell, sides, name)
+    return zones.finalize()
+
+# EOF
@@ -0,0 +1,41 @@
+# The tests run against the pong3d package in this repository, not an installed one.
+# Run from the repository root: python -m pytest
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import math
+
+from pong3d.autoplay import AutoPlayer
+from pong3d.game import GameSettings
+
+# The helpers below are shared by the test files, which import them with: from conftest import SloppyPlayer, gameSettings
+
+# The autoplayer, with its aim wandering off now and then, so it hits some balls and misses others, the same every time.
+class SloppyPlayer(AutoPlayer):
+    def __init__(self, game):
+        AutoPlayer.__init__(self, game)
+        self.aims = 0
+
+    def jstkValue(self, position, batCentre):
+        self.aims += 1
+        return AutoPlayer.jstkValue(self, position + 0.25 * self.game.zoneSize * math.sin(self.aims / 97), batCentre)
+
+# The settings for a headless game with no Arduino, which restarts itself when a game ends.
+def gameSettings(ballCount = 1, physicsRate = 0, startBatShrinks = 0, recordPath = None, replayPath = None, randomSeed = 2):
+    settings = GameSettings()
+    settings.serialPort = None
+    settings.headless = True
+    settings.verbose = False
+    settings.autoRestart = True
+    settings.ballCount = ballCount
+    settings.physicsRate = physicsRate
+    settings.startBatShrinks = startBatShrinks
+    settings.recordPath = recordPath
+    settings.replayPath = replayPath
+    settings.randomSeed = randomSeed
+    return settings
+
+# EOF
@@ -0,0 +1,42 @@
+# The CRC8 checksums: the table must give the same answers as the original bit loop, one packet at a time or many at once.
+
+import pytest
+
+from pong3d.crc8 import calcCRC8, checkCRC8Many, CRC8
+
+# The original Lesson17.py calcCRC8, the Arduino code translated, which took strings.
+def calcCRC8BitLoop(data2Check = ""):
+    chksumCRC8 = 0
+    for character in data2Check:
+        dataByte = ord(character)
+        for bitCounter in range(8):
+            sum = ((dataByte ^ chksumCRC8) & 1)
+            chksumCRC8 >>= 1
+            if sum:
+                chksumCRC8 ^= 0x8c
+            dataByte >>= 1
+    return chksumCRC8
+
+STRINGS = ["", "123456789", "512,512,1", "1023,0,0", "LEDs=7,Beep=L150", "café €☃"]
+
+@pytest.mark.parametrize("data", STRINGS)
+def testCRC8OfStrings(data):
+    assert calcCRC8(data) == calcCRC8BitLoop(data)
+    if max(map(ord, data), default = 0) < 256:
+        assert calcCRC8(data.encode("latin-1")) == calcCRC8(bytearray(data.encode("latin-1"))) == calcCRC8(memoryview(data.encode("latin-1")))
+    assert CRC8(data[:3]).update(data[3:]).value == calcCRC8BitLoop(data)
+
+def testCRC8CheckValue():
+    assert calcCRC8("123456789") == calcCRC8(b"123456789") == 0xa1 # The CRC-8/MAXIM check value.
+
+# Many frames, of any type, with one checksum wrong.
+def testCheckCRC8Many():
+    frames = [data.encode("latin-1") for data in STRINGS[:5]] + [STRINGS[5], bytearray(b"512,511,1"), memoryview(b"1,2,3")]
+    chksumsCRC8 = [calcCRC8BitLoop(frame) for frame in STRINGS[:5]] + [calcCRC8BitLoop(STRINGS[5]), calcCRC8(b"512,511,1"), calcCRC8(b"1,2,3")]
+    chksumsCRC8[2] ^= 1
+    assert checkCRC8Many(frames, chksumsCRC8) == [True, True, False, True, True, True, True, True]
+    assert checkCRC8Many([], []) == []
+    with pytest.raises(ValueError):
+        checkCRC8Many(frames, chksumsCRC8[:-1])
+
+# EOF
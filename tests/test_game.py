@@ -0,0 +1,81 @@
+# The game loop, headless.
+
+import pytest
+
+import pong3d.serialio
+from pong3d.game import Game, GameSettings, HeadlessRenderer, main, parseArguments
+from pong3d.physics import BAT_SHRINK_HITS
+from pong3d.recording import InputRecorder
+
+def headlessSettings(ballCount = 1, physicsRate = 1000, randomSeed = 17):
+    settings = GameSettings()
+    settings.serialPort = None
+    settings.headless = True
+    settings.verbose = False
+    settings.ballCount = ballCount
+    settings.physicsRate = physicsRate
+    settings.randomSeed = randomSeed
+    return settings
+
+# A joystick that presses the button on some frames.
+class ButtonJoystick():
+    def __init__(self, pressFrames):
+        self.pressFrames = pressFrames
+        self.samples = 0
+
+    def sample(self):
+        self.samples += 1
+        return (512, 512, 1)
+
+    def takeButtonPresses(self):
+        return self.pressFrames.get(self.samples, 0)
+
+    def takeSampleTime(self):
+        return 0
+
+    def stats(self):
+        return {}
+
+# Counts the active bat changes it is asked to show.
+class ActiveBatRenderer(HeadlessRenderer):
+    def __init__(self):
+        HeadlessRenderer.__init__(self, paced = False)
+        self.activeBats = []
+
+    def showActiveBat(self, batInUse):
+        self.activeBats.append(batInUse)
+
+# The bat colours are only set when the active bat changes, not every frame.
+def testActiveBatOnlyShownWhenItChanges():
+    renderer = ActiveBatRenderer()
+    # One press swaps the bat, two in the same frame swap it back, so there is nothing to show.
+    game = Game(headlessSettings(), ButtonJoystick({10: 1, 20: 2, 30: 1}), renderer = renderer)
+    game.newGame()
+    for frame in range(100):
+        game.frame()
+    assert renderer.activeBats == [0, 1, 0]
+    assert game.batInUse == 0
+
+# At least one ball, and the bats no smaller than the smallest they shrink to.
+@pytest.mark.parametrize("argv", [["--balls", "0"], ["--balls", "-2"], ["--bat-shrinks", "-1"], ["--bat-shrinks", str(BAT_SHRINK_HITS)], ["--balls", "two"]])
+def testArgumentsOutOfRange(argv):
+    with pytest.raises(SystemExit):
+        parseArguments(argv)
+
+def testArgumentsInRange():
+    (settings, maxFrames) = parseArguments(["--balls", "1", "--bat-shrinks", str(BAT_SHRINK_HITS - 1), "--frames", "10"])
+    assert (settings.ballCount, settings.startBatShrinks, maxFrames) == (1, BAT_SHRINK_HITS - 1, 10)
+
+# A replay plays from the recording, and does not open the serial port, even when one is given.
+def testReplayWithoutTheArduino(tmp_path, monkeypatch):
+    recordPath = str(tmp_path / "game.p3dr")
+    recorder = InputRecorder(recordPath, 17)
+    for frame in range(0, 100, 10):
+        recorder.record(frame, 512 + frame, 512, 1)
+    recorder.close()
+    def connectArduino(*args):
+        raise AssertionError("the serial port was opened")
+    monkeypatch.setattr(pong3d.serialio, "connectArduino", connectArduino)
+    main(["--headless", "--port", "/dev/ttyUSB0", "--replay", recordPath, "--frames", "200"])
+
+# EOF
@@ -0,0 +1,72 @@
+# The joystick input stage: the frame timer's stick age, and the filters following the stick.
+
+import pytest
+
+from pong3d.inputstage import InputStage, SAMPLE_AGE_NS
+from pong3d.timing import FrameTimer
+
+FRAME_NS = 10000000
+SAMPLE_NS = 50000000
+
+# A joystick whose stick moves 1 unit every 10ms, with a sample arriving every 50ms, read SAMPLE_AGE_NS before it arrives.
+class SteadyJoystick():
+    def __init__(self):
+        self.timeNs = 0
+        self.arrivalNs = 0
+        self.newArrivalNs = 0
+
+    def stickAt(self, timeNs):
+        return 200 + timeNs / FRAME_NS
+
+    def sample(self):
+        arrivalNs = self.timeNs - self.timeNs % SAMPLE_NS
+        if arrivalNs != self.arrivalNs:
+            self.arrivalNs = self.newArrivalNs = arrivalNs
+        return (int(self.stickAt(self.arrivalNs - SAMPLE_AGE_NS)), 512, 1)
+
+    def takeSampleTime(self):
+        (newArrivalNs, self.newArrivalNs) = (self.newArrivalNs, 0)
+        return newArrivalNs
+
+    def takeButtonPresses(self):
+        return 0
+
+    def stats(self):
+        return {}
+
+# Play some 100Hz frames -> (the stick X value shown on each frame, the frame timer histograms).
+def playFrames(filterName, frames = 400):
+    joystick = SteadyJoystick()
+    frameTimer = FrameTimer(enabled = True, summaryInterval = 0)
+    inputStage = InputStage(joystick, filterName, frameTimer = frameTimer)
+    shown = []
+    for frame in range(1, frames + 1):
+        joystick.timeNs = frame * FRAME_NS
+        shown.append(inputStage.sample(joystick.timeNs)[0])
+    return (shown, frameTimer.histograms)
+
+def averageMs(histogram):
+    return histogram.totalNs / histogram.count / 1e6
+
+# The stick age is the age of the newest reading: 0 - 40ms since it arrived, plus its time in the Arduino, whatever the filter.
+@pytest.mark.parametrize("filterName", ["none", "exponential", "velocity"])
+def testStickAge(filterName):
+    (shown, histograms) = playFrames(filterName)
+    assert histograms["stickAge"].count == 396 # From the first sample with a time, at 50ms.
+    assert averageMs(histograms["stickAge"]) == pytest.approx(SAMPLE_AGE_NS / 1e6 + 20, abs = 0.5)
+
+# With no filter, the bat shows the newest reading. Smoothing puts it further behind the stick.
+def testExponentialFilterLags():
+    joystick = SteadyJoystick()
+    stick = [joystick.stickAt(frame * FRAME_NS) for frame in range(351, 401)]
+    lagNone = sum(stick) - sum(playFrames("none")[0][-50:])
+    lagExponential = sum(stick) - sum(playFrames("exponential")[0][-50:])
+    assert 0 < lagNone < lagExponential
+
+# The velocity predictor extrapolates to render time, so on a steady stick it shows where the stick is.
+def testVelocityPredictionCatchesUp():
+    (shown, histograms) = playFrames("velocity")
+    joystick = SteadyJoystick()
+    assert shown[-50:] == [int(round(joystick.stickAt(frame * FRAME_NS))) for frame in range(351, 401)]
+
+# EOF
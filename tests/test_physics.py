@@ -0,0 +1,184 @@
+# The physics: the batch engine must play the same games as the game itself, frame for frame, and the swept collisions
+# must never let a ball into a wall, not even at the corners where one zone is open and the next is not, or at speed.
+# The autoplayer must see the same walls as the physics does.
+
+import itertools
+
+import numpy as np
+import pytest
+
+from conftest import SloppyPlayer, gameSettings
+from pong3d.autoplay import foldableAxes, predictExit, TrajectoryPredictor
+from pong3d.balls import BallManager
+from pong3d.game import Game, HeadlessRenderer
+from pong3d.physics import BatchPhysics, randomBallChange, sweepBall, sweepBalls
+from pong3d.zones import buildZones
+
+ZONE_SIZE = 10
+BALL_RADIUS = 0.05 * ZONE_SIZE
+
+# Points on the surface of a ball, along the axes and the diagonals, for a ball at the origin with radius 1.
+SURFACE_POINTS = np.array([point for point in itertools.product((-1, 0, 1), repeat = 3) if any(point)], dtype = float)
+SURFACE_POINTS /= np.linalg.norm(SURFACE_POINTS, axis = 1)[:, np.newaxis]
+
+# The balls (N, 3) with some of their surface outside every zone, and not out of the open front of the arena.
+def inWalls(zones, pos, radius):
+    points = (pos[:, np.newaxis, :] + radius * SURFACE_POINTS).reshape(-1, 3)
+    bounds = zones.bounds[np.newaxis]
+    inside = np.all((bounds[..., 0::2] - 1e-7 <= points[:, np.newaxis, :]) & (points[:, np.newaxis, :] <= bounds[..., 1::2] + 1e-7), axis = 2).any(axis = 1)
+    inside |= points[:, 2] >= min(zones.boundsList[zone][5] for (zone, side) in zones.exits if side == 5) - 1e-7
+    return ~inside.reshape(len(pos), -1).all(axis = 1)
+
+def startingBalls(zones, count, seed, speed = 1.0):
+    start = zones.indexOf("7")
+    pos = np.tile(np.array(zones.centres[start], dtype = float), (count, 1))
+    change = randomBallChange(np.random.default_rng(seed), ZONE_SIZE, count) * speed
+    return (pos, change, np.full(count, start, dtype = np.intp))
+
+# Passes on the joystick, and keeps the button presses the game took on each frame.
+class LoggingJoystick():
+    def __init__(self, joystick):
+        self.joystick = joystick
+        self.buttonPresses = 0
+
+    def sample(self):
+        return self.joystick.sample()
+
+    def takeButtonPresses(self):
+        self.buttonPresses = self.joystick.takeButtonPresses()
+        return self.buttonPresses
+
+    def takeSampleTime(self):
+        return 0
+
+# The game and the batch engine, given the same joystick, frame for frame, over a few games.
+@pytest.mark.parametrize("physicsRate", [0, 1000])
+@pytest.mark.parametrize("seed", [2, 4, 7])
+def testGameMatchesBatchPhysics(physicsRate, seed):
+    game = Game(gameSettings(1, physicsRate, randomSeed = seed), renderer = HeadlessRenderer(paced = False))
+    game.fixedFrameTimes = True
+    joystick = game.joystick = LoggingJoystick(SloppyPlayer(game))
+    physics = BatchPhysics(1, ZONE_SIZE, seed = seed, physicsRate = physicsRate)
+    (games, hits) = (0, 0)
+    game.newGame()
+    while games < 3 and game.frameNumber < 12000:
+        gameOver = game.frame()
+        physics.step(game.jstkXValue, game.jstkYValue, buttonPresses = joystick.buttonPresses)
+        assert physics.ballPos[0].tolist() == game.balls.pos[0].tolist()
+        assert (physics.batInUse[0], physics.batSize[0], physics.hitCounter[0], physics.gameOver[0]) == (game.batInUse, game.batSize, game.hitCounter, gameOver)
+        if gameOver:
+            (games, hits) = (games + 1, hits + game.hitCounter)
+            game.endGame()
+            game.newGame()
+            physics.reset()
+    game.close()
+    assert games >= 2 and hits > 0
+
+# Fast balls, moving 5 ball changes a sweep, with a bat that always hits, so they bounce about the arena for ever.
+@pytest.mark.parametrize("seed", [1, 2])
+def testNoBallGoesIntoAWall(seed):
+    zones = buildZones(ZONE_SIZE)
+    (pos, change, zone) = startingBalls(zones, 500, seed, speed = 5.0)
+    for sweep in range(150):
+        (hits, misses, bounces, overruns) = sweepBalls(pos, change, zone, BALL_RADIUS, zones, [-100, 100, -100, 100])
+        assert not inWalls(zones, pos, BALL_RADIUS).any()
+        assert not misses.any()
+        assert not overruns.any()
+
+# The game at 5 times the speed, with the bats as small as they go: still no ball in a wall, or through the bat.
+@pytest.mark.parametrize("physicsRate", [1000, 250])
+def testFastGameStaysInTheArena(physicsRate):
+    settings = gameSettings(1, physicsRate, startBatShrinks = 9, randomSeed = 2)
+    settings.ballSpeedScale = 5.0
+    game = Game(settings, renderer = HeadlessRenderer(paced = False))
+    game.fixedFrameTimes = True
+    game.joystick = SloppyPlayer(game)
+    escapeZ = min(game.zones.boundsList[zone][5] for (zone, side) in game.zones.exits if side == 5)
+    (games, hits) = (0, 0)
+    game.newGame()
+    while game.frameNumber < 3000:
+        gameOver = game.frame()
+        pos = game.balls.pos
+        assert not inWalls(game.zones, pos, BALL_RADIUS).any()
+        # Only a missed ball gets past the front of the arena, and not by more than one move.
+        assert gameOver or (pos[:, 2] + BALL_RADIUS <= escapeZ + 1e-9).all()
+        if gameOver:
+            (games, hits) = (games + 1, hits + game.hitCounter)
+            game.endGame()
+            game.newGame()
+    assert game.balls.sweepOverruns == 0
+    game.close()
+    assert games > 1 and hits + game.hitCounter > 0
+
+# One ball at a time, with Python numbers, must go exactly where the array sweep takes it, bounce for bounce.
+@pytest.mark.parametrize("speed", [1.0, 5.0])
+def testOneBallSweepMatches(speed):
+    zones = buildZones(ZONE_SIZE)
+    (pos, change, zone) = startingBalls(zones, 100, 5, speed)
+    batBounds = np.array([-15.0, -5.0, -5.0, 5.0]) # The whole of zone 1: the balls there hit, the ones in zone 4 miss.
+    balls = [(pos[ball].tolist(), change[ball].tolist(), int(zone[ball])) for ball in range(len(pos))]
+    (hitCount, missCount) = (0, 0)
+    for sweep in range(400):
+        (hits, misses, bounces, overruns) = sweepBalls(pos, change, zone, BALL_RADIUS, zones, batBounds)
+        for (ball, (ballPos, ballChange, ballZone)) in enumerate(balls):
+            (ballZone, ballHits, missed, bounced, overrun) = sweepBall(ballPos, ballChange, ballZone, BALL_RADIUS, zones, batBounds)
+            balls[ball] = (ballPos, ballChange, ballZone)
+            assert (ballPos, ballChange, ballZone) == (pos[ball].tolist(), change[ball].tolist(), zone[ball])
+            assert (ballHits, missed, bounced, overrun) == (hits[ball], misses[ball], bounces[ball], overruns[ball])
+        (hitCount, missCount) = (hitCount + hits.sum(), missCount + misses.sum())
+        # Missed balls start again.
+        for ball in np.flatnonzero(misses):
+            (pos[ball], zone[ball]) = (zones.centres[zones.indexOf("7")], zones.indexOf("7"))
+            balls[ball] = (pos[ball].tolist(), change[ball].tolist(), int(zone[ball]))
+    assert hitCount > 0 and missCount > 0
+
+# Where the autoplayer says each ball leaves the arena, and where the physics takes it, with no bat in the way.
+def testPredictionMatchesSweep():
+    zones = buildZones(ZONE_SIZE)
+    (pos, change, zone) = startingBalls(zones, 200, 3)
+    predictions = [predictExit(zones, pos[ball].tolist(), change[ball].tolist(), int(zone[ball]), BALL_RADIUS, foldableAxes(zones, BALL_RADIUS))
+                   for ball in range(len(pos))]
+    missed = np.zeros(len(pos), dtype = bool)
+    for sweep in range(5000):
+        (hits, misses, bounces, overruns) = sweepBalls(pos, change, zone, BALL_RADIUS, zones, [np.inf] * 4, np.where(missed, 0, 1.0))
+        missed |= misses
+    predicted = [ball for (ball, prediction) in enumerate(predictions) if prediction is not None and missed[ball]]
+    assert len(predicted) > 150
+    for ball in predicted:
+        (exitTime, exitX, exitY, exitZone) = predictions[ball]
+        assert (exitX, exitY, exitZone) == pytest.approx((pos[ball, 0], pos[ball, 1], zone[ball]), abs = 1e-6)
+
+# A bounce off the floor or the ceiling keeps the prediction, which unfolds them. A bounce off a wall does not.
+def testPredictionKeptOnUnfoldedBounces():
+    zones = buildZones(ZONE_SIZE)
+    predictor = TrajectoryPredictor(zones, BALL_RADIUS)
+    assert list(predictor.foldAxes) == [1]
+    (pos, change, zone) = startingBalls(zones, 1, 6, speed = 5.0)
+    balls = BallManager(zones, 1, BALL_RADIUS, zones.centres[zones.indexOf("7")])
+    (balls.pos[:], balls.change[:], balls.zone[:]) = (pos, change, zone)
+    prediction = predictor.predict(balls.pos[0].tolist(), balls.change[0].tolist(), int(balls.zone[0]))
+    changes = [balls.change[0].tolist()]
+    while not balls.misses.any():
+        balls.sweep([np.inf] * 4)
+        if balls.change[0].tolist() != changes[-1]:
+            changes.append(balls.change[0].tolist())
+            newPrediction = predictor.predict(balls.pos[0].tolist(), balls.change[0].tolist(), int(balls.zone[0]))
+            wallBounce = (changes[-1][0], changes[-1][2]) != (changes[-2][0], changes[-2][2])
+            assert (newPrediction is prediction) != wallBounce
+            prediction = newPrediction
+    assert predictor.cacheHits > 0 and predictor.predictions > 1
+    # And the prediction kept through the floor and ceiling bounces is where the ball leaves.
+    assert prediction[1:] == pytest.approx((balls.pos[0, 0], balls.pos[0, 1], balls.zone[0]), abs = 1e-6)
+
+# A ball with more contacts in one sweep than can be followed stops short, and is counted.
+def testSweepOverruns():
+    zones = buildZones(ZONE_SIZE)
+    balls = BallManager(zones, 2, BALL_RADIUS, zones.centres[zones.indexOf("7")])
+    balls.reset(np.random.default_rng(4))
+    # A ball change is at most 0.1 along each axis, so a million of them is thousands of bounces.
+    balls.sweep([-100, 100, -100, 100], np.array([1e6, 0.5]))
+    assert balls.sweepOverruns == 1
+    balls.sweep([-100, 100, -100, 100], 0.5)
+    assert balls.sweepOverruns == 1
+
+# EOF
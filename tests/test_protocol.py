@@ -0,0 +1,65 @@
+# The serial protocol: the CSV and binary packets, and their parsers, with the data in pieces of any size.
+
+import pytest
+
+from pong3d.crc8 import calcCRC8
+from pong3d.protocol import (BinaryPacketParser, CSVPacketParser, encodeBinaryCommand, encodeBinaryJoystickFrame, encodeCommand,
+                             encodeJoystickPacket, parseBinaryCommand, parseCommand, parseJoystickPacket)
+
+# The examples in the protocol header.
+def testHeaderExamples():
+    assert encodeJoystickPacket(512, 512, 1) == b"512,512,1!167\r\n"
+    assert encodeCommand("LEDs=3,Beep=L150") == b"LEDs=3,Beep=L150!67\n"
+
+def testJoystickPackets():
+    assert parseJoystickPacket(b"512,511,1!%d\r\n" % calcCRC8(b"512,511,1")) == (512, 511, 1)
+    assert parseJoystickPacket(b"512,511,1") == (512, 511, 1) # No CRC8 is allowed.
+    assert parseJoystickPacket(b"512,511,1!0\r\n") is None
+    assert parseJoystickPacket(b"512,511!%d\r\n" % calcCRC8(b"512,511")) is None
+    assert parseJoystickPacket(b"512,-1,1") is None
+
+def testCommands():
+    assert parseCommand(encodeCommand("LEDs=3,Beep=L150")) == {"LEDs": "3", "Beep": "L150"}
+    assert parseCommand(b"LEDs=3!0\n") is None
+    assert parseBinaryCommand(encodeBinaryCommand(5, "H", 300)) == {"LEDs": "5", "Beep": "H300"}
+
+# Samples, in the framing of a parser, with a corrupt one in the middle.
+def framedSamples(parser, samples, corrupt = 2):
+    packets = []
+    for (index, sample) in enumerate(samples):
+        if isinstance(parser, BinaryPacketParser):
+            packet = encodeBinaryJoystickFrame(*sample)
+            if index == corrupt:
+                packet = packet[:-1] + bytes([packet[-1] ^ 0xff])
+        else:
+            packet = encodeJoystickPacket(*sample)
+            if index == corrupt:
+                packet = packet.replace(b",", b";", 1)
+        packets.append(packet)
+    return b"".join(packets)
+
+@pytest.mark.parametrize("parserClass", [CSVPacketParser, BinaryPacketParser])
+@pytest.mark.parametrize("pieceSize", [1, 3, 8, 15, 1000])
+def testParsersInPieces(parserClass, pieceSize):
+    samples = [(index * 97 % 1024, 1023 - index, index % 2) for index in range(20)]
+    parser = parserClass()
+    # Starting part way through a packet, as when the port is opened while the Arduino is sending.
+    data = b"1,1!7\r\n"[3:] + framedSamples(parser, samples)
+    parsed = []
+    for start in range(0, len(data), pieceSize):
+        parsed += parser.feed(data[start:start + pieceSize])
+    assert parsed == samples[:2] + samples[3:]
+    assert parser.goodFrames == 19
+
+# One packet per read is the usual case, and has a fast path of its own.
+@pytest.mark.parametrize("parserClass", [CSVPacketParser, BinaryPacketParser])
+def testParsersOnePacketPerRead(parserClass):
+    samples = [(index, 512, 1) for index in range(10)]
+    parser = parserClass()
+    data = framedSamples(parser, samples)
+    packetSize = len(data) // len(samples) if parserClass is BinaryPacketParser else None
+    packets = [data[start:start + packetSize] for start in range(0, len(data), packetSize)] if packetSize else data.splitlines(True)
+    assert sum((parser.feed(packet) for packet in packets), []) == samples[:2] + samples[3:]
+    assert (parser.goodFrames, parser.corruptFrames) == (9, 1)
+
+# EOF
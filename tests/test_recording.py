@@ -0,0 +1,107 @@
+# Recording and replaying: a replay must play the recorded games again exactly, frame for frame.
+
+import pytest
+
+from conftest import SloppyPlayer, gameSettings
+from pong3d.game import Game, HeadlessRenderer
+from pong3d.recording import InputRecorder, InputRecording, ReplayReader, RECORDING_HEADER, RECORDING_MAGIC, RECORDING_RECORD, replayHeadless
+
+# Play some games -> what the game looked like at every frame.
+def playGames(game, games, maxFrames = 8000):
+    frames = []
+    for gameNumber in range(games):
+        game.newGame()
+        while True:
+            gameOver = game.frame()
+            frames.append((game.frameNumber, game.balls.pos.tobytes(), game.batInUse, game.batSize, game.hitCounter, gameOver,
+                           tuple((bat.batPosX, bat.batPosY) for bat in game.bats)))
+            if gameOver or game.frameNumber >= maxFrames:
+                break
+        game.endGame()
+    return frames
+
+@pytest.mark.parametrize("ballCount, physicsRate, startBatShrinks", [(1, 0, 0), (3, 0, 0), (3, 1000, 0), (1, 1000, 6)])
+def testReplayMatchesRecording(tmp_path, ballCount, physicsRate, startBatShrinks):
+    recordPath = str(tmp_path / "game.p3dr")
+    game = Game(gameSettings(ballCount, physicsRate, startBatShrinks, recordPath = recordPath), renderer = HeadlessRenderer(paced = False))
+    game.joystick = SloppyPlayer(game)
+    recorded = playGames(game, 4)
+    game.close()
+    # The replay takes the balls, the bats and the physics from the recording, whatever the settings say.
+    game = Game(gameSettings(1, 0, 0, replayPath = recordPath), renderer = HeadlessRenderer(paced = False))
+    assert (game.balls.count, game.startBatShrinks) == (ballCount, startBatShrinks)
+    replayed = playGames(game, 4)
+    game.close()
+    assert len(replayed) == len(recorded)
+    for (recordedFrame, replayedFrame) in zip(recorded, replayed):
+        assert replayedFrame == recordedFrame
+
+# The headless replay, with the batch physics engine, must score the same games as the game did.
+@pytest.mark.parametrize("physicsRate, startBatShrinks", [(0, 0), (0, 7), (1000, 0), (1000, 7)])
+def testHeadlessReplayMatchesGame(tmp_path, physicsRate, startBatShrinks):
+    recordPath = str(tmp_path / "game.p3dr")
+    game = Game(gameSettings(1, physicsRate, startBatShrinks, recordPath = recordPath), renderer = HeadlessRenderer(paced = False))
+    game.joystick = SloppyPlayer(game)
+    recorded = playGames(game, 4)
+    game.close()
+    gameHits = [hitCounter for (frameNumber, ballPos, batInUse, batSize, hitCounter, gameOver, batPos) in recorded if gameOver]
+    # Some hits, so the bats shrink, and some misses, so the games end.
+    assert sum(gameHits) > 0 and len(gameHits) > 1
+    recording = InputRecording(recordPath)
+    assert replayHeadless(recording) == gameHits
+    recording.close()
+
+def testRecordingRoundTrip(tmp_path):
+    recordPath = str(tmp_path / "inputs.p3dr")
+    recorder = InputRecorder(recordPath, 1234, 2, 100, 1000, 1.5, 3)
+    samples = [(frame, (frame * 7) % 1024, 1023 - frame, frame % 2, frame % 3) for frame in range(200)]
+    for sample in samples:
+        recorder.record(*sample)
+    recorder.close()
+    recording = InputRecording(recordPath)
+    assert (recording.seed, recording.ballCount, recording.frameRate, recording.physicsRate, recording.speedScale, recording.startBatShrinks) == (1234, 2, 100, 1000, 1.5, 3)
+    assert [tuple(record) for record in recording.records.tolist()] == samples
+    # The replay gives the sample for each frame, and every button press.
+    replay = ReplayReader(recording)
+    buttonPresses = 0
+    for (frame, jstkXValue, jstkYValue, jstkZValue, presses) in samples:
+        replay.advance(frame)
+        assert replay.sample() == (jstkXValue, jstkYValue, jstkZValue)
+        buttonPresses += replay.takeButtonPresses()
+    assert buttonPresses == sum(sample[4] for sample in samples)
+    assert replay.finished
+    replay = None
+    recording.close()
+
+def testRecordsReachDiskWithoutClose(tmp_path):
+    recordPath = str(tmp_path / "crash.p3dr")
+    recorder = InputRecorder(recordPath, 1, flushInterval = 3600, flushRecords = 10)
+    # The header is written straight away.
+    assert (tmp_path / "crash.p3dr").stat().st_size == RECORDING_HEADER.size
+    for frame in range(10):
+        recorder.record(frame, frame, 0, 1)
+    # And the records every flushRecords, without waiting for the end of the game.
+    recording = InputRecording(recordPath)
+    assert len(recording) == 10
+    recording.close()
+    recorder.close()
+
+@pytest.mark.parametrize("fileBytes", [0, 4, RECORDING_HEADER.size, RECORDING_HEADER.size + 3])
+def testEmptyOrTruncatedRecording(tmp_path, fileBytes):
+    recordPath = str(tmp_path / "short.p3dr")
+    recorder = InputRecorder(recordPath, 1)
+    recorder.record(0, 512, 512, 1)
+    recorder.close()
+    with open(recordPath, "r+b") as recordFile:
+        recordFile.truncate(fileBytes)
+    with pytest.raises(ValueError, match = "empty or truncated"):
+        InputRecording(recordPath)
+
+# Only version 1 recordings, with every setting in the header, are read.
+def testOtherVersionsRefused(tmp_path):
+    recordPath = tmp_path / "v2.p3dr"
+    recordPath.write_bytes(RECORDING_HEADER.pack(RECORDING_MAGIC, 2, 99, 1, 60, 500, 2.0, 0) + RECORDING_RECORD.pack(0, 512, 512, 1, 0))
+    with pytest.raises(ValueError, match = "not a version 1 recording"):
+        InputRecording(str(recordPath))
+
+# EOF
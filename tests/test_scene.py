@@ -0,0 +1,82 @@
+# The scene state: a vpython attribute is only written when what is shown really changes, and the counters add up.
+# A fake vpython object stands in for the real one, so no display or vpython is needed.
+
+from collections import namedtuple
+
+from pong3d.scene import SceneState
+
+FakeVector = namedtuple("FakeVector", "x y z")
+
+# Keeps every attribute write, as (name, value).
+class FakeVpythonObject():
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+        self.__dict__["writes"] = []
+
+    def __setattr__(self, name, value):
+        self.writes.append((name, value))
+        self.__dict__[name] = value
+
+def trackedBall(posThreshold = 0.0):
+    sceneState = SceneState(FakeVector, posThreshold)
+    ball = FakeVpythonObject(pos = FakeVector(0, 0, 0), color = FakeVector(1, 1, 1), opacity = 1)
+    return (sceneState, ball, sceneState.track(ball))
+
+# Setting what is already shown writes nothing, and a change is written once, at the flush.
+def testWrittenOnlyWhenChanged():
+    (sceneState, ball, sceneObject) = trackedBall()
+    sceneObject.setPos(0, 0, 0)
+    sceneObject.setColor((1, 1, 1))
+    sceneObject.setOpacity(1)
+    sceneState.flush()
+    assert ball.writes == []
+    sceneObject.setPos(1, 2, 3)
+    sceneObject.setOpacity(0.5)
+    assert ball.writes == []
+    sceneState.flush()
+    assert ball.writes == [("pos", FakeVector(1, 2, 3)), ("opacity", 0.5)]
+    sceneState.flush()
+    assert len(ball.writes) == 2
+    assert sceneState.stats() == {"attributeWrites": 2, "savedWrites": 3, "flushes": 3}
+
+# Moves smaller than the threshold are held back, until they add up to one that is not.
+def testSmallMovesAddUp():
+    (sceneState, ball, sceneObject) = trackedBall(posThreshold = 0.1)
+    for x in (0.04, 0.08):
+        sceneObject.setPos(x, 0, 0)
+        sceneState.flush()
+    assert ball.writes == []
+    sceneObject.setPos(0.12, 0, 0)
+    sceneState.flush()
+    assert ball.writes == [("pos", FakeVector(0.12, 0, 0))]
+    # The next move is measured from what is shown now.
+    sceneObject.setPos(0.2, 0, 0)
+    sceneState.flush()
+    assert len(ball.writes) == 1
+    assert sceneState.stats() == {"attributeWrites": 1, "savedWrites": 3, "flushes": 4}
+
+# A value replaced before the flush is never written, and neither is one set back to what is shown.
+def testReplacedBeforeTheFlush():
+    (sceneState, ball, sceneObject) = trackedBall()
+    sceneObject.setPos(1, 0, 0)
+    sceneObject.setPos(2, 0, 0)
+    sceneObject.setColor((0, 1, 0))
+    sceneObject.setColor((1, 1, 1))
+    sceneState.flush()
+    assert ball.writes == [("pos", FakeVector(2, 0, 0))]
+    # The replaced pos, the replaced colour, and the colour set back to what was shown.
+    assert (sceneState.attributeWrites, sceneState.savedWrites) == (1, 3)
+    assert sceneState.dirtyObjects == [] and not sceneObject.isDirty
+
+# Only the objects with something to write are flushed.
+def testOnlyDirtyObjectsFlushed():
+    sceneState = SceneState(FakeVector)
+    balls = [FakeVpythonObject(pos = FakeVector(0, 0, 0)) for ball in range(3)]
+    sceneObjects = [sceneState.track(ball) for ball in balls]
+    sceneObjects[1].setPos(0, 1, 0)
+    sceneObjects[1].setPos(0, 2, 0)
+    assert sceneState.dirtyObjects == [sceneObjects[1]]
+    sceneState.flush()
+    assert [ball.writes for ball in balls] == [[], [("pos", FakeVector(0, 2, 0))], []]
+
+# EOF
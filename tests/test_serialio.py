@@ -0,0 +1,170 @@
+# Serial I/O with a fake Arduino on a pseudo terminal: the framing agreed, the joystick samples read, no button press lost,
+# and the commands paced to suit the Arduino. And short writes on a non-blocking port must not lose or mangle a command.
+
+import os
+import time
+
+import pytest
+import serial
+
+from pong3d.arenas import NonBlockingWriter
+from pong3d.protocol import BinaryFraming, CSVFraming
+from pong3d.serialio import CommandWriter, connectArduino
+
+# The fake Arduino needs a pseudo terminal, so Linux or macOS.
+try:
+    from pong3d.fakearduino import FakeArduino
+except ImportError:
+    FakeArduino = None
+needsPty = pytest.mark.skipif(FakeArduino is None or not hasattr(os, "openpty"), reason = "needs a pseudo terminal")
+
+# Wait for something to become true -> True, or False if it does not within the timeout.
+def waitFor(condition, timeout = 2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+# A fake Arduino sending every 10ms, and the game's reader and writer connected to it.
+@pytest.fixture
+def connected(request):
+    fakeArduino = FakeArduino(job2Cycle = 0.010)
+    fakeArduino.supportsBinary = request.param
+    fakeArduino.start()
+    (joystickReader, commandWriter) = connectArduino(fakeArduino.port)
+    yield (fakeArduino, joystickReader, commandWriter)
+    joystickReader.stop()
+    commandWriter.stop()
+    joystickReader.arduinoDataStream.close()
+    fakeArduino.stop()
+
+# The framing is binary if the Arduino can do it, and CSV with the older firmware. Either way, the samples get through.
+@needsPty
+@pytest.mark.parametrize("connected, framingName", [(True, "binary"), (False, "csv")], indirect = ["connected"])
+def testFramingAgreed(connected, framingName):
+    (fakeArduino, joystickReader, commandWriter) = connected
+    assert commandWriter.framing.name == framingName
+    assert fakeArduino.binaryMode == (framingName == "binary")
+    (fakeArduino.jstkXValue, fakeArduino.jstkYValue) = (700, 300)
+    assert waitFor(lambda: joystickReader.sample() == (700, 300, 1))
+    # With CSV, the reader may start part way through the line that was arriving when the wait for binary frames ran out.
+    assert joystickReader.corruptFrames <= (framingName == "csv")
+
+# Presses that come and go between two frames are queued, so the game sees every one, however seldom it looks.
+@needsPty
+@pytest.mark.parametrize("connected", [True, False], indirect = True)
+def testNoButtonPressLost(connected):
+    (fakeArduino, joystickReader, commandWriter) = connected
+    for press in range(5):
+        fakeArduino.jstkZValue = 0
+        assert waitFor(lambda: joystickReader.sample()[2] == 0)
+        fakeArduino.jstkZValue = 1
+        assert waitFor(lambda: joystickReader.sample()[2] == 1)
+    assert joystickReader.takeButtonPresses() == 5
+    assert joystickReader.takeButtonPresses() == 0
+
+# A burst of LED updates is merged, and written no faster than the Arduino parses commands, and the last one wins.
+@needsPty
+@pytest.mark.parametrize("connected", [True], indirect = True)
+def testCommandsPaced(connected):
+    (fakeArduino, joystickReader, commandWriter) = connected
+    startTime = time.monotonic()
+    for LEDs in range(1, 11):
+        commandWriter.send(LEDs = LEDs)
+        time.sleep(0.02)
+    assert waitFor(lambda: fakeArduino.LEDs == 10)
+    # The mode request, and one command per write cycle at most.
+    writeCycles = (time.monotonic() - startTime) / commandWriter.writeCycle
+    assert commandWriter.sentCommands <= writeCycles + 1
+    assert commandWriter.sentCommands + commandWriter.droppedCommands == 10
+    assert [command for command in fakeArduino.commands[1:] if command is None] == []
+
+# A port that only takes a few bytes at a time, or none at all while it is full.
+class ShortSerial():
+    def __init__(self, takes = 3):
+        self.takes = takes
+        self.written = bytearray()
+
+    def write(self, data):
+        taken = data[:self.takes]
+        self.written += taken
+        return len(taken)
+
+@pytest.mark.parametrize("framing", [CSVFraming(), BinaryFraming()], ids = ["csv", "binary"])
+def testShortWritesKeepTheRest(framing):
+    port = ShortSerial()
+    commandWriter = CommandWriter(port, framing)
+    commandWriter.send(LEDs = 5, beepNote = "H", beepDuration = 150)
+    command = framing.encodeCommand(5, "H", 150)
+    commandWriter.poll()
+    assert commandWriter.sentCommands == 0
+    assert commandWriter.stats()["unsentBytes"] == len(command) - 3
+    # A new command waits for the rest of the last one, which goes at once, without waiting for the write cycle.
+    commandWriter.send(LEDs = 6)
+    while commandWriter.unsent:
+        commandWriter.poll()
+    assert bytes(port.written) == command
+    assert (commandWriter.sentCommands, commandWriter.LEDsSent) == (1, 5)
+    # Then the next command, a write cycle later.
+    commandWriter.lastWriteTime -= commandWriter.writeCycle
+    commandWriter.poll()
+    while commandWriter.unsent:
+        commandWriter.poll()
+    assert bytes(port.written) == command + framing.encodeCommand(6, "", 0)
+    assert (commandWriter.sentCommands, commandWriter.LEDsSent) == (2, 6)
+
+# With the writer thread: the rest of a short write goes straight away, not a write cycle later.
+def testThreadedShortWritesNotPaced():
+    port = ShortSerial()
+    commandWriter = CommandWriter(port, BinaryFraming(), writeCycle = 5.0)
+    commandWriter.start()
+    commandWriter.send(LEDs = 5, beepNote = "H", beepDuration = 150)
+    assert waitFor(lambda: commandWriter.sentCommands == 1, timeout = 1.0)
+    assert bytes(port.written) == BinaryFraming().encodeCommand(5, "H", 150)
+    startTime = time.monotonic()
+    commandWriter.stop()
+    assert time.monotonic() - startTime < 0.5
+    assert not commandWriter.is_alive()
+
+def testPortFullTakesNothing():
+    port = ShortSerial(takes = 0)
+    commandWriter = CommandWriter(port, BinaryFraming())
+    commandWriter.send(LEDs = 1)
+    for attempt in range(3):
+        commandWriter.poll()
+    assert commandWriter.sentCommands == 0
+    assert commandWriter.unsent == BinaryFraming().encodeCommand(1, "", 0)
+
+# Stopping the writer thread with a full port: the command left is dropped after the timeout, not waited on for ever.
+def testStopWithAFullPort():
+    port = ShortSerial(takes = 0)
+    commandWriter = CommandWriter(port, BinaryFraming())
+    commandWriter.start()
+    commandWriter.send(LEDs = 1)
+    assert waitFor(lambda: commandWriter.unsent)
+    commandWriter.send(LEDs = 2)
+    startTime = time.monotonic()
+    commandWriter.stop(timeout = 0.2)
+    assert 0.2 <= time.monotonic() - startTime < 1.0
+    assert not commandWriter.is_alive()
+    assert (commandWriter.sentCommands, commandWriter.droppedCommands, commandWriter.stats()["unsentBytes"]) == (0, 2, 0)
+
+# An arena's controller that has stopped reading: the writes must come back at once, not wait for the port.
+@needsPty
+def testNonBlockingWriterNeverWaits():
+    (controller, portFd) = os.openpty()
+    arduinoDataStream = serial.Serial(os.ttyname(portFd), 115200, timeout = 0, write_timeout = 0)
+    try:
+        writer = NonBlockingWriter(arduinoDataStream)
+        startTime = time.monotonic()
+        taken = [writer.write(b"x" * 4096) for attempt in range(64)]
+        assert time.monotonic() - startTime < 1.0
+        assert taken[-1] == 0
+    finally:
+        arduinoDataStream.close()
+        os.close(portFd)
+        os.close(controller)
+
+# EOF
@@ -0,0 +1,53 @@
+# The frame timing histograms: log-linear buckets, so the percentiles are never more than 1/8 out.
+
+import csv
+
+import numpy as np
+import pytest
+
+from pong3d.timing import FrameTimer, Histogram, HISTOGRAM_BUCKETS, HISTOGRAM_BUCKET_TOPS_NS, histogramBucket
+
+# Every time goes in the bucket that starts at or below it, and ends above it, and no bucket is wider than 1/8 of where it starts.
+def testBucketEdges():
+    bucketStartNs = 0
+    for bucket in range(HISTOGRAM_BUCKETS - 1):
+        bucketTopNs = HISTOGRAM_BUCKET_TOPS_NS[bucket]
+        assert histogramBucket(bucketStartNs) == bucket
+        assert histogramBucket(bucketTopNs - 1) == bucket
+        assert bucketTopNs - bucketStartNs <= max(bucketStartNs / 8, 1)
+        bucketStartNs = bucketTopNs
+    assert histogramBucket(10 ** 12) == HISTOGRAM_BUCKETS - 1
+    assert histogramBucket(-1) == 0
+
+# Histogram.add works the bucket out for itself, for speed, and must agree.
+def testAddAgreesWithBucket():
+    for timeNs in [0, 1, 15, 16, 17, 1023, 1024, 1151, 1152, 999999, 10 ** 7, 10 ** 12]:
+        histogram = Histogram()
+        histogram.add(timeNs)
+        assert histogram.counts[histogramBucket(timeNs)] == 1
+
+# Frame times from 100us to 100ms, spread over three octaves and more.
+@pytest.mark.parametrize("percent", [50, 90, 99, 99.9])
+def testPercentileError(percent):
+    timesNs = np.random.default_rng(9).lognormal(np.log(2e6), 1.0, 100000).astype(np.int64)
+    histogram = Histogram()
+    for timeNs in timesNs.tolist():
+        histogram.add(timeNs)
+    exactUs = np.percentile(timesNs, percent, method = "inverted_cdf") / 1000
+    assert exactUs <= histogram.percentile(percent) <= exactUs * 1.125
+
+def testExportCSV(tmp_path):
+    frameTimer = FrameTimer(enabled = True, summaryInterval = 0)
+    for timeNs in (500, 1100, 1100, 5000000):
+        frameTimer.record("parse", timeNs)
+    path = str(tmp_path / "timing.csv")
+    frameTimer.export(path)
+    with open(path, newline = "") as csvFile:
+        rows = {row["phase"]: row for row in csv.DictReader(csvFile)}
+    assert int(rows["parse"]["count"]) == 4
+    assert int(rows["parse"]["under1152ns"]) == 2
+    assert int(rows["parse"]["under512ns"]) == 1
+    assert sum(int(rows["parse"]["under%dns" % topNs]) for topNs in HISTOGRAM_BUCKET_TOPS_NS) == 4
+    assert float(rows["parse"]["maxUs"]) == 5000
+
+# EOF
@@ -0,0 +1,83 @@
+# The zone registry must find the same zone as the original game's seven zone checks, for balls anywhere in the standard arena.
+
+import numpy as np
+import pytest
+
+from pong3d.balls import BallManager
+from pong3d.zones import buildZones, ZoneRegistry
+
+ZONE_SIZE = 10
+BALL_RADIUS = 0.05 * ZONE_SIZE
+
+# The original Lesson17.py zone checks, written as a loop: the ball is in every zone that its next position, plus or minus
+# its radius, overlaps on all three axes. The bounds are the last zone it is in, unless it is in two zones that join,
+# when they are the zone it is moving towards -> (zoneA, zoneB, axis, sign of the change towards zoneA).
+ZONE_TIE_BREAKS = ((1, 2, 2, 1), (2, 3, 2, 1), (3, 7, 0, -1), (4, 5, 2, 1), (5, 6, 2, 1), (6, 7, 0, 1))
+
+# -> (bounds, location), the location numbered from 1, or the bounds given and 0 if the ball is in no zone.
+def locateSevenZones(boundsList, pos, change, radius, bounds):
+    inZone = [False] * 8
+    location = 0
+    for (zone, zoneBounds) in enumerate(boundsList):
+        if all(((zoneBounds[2 * axis] <= pos[axis] + radius + change[axis] <= zoneBounds[2 * axis + 1]) or
+                (zoneBounds[2 * axis] <= pos[axis] - radius + change[axis] <= zoneBounds[2 * axis + 1])) for axis in range(3)):
+            bounds = zoneBounds
+            inZone[zone + 1] = True
+            location = zone + 1
+    for (zoneA, zoneB, axis, sign) in ZONE_TIE_BREAKS:
+        if inZone[zoneA] and inZone[zoneB]:
+            if change[axis] * sign > 0:
+                (bounds, location) = (boundsList[zoneA - 1], zoneA)
+            elif change[axis] * sign < 0:
+                (bounds, location) = (boundsList[zoneB - 1], zoneB)
+    return (bounds, location)
+
+# Ball positions and changes from a game, with a bat that never misses, so the balls go everywhere.
+# The balls are moved with swept collisions, which keep them out of the walls. The original one move per frame lets a ball
+# sink into the walls at the corners, and there the seven zone checks and the registry disagree about a ball that is in neither zone.
+def gameBalls(seed, frames = 3000, count = 32):
+    zones = buildZones(ZONE_SIZE)
+    balls = BallManager(zones, count, BALL_RADIUS, zones.centres[zones.indexOf("7")])
+    balls.reset(np.random.default_rng(seed))
+    for frame in range(frames):
+        yield (balls.pos.copy(), balls.change.copy())
+        balls.sweep([-100, 100, -100, 100])
+
+def testZoneNames():
+    zones = buildZones(ZONE_SIZE)
+    assert zones.names == ["1", "2", "3", "4", "5", "6", "7"]
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def testLocateMatchesSevenZoneChecks(seed):
+    zones = buildZones(ZONE_SIZE)
+    for (pos, change) in gameBalls(seed):
+        located = zones.locateMany(pos, change, BALL_RADIUS)
+        for ball in range(len(pos)):
+            (ballPos, ballChange) = (pos[ball].tolist(), change[ball].tolist())
+            (bounds, location) = locateSevenZones(zones.boundsList, ballPos, ballChange, BALL_RADIUS, None)
+            zone = zones.locate(ballPos, ballChange, BALL_RADIUS)
+            assert zone == located[ball]
+            assert zone + 1 == location
+            assert zones.boundsList[zone] == bounds
+
+# A ball outside the arena is in no zone, and the game keeps the bounds it had.
+def testLocateOutsideTheArena():
+    zones = buildZones(ZONE_SIZE)
+    for (pos, change) in (((0, 0, 0), (0.1, 0, 0)), ((0, 0, 30), (0, 0, 0.1)), ((-10, 20, 0), (0, -0.1, 0))):
+        assert zones.locate(pos, change, BALL_RADIUS) == -1
+        assert locateSevenZones(zones.boundsList, pos, change, BALL_RADIUS, None) == (None, 0)
+    assert zones.locateMany(np.array([[0.0, 0, 0], [-10, 0, 0]]), np.full((2, 3), 0.1), BALL_RADIUS).tolist() == [-1, zones.indexOf("2")]
+
+# A long corridor, open at both ends: the tables are built once, when the last zone is in.
+def testFinalizeLongCorridor():
+    zones = ZoneRegistry(ZONE_SIZE)
+    for index in range(500):
+        zones.addZone((0, 0, index), 0b111100, str(index))
+    assert zones.finalize() is zones
+    assert zones.bounds.shape == (500, 6)
+    assert zones.exits == [(0, 4), (499, 5)]
+    assert zones.adjacencyList[250] == [-1, -1, -1, -1, 249, 251]
+    assert zones.locate((0, 0, 2500), (0, 0, 0.1), BALL_RADIUS) == 250
+    assert zones.locateMany(np.array([[0.0, 0, 2500], [0, 0, 4996]]), np.full((2, 3), 0.1), BALL_RADIUS).tolist() == [250, -1]
+
+# EOF